@@ -0,0 +1,32 @@
+"""Active record indexes
+
+Revision ID: 8d41c7e2a6b9
+Revises: 1fafdb893dd5
+Create Date: 2026-10-16 23:50:12.481305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d41c7e2a6b9'
+down_revision: Union[str, None] = '1fafdb893dd5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_whitelist_active', 'whitelist', ['server_type', 'valid', 'expiration_time', 'player_id'], unique=False)
+    op.create_index('ix_whitelist_ban_active', 'whitelist_ban', ['server_type', 'valid', 'expiration_time', 'player_id'], unique=False)
+    op.create_index('ix_whitelist_ban_player_active', 'whitelist_ban', ['player_id', 'server_type', 'valid', 'expiration_time'], unique=False)
+    op.create_index('ix_donation_active', 'donation', ['valid', 'expiration_time', 'player_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_donation_active', table_name='donation')
+    op.drop_index('ix_whitelist_ban_player_active', table_name='whitelist_ban')
+    op.drop_index('ix_whitelist_ban_active', table_name='whitelist_ban')
+    op.drop_index('ix_whitelist_active', table_name='whitelist')
@@ -0,0 +1,38 @@
+"""Whitelist change log
+
+Revision ID: c3f95a0e7d12
+Revises: 8d41c7e2a6b9
+Create Date: 2026-10-17 00:12:48.905127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f95a0e7d12'
+down_revision: Union[str, None] = '8d41c7e2a6b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('whitelist_change',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('server_type', sqlmodel.sql.sqltypes.AutoString(length=32), nullable=False),
+    sa.Column('player_id', sa.Integer(), nullable=False),
+    sa.Column('change_time', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['player_id'], ['player.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_whitelist_change_server_type_id', 'whitelist_change', ['server_type', 'id'], unique=False)
+    op.create_index('ix_whitelist_change_change_time', 'whitelist_change', ['change_time'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_whitelist_change_change_time', table_name='whitelist_change')
+    op.drop_index('ix_whitelist_change_server_type_id', table_name='whitelist_change')
+    op.drop_table('whitelist_change')
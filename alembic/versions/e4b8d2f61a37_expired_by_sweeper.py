@@ -0,0 +1,30 @@
+"""Expired by sweeper
+
+Revision ID: e4b8d2f61a37
+Revises: c3f95a0e7d12
+Create Date: 2026-10-17 14:02:31.517204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b8d2f61a37'
+down_revision: Union[str, None] = 'c3f95a0e7d12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('whitelist', sa.Column('expired_by_sweeper', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.add_column('whitelist_ban', sa.Column('expired_by_sweeper', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.add_column('donation', sa.Column('expired_by_sweeper', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('donation', 'expired_by_sweeper')
+    op.drop_column('whitelist_ban', 'expired_by_sweeper')
+    op.drop_column('whitelist', 'expired_by_sweeper')
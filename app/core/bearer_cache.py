@@ -0,0 +1,162 @@
+import asyncio
+import logging
+from collections.abc import AsyncIterator
+from functools import lru_cache
+from typing import Any, ClassVar, Self, cast
+
+from redis import RedisError
+from sqlalchemy import event
+from sqlalchemy.orm import UOWTransaction
+from sqlalchemy.orm.base import object_state
+from sqlmodel import Session
+
+from app.core.cache import TTLCache
+from app.core.config import get_config
+from app.core.redis import RedisClient, default_client
+from app.database.models import ApiAuth
+
+
+class BearerTokenCache:
+    """
+    Per-worker cache of bearer token verification results.
+
+    Stores both valid and invalid token hashes, the latter with a shorter TTL.
+    Workers drop entries when `ApiAuth` rows change by listening to a Redis channel.
+    """
+
+    INVALIDATION_CHANNEL: ClassVar[str] = "api_auth"
+    INVALIDATE_ALL: ClassVar[str] = "*"
+    RECONNECT_DELAY: ClassVar[float] = 5.0
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, max_size: int, ttl: float, negative_ttl: float) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Maximum number of token hashes kept in memory
+            ttl: Seconds a valid token is trusted
+            negative_ttl: Seconds an invalid token is rejected
+        """
+        self.negative_ttl = negative_ttl
+        self._cache: TTLCache[str, bool] = TTLCache(max_size, ttl)
+
+    @classmethod
+    def from_config(cls) -> Self:
+        config = get_config().general
+        return cls(config.bearer_cache_size, config.bearer_cache_ttl, config.bearer_cache_negative_ttl)
+
+    def get(self, token_hash: str) -> bool | None:
+        """
+        Get the cached verification result.
+
+        Returns:
+            True if the token is valid, False if invalid, None if unknown
+        """
+        return self._cache.get(token_hash)
+
+    def store(self, token_hash: str, valid: bool) -> None:
+        self._cache.set(token_hash, valid, ttl=None if valid else self.negative_ttl)
+
+    def invalidate(self, token_hash: str | None = None) -> None:
+        """Drop a single token hash, or everything if None."""
+        if token_hash is None or token_hash == self.INVALIDATE_ALL:
+            self._cache.clear()
+        else:
+            self._cache.delete(token_hash)
+
+    async def publish_invalidation(self, redis_client: RedisClient, *token_hashes: str) -> bool:
+        """
+        Tell every worker to drop the given token hashes. Publishes a wildcard if none are given.
+
+        Returns:
+            False if Redis is unavailable, workers then keep the entries until they expire by TTL
+        """
+        try:
+            for token_hash in token_hashes or (self.INVALIDATE_ALL,):
+                await redis_client.publish(self.INVALIDATION_CHANNEL, token_hash)
+        except RedisError:
+            self.logger.warning("Bearer cache invalidation was not published, other workers will expire it by TTL")
+            return False
+        return True
+
+    async def listen(self, redis_client: RedisClient) -> None:
+        """Apply invalidations published by other workers until cancelled."""
+        while True:
+            try:
+                pubsub = await redis_client.subscribe(self.INVALIDATION_CHANNEL)
+            except RedisError:
+                await asyncio.sleep(self.RECONNECT_DELAY)
+                continue
+
+            # Invalidations could have been missed while not subscribed
+            self.invalidate()
+            try:
+                messages = cast(AsyncIterator[dict[str, Any]], pubsub.listen())  # pyright: ignore[reportUnknownMemberType]
+                async for message in messages:
+                    if message["type"] == "message":
+                        self.invalidate(cast(bytes, message["data"]).decode())
+            except RedisError as e:
+                self.logger.warning("Bearer cache invalidation listener disconnected: %s", str(e))
+                await asyncio.sleep(self.RECONNECT_DELAY)
+            finally:
+                await pubsub.aclose()
+
+
+@lru_cache(maxsize=1)
+def get_bearer_cache() -> BearerTokenCache:
+    return BearerTokenCache.from_config()
+
+
+# region Events
+
+API_AUTH_CHANGES_KEY = "api_auth_changes"
+_publish_tasks: set[asyncio.Task[bool]] = set()
+
+
+@event.listens_for(Session, "after_flush")
+def collect_api_auth_changes(session: Session, _: UOWTransaction) -> None:
+    """Remember token hashes of `ApiAuth` rows added, removed or changed in this transaction."""
+    changed: set[str] = set()
+    for obj in (*session.new, *session.deleted, *session.dirty):
+        if isinstance(obj, ApiAuth):
+            changed.add(obj.token_hash)
+            changed.update(object_state(obj).attrs.token_hash.history.deleted or ())
+
+    if changed:
+        session.info.setdefault(API_AUTH_CHANGES_KEY, set()).update(changed)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_api_auth_changes(session: Session) -> None:
+    """
+    Drop committed `ApiAuth` changes from the bearer cache.
+
+    Other workers are notified only when committing from within the event loop.
+    Tokens changed outside of it or outside of the ORM are invalidated by `scripts/invalidate_bearer_cache.py`.
+    """
+    changed: set[str] | None = session.info.pop(API_AUTH_CHANGES_KEY, None)
+    if not changed:
+        return
+
+    cache = get_bearer_cache()
+    for token_hash in changed:
+        cache.invalidate(token_hash)
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+
+    task = loop.create_task(cache.publish_invalidation(default_client(), *changed))
+    _publish_tasks.add(task)
+    task.add_done_callback(_publish_tasks.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_api_auth_changes(session: Session) -> None:
+    session.info.pop(API_AUTH_CHANGES_KEY, None)
+
+
+# endregion
@@ -0,0 +1,215 @@
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import ClassVar, Protocol, override
+
+from prometheus_client.core import CounterMetricFamily, Metric
+from redis import RedisError
+
+from app.core.metrics import StatsCollector
+from app.core.redis import RedisClient
+
+
+class TTLCache[K, V]:
+    """
+    In-memory cache with a bounded size and per-entry expiration.
+
+    When full, the least recently used entry is evicted. Not thread-safe, meant to be used from the event loop.
+    """
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Maximum number of entries kept in the cache
+            ttl: Default time in seconds an entry stays valid
+        """
+        if max_size <= 0:
+            raise ValueError("Cache size must be positive")
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def get(self, key: K) -> V | None:
+        """
+        Get a value from the cache.
+
+        Returns:
+            Cached value, or None if missing or expired
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        """
+        Put a value into the cache, evicting the least recently used entry if full.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Time in seconds the entry stays valid, defaults to the cache TTL
+        """
+        self._entries[key] = (time.monotonic() + (ttl if ttl is not None else self.ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: K) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class CacheBackend(Protocol):
+    """Storage tier of a `TieredCache`. Values are serialized strings."""
+
+    name: str
+
+    async def get(self, key: str) -> str | None: ...
+
+    async def set(self, key: str, value: str, ttl: float) -> None: ...
+
+
+class MemoryCacheBackend:
+    """Bounded in-process tier, private to the worker."""
+
+    def __init__(self, max_size: int, max_ttl: float, name: str = "memory") -> None:
+        """
+        Initialize the tier.
+
+        Args:
+            max_size: Maximum number of entries kept in memory
+            max_ttl: Maximum seconds an entry is kept, bounds how long the worker lags behind shared tiers
+            name: Tier name in stats
+        """
+        self.name = name
+        self.max_ttl = max_ttl
+        self._cache: TTLCache[str, str] = TTLCache(max_size, max_ttl)
+
+    async def get(self, key: str) -> str | None:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        self._cache.set(key, value, ttl=min(ttl, self.max_ttl))
+
+
+class RedisCacheBackend:
+    """Tier shared by all workers. Redis failures are logged and count as misses."""
+
+    KEY_PREFIX: ClassVar[str] = "cache"
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, redis_client: RedisClient, name: str = "redis") -> None:
+        self.name = name
+        self.redis_client = redis_client
+
+    def _key(self, key: str) -> str:
+        return self.redis_client.get_full_key_name(f"{self.KEY_PREFIX}:{key}")
+
+    async def get(self, key: str) -> str | None:
+        try:
+            async with self.redis_client.get_client() as client:
+                value = await client.get(self._key(key))
+        except RedisError as e:
+            self.logger.warning("Cache read failed: %s", str(e))
+            return None
+        return value.decode() if isinstance(value, bytes) else value
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        try:
+            async with self.redis_client.get_client() as client:
+                await client.set(self._key(key), value, px=max(1, int(ttl * 1000)))
+        except RedisError as e:
+            self.logger.warning("Cache write failed: %s", str(e))
+
+
+@dataclass
+class CacheStats:
+    hits: dict[str, int] = field(default_factory=dict)
+    """Hits per tier name."""
+    misses: int = 0
+
+
+class CacheCollector(StatsCollector):
+    """Exports the `CacheStats` of a tiered cache, labelled by the cache name."""
+
+    def __init__(self, name: str, stats: CacheStats) -> None:
+        self.name = name
+        self.stats = stats
+
+    @override
+    def collect(self) -> Iterable[Metric]:
+        labels = {"cache": self.name, **self.labels}
+        hits = CounterMetricFamily("cache_hits", "Cache hits per tier", labels=[*labels, "tier"])
+        for tier, count in self.stats.hits.items():
+            hits.add_metric([*labels.values(), tier], count)
+        yield hits
+        misses = CounterMetricFamily("cache_misses", "Cache lookups no tier had a value for", labels=list(labels))
+        misses.add_metric(list(labels.values()), self.stats.misses)
+        yield misses
+
+
+class TieredCache:
+    """
+    Cache looking values up tier by tier, fastest first.
+
+    A hit in a slower tier fills the faster ones, writes go to every tier.
+    """
+
+    def __init__(self, *backends: CacheBackend, fill_ttl: float = 30.0) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            backends: Tiers, fastest first
+            fill_ttl: Seconds a value found in a slower tier is kept by the faster ones
+        """
+        if not backends:
+            raise ValueError("At least one cache backend is required")
+
+        self.backends = backends
+        self.fill_ttl = fill_ttl
+        self.stats = CacheStats()
+
+    async def get(self, key: str) -> str | None:
+        """
+        Get a value from the first tier that has it.
+
+        Returns:
+            Cached value, or None if no tier has it
+        """
+        for index, backend in enumerate(self.backends):
+            value = await backend.get(key)
+            if value is None:
+                continue
+
+            self.stats.hits[backend.name] = self.stats.hits.get(backend.name, 0) + 1
+            for faster in self.backends[:index]:
+                # Remaining TTL in the slower tier is unknown, so faster ones keep the value only briefly
+                await faster.set(key, value, self.fill_ttl)
+            return value
+
+        self.stats.misses += 1
+        return None
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        for backend in self.backends:
+            await backend.set(key, value, ttl)
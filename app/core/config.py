@@ -2,7 +2,7 @@ import logging
 from functools import lru_cache
 from os import environ
 from pathlib import Path
-from typing import ClassVar, override
+from typing import ClassVar, Literal, override
 
 from pydantic import BaseModel, Field, field_validator
 from pydantic_settings import (
@@ -81,6 +81,44 @@ class GeneralConfig(ConfigSection):
     description: str = Field(default="API для объединения множества серверов SS13 и SS14 в одну систему.")
     favicon_path: str = Field(default="app/assets/favicon.png")
     discord_webhook: str | None = Field(default=None)
+    bearer_cache_size: int = Field(default=1024)
+    """Maximum number of bearer token verification results kept in memory per worker."""
+    bearer_cache_ttl: float = Field(default=60.0)
+    """Seconds a valid bearer token is trusted without a database lookup, revoking it outside the app takes as long."""
+    bearer_cache_negative_ttl: float = Field(default=10.0)
+    """Seconds an invalid bearer token is rejected without a database lookup."""
+    whitelist_snapshot_ttl: float = Field(default=300.0)
+    """Seconds a cached whitelist snapshot is served at most. Bounds staleness if a version bump is lost."""
+    expiration_sweep_interval: float = Field(default=60.0, gt=0)
+    """Seconds between sweeps that expire rows and delete expired link tokens and old whitelist changes."""
+    expiration_sweep_batch_size: int = Field(default=500)
+    """Maximum number of rows the expiration sweeper changes per transaction."""
+    whitelist_change_retention: float = Field(default=7 * 24 * 3600.0)
+    """Seconds whitelist changes are kept for delta syncs. Older delta cursors get 410 and have to resync."""
+    server_timing: bool = Field(default=False)
+    """Whether responses carry a `Server-Timing` header with the time spent in the database, Redis and Discord."""
+    query_budget: int = Field(default=10)
+    """SQL statements a request may execute before a warning is logged, 0 disables counting."""
+    slow_request_threshold: float = Field(default=0.0)
+    """Seconds a request has to take to be kept by the slow request recorder, 0 disables recording."""
+    slow_request_buffer_size: int = Field(default=100)
+    """Number of latest slow requests kept in memory per worker."""
+    slow_request_dump: bool = Field(default=True)
+    """Whether slow requests are also logged as JSON lines, to `logs/slow.jsonl` with the default log config."""
+    slow_request_parameters: bool = Field(default=False)
+    """Whether slow requests keep bind parameters of their statements, which include secrets like token hashes."""
+    profiling_enabled: bool = Field(default=False)
+    """Whether `/debug/profile` may profile a running worker."""
+    profiling_max_seconds: float = Field(default=60.0)
+    """Longest profile `/debug/profile` takes."""
+    heap_diagnostics_enabled: bool = Field(default=False)
+    """Whether `/debug/heap` may trace allocations and walk the heap of a running worker."""
+    loop_monitor_interval: float = Field(default=0.1)
+    """Seconds between event loop lag measurements, 0 disables the monitor."""
+    loop_stall_threshold: float = Field(default=0.25)
+    """Event loop lag in seconds after which the blocking stack is logged."""
+    loop_stall_log_interval: float = Field(default=60.0)
+    """Minimum seconds between two logged event loop stalls."""
 
     @override
     @classmethod
@@ -108,6 +146,15 @@ class GeneralConfig(ConfigSection):
         return value
 
 
+ASYNC_DRIVERS: dict[str, str] = {
+    "postgresql": "asyncpg",
+    "mysql": "aiomysql",
+    "mariadb": "aiomysql",
+    "sqlite": "aiosqlite",
+}
+"""Async DBAPI driver used for each supported SQLAlchemy dialect."""
+
+
 class DatabaseConfig(ConfigSection):
     """Database connection configuration."""
 
@@ -116,6 +163,8 @@ class DatabaseConfig(ConfigSection):
     )
 
     engine: str = Field(default="postgresql+psycopg2")
+    async_engine: str | None = Field(default=None)
+    """Dialect and driver for the async engine. Derived from `engine` when not set."""
     name: str = Field(default="central")
     user: str = Field(default="root")
     password: str = Field(default="root")
@@ -126,11 +175,31 @@ class DatabaseConfig(ConfigSection):
     pool_recycle: int = Field(default=3600)
     pool_pre_ping: bool = Field(default=True)
     echo: bool = Field(default=False)
+    replicas: list[str] = Field(default_factory=list)
+    """SQLAlchemy connection strings of read replicas. Read-only requests are spread across them."""
+    replica_max_lag: float = Field(default=5.0)
+    """Replication lag in seconds after which a replica stops receiving reads."""
+    replica_check_interval: float = Field(default=10.0)
+    """Interval in seconds between replica lag checks."""
 
     def get_connection_string(self) -> str:
         """Generate a SQLAlchemy connection string from the config."""
         return f"{self.engine}://{self.user}:{self.password}@{self.host}:{self.port}/{self.name}"
 
+    def get_async_engine(self) -> str:
+        """Get the async dialect and driver, deriving it from the sync engine if not configured."""
+        if self.async_engine:
+            return self.async_engine
+
+        dialect = self.engine.split("+", 1)[0]
+        if dialect not in ASYNC_DRIVERS:
+            raise ValueError(f"No async driver known for database dialect '{dialect}'")
+        return f"{dialect}+{ASYNC_DRIVERS[dialect]}"
+
+    def get_async_connection_string(self) -> str:
+        """Generate a SQLAlchemy connection string for the async engine from the config."""
+        return f"{self.get_async_engine()}://{self.user}:{self.password}@{self.host}:{self.port}/{self.name}"
+
 
 class RedisConfig(ConfigSection):
     """Redis connection configuration."""
@@ -157,6 +226,33 @@ class OAuthConfig(ConfigSection):
     discord_server_id: str = Field(default="12345678")
     discord_server_invite: str = Field(default="https://discord.com/invite/12345678")
 
+    # Shared HTTP session to Discord
+    http_connection_limit: int = Field(default=100)
+    """Maximum number of simultaneous connections to Discord per worker."""
+    http_dns_cache_ttl: int = Field(default=300)
+    """Seconds resolved Discord addresses are cached."""
+    http_keepalive_timeout: float = Field(default=30.0)
+    """Seconds an idle connection to Discord is kept open for reuse."""
+    http_timeout: float = Field(default=10.0)
+    """Total timeout of a single request to Discord in seconds."""
+    discord_global_rate_limit: int = Field(default=50)
+    """Requests per second sent to Discord with one token per worker, 0 disables pacing and leaves it to 429s."""
+
+    link_token_backend: Literal["redis", "sql"] = Field(default="redis")
+    """Where ckey link tokens are kept. `sql` keeps them in the `ckey_link_token` table."""
+
+    # Discord API response cache
+    response_cache_ttl: float = Field(default=550.0)
+    """Seconds a Discord API response is cached, unless its route has its own TTL."""
+    response_cache_route_ttls: dict[str, float] = Field(
+        default_factory=lambda: {"/users/@me": 550.0, "/users/@me/guilds": 300.0, "/oauth2/@me": 60.0}
+    )
+    """Seconds responses of a route are cached, 0 disables caching of the route."""
+    response_cache_size: int = Field(default=1024)
+    """Maximum number of responses kept in memory per worker, in front of Redis."""
+    response_cache_local_ttl: float = Field(default=30.0)
+    """Maximum seconds a worker keeps a response in memory."""
+
 
 class AppConfig(BaseModel):
     """Application configuration root."""
@@ -1,16 +1,252 @@
+import asyncio
 import logging
-from collections.abc import Generator
-from contextlib import contextmanager
+import random
+import time
+from collections.abc import AsyncGenerator, Generator
+from contextlib import asynccontextmanager, contextmanager
 from functools import lru_cache
 from logging import Logger
-from typing import Any
-
-from sqlalchemy import Engine, Executable, Result, create_engine, text
+from typing import Any, override
+
+from sqlalchemy import (
+    ClauseElement,
+    CompoundSelect,
+    Connection,
+    Engine,
+    Executable,
+    Result,
+    Select,
+    create_engine,
+    make_url,
+    text,
+)
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Mapper, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, QueuePool
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import ASYNC_DRIVERS, DatabaseConfig, get_config
+from app.core.metrics import DB_POOL_CHECKED_OUT, DB_POOL_CHECKOUT_WAIT, DB_POOL_OVERFLOW
+
+
+POSTGRES_REPLICA_LAG_QUERY = (
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+MYSQL_REPLICA_LAG_QUERY = "SHOW REPLICA STATUS"
+
+
+def to_async_connection_string(connection_string: str) -> str:
+    """
+    Convert a synchronous SQLAlchemy connection string to one using the matching async driver.
+
+    Args:
+        connection_string: Synchronous SQLAlchemy connection string
+
+    Returns:
+        Connection string with the async driver of the same dialect
+
+    Raises:
+        ValueError: If no async driver is known for the dialect
+    """
+    url = make_url(connection_string)
+    dialect = url.get_backend_name()
+    if dialect not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver known for database dialect '{dialect}'")
+    return url.set(drivername=f"{dialect}+{ASYNC_DRIVERS[dialect]}").render_as_string(hide_password=False)
+
+
+class MeteredQueuePool(QueuePool):
+    """Queue pool reporting connection usage and checkout waits to metrics, labelled with its logging name."""
+
+    @property
+    def metrics_label(self) -> str:
+        return self._orig_logging_name or "default"
+
+    def _report_usage(self) -> None:
+        DB_POOL_CHECKED_OUT.labels(self.metrics_label).set(self.checkedout())
+        DB_POOL_OVERFLOW.labels(self.metrics_label).set(max(self.overflow(), 0))
+
+    @override
+    def _do_get(self) -> ConnectionPoolEntry:
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.labels(self.metrics_label).observe(time.perf_counter() - start)
+            self._report_usage()
+
+    @override
+    def _do_return_conn(self, record: ConnectionPoolEntry) -> None:
+        super()._do_return_conn(record)
+        self._report_usage()
+
+
+class MeteredAsyncAdaptedQueuePool(MeteredQueuePool, AsyncAdaptedQueuePool):
+    """Async engine counterpart of `MeteredQueuePool`."""
+
+
+class Replica:
+    """A read replica and its last measured replication lag."""
+
+    def __init__(self, connection_string: str, **engine_options: Any) -> None:  # noqa: ANN401
+        """
+        Initialize the replica.
+
+        Args:
+            connection_string: SQLAlchemy connection string of the replica
+            **engine_options: Options passed to the async engine on creation
+        """
+        self.connection_string = to_async_connection_string(connection_string)
+        self.engine_options = engine_options
+        self.lag: float | None = None
+        """Replication lag in seconds. None while unknown or if the replica is unreachable."""
+        self._engine: AsyncEngine | None = None
+
+    @property
+    def engine(self) -> AsyncEngine:
+        """Get the async engine of the replica, creating it if necessary."""
+        if self._engine is None:
+            self._engine = create_async_engine(self.connection_string, **self.engine_options)
+        return self._engine
+
+    async def measure_lag(self) -> float | None:
+        """
+        Query the replica for its replication lag.
+
+        Returns:
+            Lag in seconds, or None if replication is not running
+        """
+        async with self.engine.connect() as conn:
+            if conn.dialect.name == "postgresql":
+                return float((await conn.execute(text(POSTGRES_REPLICA_LAG_QUERY))).scalar_one() or 0)
+
+            if conn.dialect.name in {"mysql", "mariadb"}:
+                row = (await conn.execute(text(MYSQL_REPLICA_LAG_QUERY))).mappings().first()
+                if row is None:
+                    return 0.0
+                lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+                return None if lag is None else float(lag)
+
+            await conn.execute(text("SELECT 1"))
+            return 0.0
+
+    async def close(self) -> None:
+        """Close all connections to the replica."""
+        if self._engine is not None:
+            await self._engine.dispose()
+            self._engine = None
+
+
+class ReplicaRouter:
+    """
+    Keeps track of read replicas and picks one to serve reads.
+
+    A replica only receives reads while its last measured lag is within `max_lag`.
+    Until the first lag check, no replica is considered usable and all reads go to the primary.
+    """
+
+    logger: Logger = logging.getLogger(__name__)
+
+    def __init__(self, replicas: list[Replica], max_lag: float, check_interval: float) -> None:
+        """
+        Initialize the router.
+
+        Args:
+            replicas: Replicas to route reads to
+            max_lag: Replication lag in seconds after which a replica stops receiving reads
+            check_interval: Interval in seconds between lag checks in `monitor`
+        """
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+
+    def is_usable(self, replica: Replica) -> bool:
+        return replica.lag is not None and replica.lag <= self.max_lag
 
-from app.core.config import DatabaseConfig, get_config
+    def pick(self) -> Replica | None:
+        """
+        Pick a random usable replica.
+
+        Returns:
+            Replica to read from, or None if reads should go to the primary
+        """
+        usable = [replica for replica in self.replicas if self.is_usable(replica)]
+        return random.choice(usable) if usable else None
+
+    async def check_lag(self) -> None:
+        """Measure the lag of every replica and update its state."""
+        for replica in self.replicas:
+            was_usable = self.is_usable(replica)
+            try:
+                replica.lag = await asyncio.wait_for(replica.measure_lag(), timeout=self.check_interval)
+            except (SQLAlchemyError, OSError, TimeoutError) as e:
+                replica.lag = None
+                self.logger.debug("Replica lag check failed: %s", str(e))
+
+            if was_usable and not self.is_usable(replica):
+                self.logger.warning("Replica excluded from reads, lag: %s", replica.lag)
+            elif not was_usable and self.is_usable(replica):
+                self.logger.info("Replica included in reads, lag: %s", replica.lag)
+
+    async def monitor(self) -> None:
+        """Check replica lag every `check_interval` seconds until cancelled."""
+        while True:
+            await self.check_lag()
+            await asyncio.sleep(self.check_interval)
+
+    async def close(self) -> None:
+        """Close all replica connections."""
+        for replica in self.replicas:
+            await replica.close()
+
+
+class RoutingSession(Session):
+    """
+    Session that can send reads to a replica.
+
+    Replicas are only used when the session is created with `use_replica=True`, and only for plain selects.
+    As soon as the session flushes or runs anything else, it sticks to the primary,
+    so the rest of the session reads its own writes.
+    """
+
+    def __init__(
+        self,
+        *args: Any,  # noqa: ANN401
+        router: ReplicaRouter | None = None,
+        use_replica: bool = False,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.router = router
+        self.use_replica = use_replica and router is not None
+        self._replica: Replica | None = None
+
+    @override
+    def get_bind(
+        self,
+        mapper: Mapper[Any] | type[Any] | None = None,
+        *,
+        clause: ClauseElement | None = None,
+        bind: Engine | Connection | None = None,
+        **kw: Any,
+    ) -> Engine | Connection:
+        if bind is None and self.use_replica and self.router is not None:
+            if self._flushing or not self.is_read(clause):
+                self.use_replica = False
+            elif replica := self._replica or self.router.pick():
+                self._replica = replica
+                return replica.engine.sync_engine
+
+        return super().get_bind(mapper, clause=clause, bind=bind, **kw)
+
+    @staticmethod
+    def is_read(clause: ClauseElement | None) -> bool:
+        if isinstance(clause, Select):
+            return clause._for_update_arg is None  # pyright: ignore[reportPrivateUsage]
+        return isinstance(clause, CompoundSelect)
 
 
 class DatabaseClient:
@@ -19,6 +255,9 @@ class DatabaseClient:
 
     This class handles database connection management, session creation,
     and provides utility methods for both synchronous and asynchronous operations.
+
+    The asynchronous engine is used by the request handlers, while the synchronous one
+    is kept for alembic migrations and scripts.
     """
 
     logger: Logger = logging.getLogger(__name__)
@@ -27,11 +266,15 @@ class DatabaseClient:
         self,
         connection_string: str | None = None,
         config: DatabaseConfig | None = None,
+        async_connection_string: str | None = None,
+        replicas: list[str] | None = None,
         echo: bool | None = None,
         pool_size: int | None = None,
         max_overflow: int | None = None,
         pool_recycle: int | None = None,
         pool_pre_ping: bool | None = None,
+        replica_max_lag: float | None = None,
+        replica_check_interval: float | None = None,
     ) -> None:
         """
         Initialize the database client.
@@ -39,11 +282,16 @@ class DatabaseClient:
         Args:
             connection_string: SQLAlchemy connection string, if None will use the connection string from config
             config: Database configuration, if None will use the default config
+            async_connection_string: SQLAlchemy connection string for the async engine,
+                if None will be taken from config or derived from the sync connection string
+            replicas: SQLAlchemy connection strings of read replicas, if None will use value from config
             echo: Whether to echo SQL statements for debugging
             pool_size: Connection pool size, if None will use value from config
             max_overflow: Maximum overflow connections, if None will use value from config
             pool_recycle: Time (in seconds) before connections are recycled, if None will use value from config
             pool_pre_ping: Whether to enable connection pool pre-ping, if None will use value from config
+            replica_max_lag: Lag in seconds after which a replica stops receiving reads, if None will use config
+            replica_check_interval: Interval in seconds between replica lag checks, if None will use config
         """
         # Build connection string if not provided
         if connection_string is None and config is not None:
@@ -54,6 +302,11 @@ class DatabaseClient:
 
         self._connection_string = connection_string
 
+        if async_connection_string is None and config is not None:
+            async_connection_string = config.get_async_connection_string()
+
+        self._async_connection_string = async_connection_string
+
         # Set parameters with priority: explicit params > config > defaults
         self._pool_size = pool_size if pool_size is not None else (config.pool_size if config else 10)
         self._max_overflow = max_overflow if max_overflow is not None else (config.overflow if config else 5)
@@ -61,12 +314,37 @@ class DatabaseClient:
         self._pool_pre_ping = pool_pre_ping if pool_pre_ping is not None else (config.pool_pre_ping if config else True)
         self._echo = echo if echo is not None else (config.echo if config else False)
 
+        replicas = replicas if replicas is not None else (config.replicas if config else [])
+        self.replica_router = ReplicaRouter(
+            [
+                Replica(
+                    replica,
+                    poolclass=MeteredAsyncAdaptedQueuePool,
+                    pool_logging_name=f"replica{index}",
+                    echo=self._echo,
+                    pool_size=self._pool_size,
+                    max_overflow=self._max_overflow,
+                    pool_recycle=self._pool_recycle,
+                    pool_pre_ping=self._pool_pre_ping,
+                )
+                for index, replica in enumerate(replicas)
+            ],
+            max_lag=replica_max_lag if replica_max_lag is not None else (config.replica_max_lag if config else 5.0),
+            check_interval=replica_check_interval
+            if replica_check_interval is not None
+            else (config.replica_check_interval if config else 10.0),
+        )
+
         # Initialize engine as None, will be created on demand
         self._engine: Engine | None = None
 
         # Initialize session factory as None, will be created on demand
         self._session_factory: sessionmaker[Session] | None = None
 
+        # Async counterparts, created on demand as well
+        self._async_engine: AsyncEngine | None = None
+        self._async_session_factory: async_sessionmaker[AsyncSession] | None = None
+
         self.logger.debug("DatabaseClient initialized with connection string: %s", connection_string)
 
     @classmethod
@@ -91,6 +369,8 @@ class DatabaseClient:
         if self._engine is None:
             self._engine = create_engine(
                 self._connection_string,
+                poolclass=MeteredQueuePool,
+                pool_logging_name="sync",
                 echo=self._echo,
                 pool_size=self._pool_size,
                 max_overflow=self._max_overflow,
@@ -113,6 +393,55 @@ class DatabaseClient:
             self.logger.debug("Created synchronous session factory")
         return self._session_factory
 
+    @property
+    def async_engine(self) -> AsyncEngine:
+        """
+        Get the asynchronous SQLAlchemy engine, creating it if necessary.
+
+        Returns:
+            SQLAlchemy async engine
+        """
+        if self._async_engine is None:
+            if self._async_connection_string is None:
+                self._async_connection_string = to_async_connection_string(self._connection_string)
+
+            self._async_engine = create_async_engine(
+                self._async_connection_string,
+                poolclass=MeteredAsyncAdaptedQueuePool,
+                pool_logging_name="primary",
+                echo=self._echo,
+                pool_size=self._pool_size,
+                max_overflow=self._max_overflow,
+                pool_recycle=self._pool_recycle,
+                pool_pre_ping=self._pool_pre_ping,
+            )
+            self.logger.debug("Created asynchronous SQLAlchemy engine")
+        return self._async_engine
+
+    @property
+    def async_session_factory(self) -> async_sessionmaker[AsyncSession]:
+        """
+        Get the asynchronous session factory, creating it if necessary.
+
+        Objects are not expired on commit, as lazy loading expired attributes
+        is not possible without an explicit `await`.
+        Sessions are routing ones: pass `use_replica=True` to send their reads to a replica.
+
+        Returns:
+            SQLAlchemy async session factory
+        """
+        if self._async_session_factory is None:
+            self._async_session_factory = async_sessionmaker(
+                bind=self.async_engine,
+                class_=AsyncSession,
+                sync_session_class=RoutingSession,
+                router=self.replica_router,
+                autoflush=False,
+                expire_on_commit=False,
+            )
+            self.logger.debug("Created asynchronous session factory")
+        return self._async_session_factory
+
     @contextmanager
     def session(self) -> Generator[Session]:
         """
@@ -139,6 +468,32 @@ class DatabaseClient:
         finally:
             session.close()
 
+    @asynccontextmanager
+    async def async_session(self) -> AsyncGenerator[AsyncSession]:
+        """
+        Get an asynchronous database session.
+
+        Usage:
+        ```python
+        async with db_client.async_session() as session:
+            result = await session.exec(select(User).where(User.id == user_id))
+            user = result.first()
+        ```
+
+        Yields:
+            SQLAlchemy async session
+        """
+        session = self.async_session_factory()
+        try:
+            yield session
+            await session.commit()
+        except SQLAlchemyError as e:
+            await session.rollback()
+            self.logger.error("Database error: %s", str(e))
+            raise
+        finally:
+            await session.close()
+
     def execute(self, statement: Executable) -> Result[Any]:
         """
         Execute a SQL statement and return the result.
@@ -175,6 +530,15 @@ class DatabaseClient:
             self._engine = None
             self.logger.debug("Closed sync engine")
 
+    async def async_close(self) -> None:
+        """Close all asynchronous database connections."""
+        if self._async_engine is not None:
+            await self._async_engine.dispose()
+            self._async_engine = None
+            self._async_session_factory = None
+            self.logger.debug("Closed async engine")
+        await self.replica_router.close()
+
 
 @lru_cache(maxsize=1)
 def get_db_client() -> DatabaseClient:
@@ -0,0 +1,142 @@
+"""Memory diagnostics of a running worker, to find what keeps growing without attaching external tools."""
+
+import gc
+import itertools
+import tracemalloc
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+
+
+class TracingNotStartedError(Exception):
+    """Snapshots need allocations to be traced."""
+
+
+@dataclass
+class HeapStatus:
+    tracing: bool
+    traced_memory: int
+    """Bytes currently allocated by traced allocations."""
+    peak_traced_memory: int
+    snapshots: list[int]
+
+
+@dataclass
+class AllocationStat:
+    """Memory allocated at one line, and its change if compared to an earlier snapshot."""
+
+    file: str
+    line: int
+    size: int
+    count: int
+    size_diff: int = 0
+    count_diff: int = 0
+
+
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(inclusive=False, filename_pattern=tracemalloc.__file__),
+    tracemalloc.Filter(inclusive=False, filename_pattern="<frozen importlib._bootstrap*>"),
+    tracemalloc.Filter(inclusive=False, filename_pattern="<unknown>"),
+)
+
+
+class HeapDiagnostics:
+    """Allocation tracing and snapshots of the worker, keeping the latest few snapshots for comparison."""
+
+    def __init__(self, max_snapshots: int = 5) -> None:
+        """
+        Initialize the diagnostics.
+
+        Args:
+            max_snapshots: Number of latest snapshots kept
+        """
+        self.max_snapshots = max_snapshots
+        self.snapshots: OrderedDict[int, tracemalloc.Snapshot] = OrderedDict()
+        self._ids = itertools.count(1)
+
+    def status(self) -> HeapStatus:
+        current, peak = tracemalloc.get_traced_memory()
+        return HeapStatus(tracemalloc.is_tracing(), current, peak, list(self.snapshots))
+
+    def start(self, frames: int = 1) -> None:
+        """Start tracing allocations, keeping `frames` frames of the stack that made each one."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self) -> None:
+        """Stop tracing and drop the traces. Taken snapshots are kept."""
+        tracemalloc.stop()
+
+    def take_snapshot(self) -> int:
+        """
+        Snapshot the traced allocations.
+
+        Returns:
+            Snapshot id
+
+        Raises:
+            TracingNotStartedError: If allocations are not traced
+        """
+        if not tracemalloc.is_tracing():
+            raise TracingNotStartedError
+        snapshot_id = next(self._ids)
+        self.snapshots[snapshot_id] = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        while len(self.snapshots) > self.max_snapshots:
+            self.snapshots.popitem(last=False)
+        return snapshot_id
+
+    def top(self, snapshot_id: int, limit: int = 20) -> list[AllocationStat]:
+        """
+        Get the lines that allocated the most memory alive in a snapshot.
+
+        Raises:
+            KeyError: If the snapshot is unknown
+        """
+        return [
+            AllocationStat(stat.traceback[0].filename, stat.traceback[0].lineno, stat.size, stat.count)
+            for stat in self.snapshots[snapshot_id].statistics("lineno")[:limit]
+        ]
+
+    def diff(self, first_id: int, second_id: int, limit: int = 20) -> list[AllocationStat]:
+        """
+        Get the lines whose allocated memory changed the most from the first snapshot to the second.
+
+        Raises:
+            KeyError: If a snapshot is unknown
+        """
+        return [
+            AllocationStat(
+                stat.traceback[0].filename,
+                stat.traceback[0].lineno,
+                stat.size,
+                stat.count,
+                stat.size_diff,
+                stat.count_diff,
+            )
+            for stat in self.snapshots[second_id].compare_to(self.snapshots[first_id], "lineno")[:limit]
+        ]
+
+
+def count_app_objects(prefix: str = "app.") -> dict[str, int]:
+    """
+    Count live objects of the app's own types, e.g. models, schemas and cache entries.
+
+    Args:
+        prefix: Module prefix of the types counted
+
+    Returns:
+        Number of objects by qualified type name, most common first
+    """
+    counts: Counter[str] = Counter()
+    for obj in gc.get_objects():
+        cls: type = type(obj)
+        # Not always a string, e.g. None for some classes made at runtime
+        module = cls.__module__
+        if isinstance(module, str) and module.startswith(prefix):  # pyright: ignore[reportUnnecessaryIsInstance]
+            counts[f"{module}.{cls.__qualname__}"] += 1
+    return dict(counts.most_common())
+
+
+@lru_cache(maxsize=1)
+def get_heap_diagnostics() -> HeapDiagnostics:
+    return HeapDiagnostics()
@@ -0,0 +1,213 @@
+from datetime import timedelta
+from secrets import token_urlsafe
+from typing import Annotated, Any, ClassVar, Protocol, cast
+
+from fastapi import Depends
+from sqlalchemy import CursorResult
+from sqlmodel import col, delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import get_config
+from app.core.redis import RedisClient, default_client
+from app.core.utils import utcnow2
+from app.database.models import DEFAULT_TOKEN_EXPIRATION_TIME, DEFAULT_TOKEN_LEN, CkeyLinkToken
+from app.deps import AsyncSessionDep
+
+
+class LinkTokenStore(Protocol):
+    """Short-lived tokens linking a ckey to the Discord account that completes the OAuth flow with it."""
+
+    async def get_or_create(self, ckey: str) -> str:
+        """Get the valid token of a ckey, or create one if it has none."""
+        ...
+
+    async def get_ckey(self, token: str) -> str | None:
+        """
+        Get the ckey of a token.
+
+        Returns:
+            Ckey, or None if the token is wrong or expired
+        """
+        ...
+
+    async def claim(self, token: str) -> str | None:
+        """
+        Get the ckey of a token and invalidate the token at once, only one of concurrent callers gets the ckey.
+
+        The SQL store stages the deletion in the caller's transaction, so a rollback restores the token.
+
+        Returns:
+            Ckey, or None if the token is wrong, expired or already claimed
+        """
+        ...
+
+    async def restore(self, token: str, ckey: str) -> None:
+        """Make a claimed token valid again, as the link it was claimed for was not stored."""
+        ...
+
+    async def revoke(self, token: str, ckey: str) -> None:
+        """Forget a claimed token once its link is stored, so the ckey gets a new one if asked again."""
+        ...
+
+
+class RedisLinkTokenStore:
+    """
+    Link tokens as a pair of Redis keys, ckey to token and token to ckey, expiring on their own.
+
+    Getting or creating a token is one round trip of a Lua script, which writes both keys atomically.
+    """
+
+    CKEY_KEY: ClassVar[str] = "link_token:ckey"
+    TOKEN_KEY: ClassVar[str] = "link_token:token"
+    GET_OR_CREATE_SCRIPT: ClassVar[str] = """
+        local token = redis.call('GET', KEYS[1])
+        if token then
+            return token
+        end
+        redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[3])
+        redis.call('SET', KEYS[2], ARGV[2], 'PX', ARGV[3])
+        return ARGV[1]
+    """
+
+    def __init__(self, redis_client: RedisClient, ttl: timedelta = DEFAULT_TOKEN_EXPIRATION_TIME) -> None:
+        """
+        Initialize the store.
+
+        Args:
+            redis_client: Redis client to keep tokens in
+            ttl: Time a token stays valid
+        """
+        self.redis_client = redis_client
+        self.ttl = ttl
+
+    def _ckey_key(self, ckey: str) -> str:
+        return self.redis_client.get_full_key_name(f"{self.CKEY_KEY}:{ckey}")
+
+    def _token_key(self, token: str) -> str:
+        return self.redis_client.get_full_key_name(f"{self.TOKEN_KEY}:{token}")
+
+    async def get_or_create(self, ckey: str) -> str:
+        """
+        Get the valid token of a ckey, or create one if it has none.
+
+        Raises:
+            RedisError: If there's an issue with Redis communication
+        """
+        ttl_ms = int(self.ttl.total_seconds() * 1000)
+        # Used only if the ckey has no token yet
+        new_token = token_urlsafe(DEFAULT_TOKEN_LEN)
+        async with self.redis_client.get_client() as client:
+            get_or_create = client.register_script(self.GET_OR_CREATE_SCRIPT)
+            token = cast(
+                bytes,
+                await get_or_create(
+                    keys=[self._ckey_key(ckey), self._token_key(new_token)], args=[new_token, ckey, ttl_ms]
+                ),
+            )
+        return token.decode()
+
+    async def get_ckey(self, token: str) -> str | None:
+        """
+        Get the ckey of a token.
+
+        Raises:
+            RedisError: If there's an issue with Redis communication
+        """
+        async with self.redis_client.get_client() as client:
+            ckey = await client.get(self._token_key(token))
+        return ckey.decode() if ckey is not None else None
+
+    async def claim(self, token: str) -> str | None:
+        """
+        Get the ckey of a token and delete the token key with `GETDEL`, so only one caller gets the ckey.
+
+        The ckey key is kept until `revoke`, its expiration tells how long a restored token stays valid.
+
+        Raises:
+            RedisError: If there's an issue with Redis communication
+        """
+        async with self.redis_client.get_client() as client:
+            ckey = await client.getdel(self._token_key(token))
+        return ckey.decode() if ckey is not None else None
+
+    async def restore(self, token: str, ckey: str) -> None:
+        """
+        Set the token key again for the rest of the token's lifetime, unless the token expired meanwhile.
+
+        Raises:
+            RedisError: If there's an issue with Redis communication
+        """
+        async with self.redis_client.get_client() as client:
+            if await client.get(self._ckey_key(ckey)) != token.encode():
+                return
+            ttl_ms = await client.pttl(self._ckey_key(ckey))
+            await client.set(self._token_key(token), ckey, px=ttl_ms if ttl_ms > 0 else None)
+
+    async def revoke(self, token: str, ckey: str) -> None:
+        """
+        Delete the ckey key, unless the ckey already has a newer token.
+
+        Raises:
+            RedisError: If there's an issue with Redis communication
+        """
+        async with self.redis_client.get_client() as client:
+            if await client.get(self._ckey_key(ckey)) == token.encode():
+                await client.delete(self._ckey_key(ckey))
+
+
+class SqlLinkTokenStore:
+    """Link tokens as `CkeyLinkToken` rows. Expired rows are deleted by the expiration sweeper."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def get_or_create(self, ckey: str) -> str:
+        token_entry = (await self.session.exec(select(CkeyLinkToken).where(CkeyLinkToken.ckey == ckey))).first()
+        if token_entry is not None:
+            if token_entry.expiration_time >= utcnow2():
+                return token_entry.token
+            await self.session.delete(token_entry)
+            # The ckey is unique, so the expired row has to be gone before the new one is inserted
+            await self.session.flush()
+
+        token_entry = CkeyLinkToken(ckey=ckey)
+        self.session.add(token_entry)
+        await self.session.commit()
+        return token_entry.token
+
+    async def get_ckey(self, token: str) -> str | None:
+        return (
+            await self.session.exec(
+                select(CkeyLinkToken.ckey)
+                .where(CkeyLinkToken.token == token)
+                .where(CkeyLinkToken.expiration_time > utcnow2())
+            )
+        ).first()
+
+    async def claim(self, token: str) -> str | None:
+        ckey = await self.get_ckey(token)
+        if ckey is None:
+            return None
+        result = cast(
+            CursorResult[Any],
+            await self.session.execute(delete(CkeyLinkToken).where(col(CkeyLinkToken.token) == token)),  # pyright: ignore[reportDeprecated]
+        )
+        # The row lock makes a concurrent claim wait for this transaction, then find nothing left to delete
+        return ckey if result.rowcount else None
+
+    async def restore(self, token: str, ckey: str) -> None:  # noqa: ARG002  # pyright: ignore[reportUnusedParameter]
+        # Undoes the staged deletion along with whatever else failed
+        await self.session.rollback()
+
+    async def revoke(self, token: str, ckey: str) -> None:  # pyright: ignore[reportUnusedParameter]
+        # Deleted by the claim, in the transaction that stored the link
+        pass
+
+
+def get_link_token_store(session: AsyncSessionDep) -> LinkTokenStore:
+    if get_config().oauth.link_token_backend == "sql":
+        return SqlLinkTokenStore(session)
+    return RedisLinkTokenStore(default_client())
+
+
+LinkTokenStoreDep = Annotated[LinkTokenStore, Depends(get_link_token_store)]
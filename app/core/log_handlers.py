@@ -1,24 +1,146 @@
 import asyncio
+import atexit
+import contextlib
+import copy
 import logging
+import logging.handlers
+import queue
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass
 from datetime import UTC, datetime
 from typing import ClassVar, Self, override
 
+import aiohttp
 from discord import Color, Embed, Webhook
 
 from app.core.config import get_config
 
 
+type Fingerprint = tuple[str, int, str, str | None, str]
+
+
+@dataclass
+class Occurrences:
+    """Occurrences of one fingerprint within the current window."""
+
+    sample: logging.LogRecord
+    """First record of the fingerprint, summaries are made from it."""
+    window_end: float
+    suppressed: int = 0
+
+
+class DuplicateSuppressor:
+    """
+    Suppresses repeats of a log record within a window, counting them for a summary instead.
+
+    Records are grouped by fingerprint: logger name, level, message template, and the exception type and
+    location if any. Thread-safe, the table of fingerprints is bounded.
+    """
+
+    def __init__(self, window: float, max_size: int) -> None:
+        """
+        Initialize the suppressor.
+
+        Args:
+            window: Seconds repeats are counted before a summary, 0 disables suppression
+            max_size: Maximum number of fingerprints tracked, the oldest are summarised early when full
+        """
+        self.window = window
+        self.max_size = max_size
+        self._occurrences: OrderedDict[Fingerprint, Occurrences] = OrderedDict()
+        self._evicted: list[Occurrences] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(record: logging.LogRecord) -> Fingerprint:
+        location = f"{record.pathname}:{record.lineno}"
+        exc_type = None
+        if record.exc_info and record.exc_info[0] is not None:
+            exc_type = record.exc_info[0].__qualname__
+            if (tb := record.exc_info[2]) is not None:
+                while tb.tb_next is not None:
+                    tb = tb.tb_next
+                location = f"{tb.tb_frame.f_code.co_filename}:{tb.tb_lineno}"
+        return record.name, record.levelno, str(record.msg), exc_type, location
+
+    def admit(self, record: logging.LogRecord) -> bool:
+        """
+        Count a record.
+
+        Returns:
+            True if it is the first of its fingerprint within the window and should be sent
+        """
+        if self.window <= 0:
+            return True
+
+        fingerprint = self.fingerprint(record)
+        now = time.monotonic()
+        with self._lock:
+            occurrences = self._occurrences.get(fingerprint)
+            if occurrences is not None and now < occurrences.window_end:
+                occurrences.suppressed += 1
+                return False
+
+            if occurrences is not None and occurrences.suppressed:
+                self._evicted.append(occurrences)
+            # Keeping the traceback would keep its frames alive
+            sample = copy.copy(record)
+            sample.exc_info = None
+            self._occurrences[fingerprint] = Occurrences(sample, now + self.window)
+            self._occurrences.move_to_end(fingerprint)
+            while len(self._occurrences) > self.max_size:
+                _, oldest = self._occurrences.popitem(last=False)
+                if oldest.suppressed:
+                    self._evicted.append(oldest)
+            return True
+
+    def take_summaries(self) -> list[tuple[logging.LogRecord, int]]:
+        """
+        Take the counts of windows that ended.
+
+        Fingerprints still repeating start a new window, so they are summarised periodically.
+
+        Returns:
+            First record and number of suppressed repeats, per fingerprint
+        """
+        now = time.monotonic()
+        with self._lock:
+            summaries = [(occurrences.sample, occurrences.suppressed) for occurrences in self._evicted]
+            self._evicted.clear()
+            for fingerprint, occurrences in list(self._occurrences.items()):
+                if now < occurrences.window_end:
+                    continue
+                if occurrences.suppressed:
+                    summaries.append((occurrences.sample, occurrences.suppressed))
+                    occurrences.suppressed = 0
+                    occurrences.window_end = now + self.window
+                else:
+                    del self._occurrences[fingerprint]
+        return summaries
+
+
 class DiscordWebhookHandler(logging.Handler):
     """
-    A synchronous logging handler that sends logs to a Discord webhook.
+    A logging handler that sends logs to a Discord webhook from a background thread.
 
-    This is a simpler version that uses blocking HTTP requests.
-    For production use, consider using AsyncDiscordWebhookHandler instead.
+    Records are formatted in the logging thread and queued, `emit` never waits for Discord.
+    Records arriving within `batch_window` seconds are sent together, up to 10 embeds per message.
+    If the queue is full, records are dropped and their count is reported with the next batch.
+    Repeats of a record within `suppress_window` seconds are not sent, but counted and summarised.
+    Discord rate limits are respected by the webhook client, which waits out 429s and exhausted buckets.
     """
 
     MAX_EMBED_DESCRIPTION: ClassVar[int] = 4096  # Discord's maximum embed description length
     MAX_CONTENT_LENGTH: ClassVar[int] = 2000  # Discord's maximum message content length
+    MAX_EMBEDS: ClassVar[int] = 10  # Discord's maximum number of embeds per message
+    MAX_EMBEDS_LENGTH: ClassVar[int] = 6000  # Discord's maximum total length of embeds in a message
     DECORATORS_LEN: ClassVar[int] = 8  # Characters taken by ` and \n
+    MAX_BATCH_SIZE: ClassVar[int] = 100
+    CLOSE_TIMEOUT: ClassVar[float] = 5.0
+    FLUSH_POLL_INTERVAL: ClassVar[float] = 0.1
 
     COLOR_MAP: ClassVar[dict[int, Color]] = {
         logging.NOTSET: Color.default(),
@@ -29,15 +151,33 @@ class DiscordWebhookHandler(logging.Handler):
         logging.CRITICAL: Color.red(),
     }
 
-    def __init__(self, webhook_url: str) -> None:
+    def __init__(
+        self,
+        webhook_url: str,
+        queue_size: int = 1000,
+        batch_window: float = 2.0,
+        suppress_window: float = 60.0,
+        max_fingerprints: int = 256,
+    ) -> None:
         """
         Initialize the Discord webhook handler.
 
         Args:
             webhook_url: The Discord webhook URL to send logs to
+            queue_size: Maximum number of records waiting to be sent, more are dropped
+            batch_window: Seconds to wait for more records before sending a batch
+            suppress_window: Seconds repeats of a record are counted before a summary is sent
+            max_fingerprints: Maximum number of distinct records tracked for suppression
         """
         super().__init__()
         self.webhook_url: str = webhook_url
+        self.batch_window = batch_window
+        self.suppressor = DuplicateSuppressor(suppress_window, max_fingerprints)
+        self.dropped = 0
+        self._queue: queue.Queue[logging.LogRecord | None] = queue.Queue(queue_size)
+        self._dropped_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
 
     @classmethod
     def from_config(cls) -> Self:
@@ -62,34 +202,159 @@ class DiscordWebhookHandler(logging.Handler):
             f"- {record.funcName}:{record.lineno}"
         )
 
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Format the record in the logging thread, as its arguments may change before it is sent."""
+        record = copy.copy(record)
+        record.message = self.format(record)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        record.exc_text = None
+        return record
+
     @override
     def emit(self, record: logging.LogRecord) -> None:
-        """Send the log record to the Discord webhook as an embed or plain text if too large."""
+        """Queue the log record to be sent, or count it as dropped if the queue is full."""
+        if self._thread is not None and record.thread == self._thread.ident:
+            # Logged while sending, e.g. rate limit warnings of the webhook client, would never stop.
+            # Compared by the thread that logged it, as a `QueueFanoutHandler` emits from its own thread
+            return
+
         try:
-            formatted_message = self.format(record)
+            if not self.suppressor.admit(record):
+                return
+            self._start_worker()
+            self._queue.put_nowait(self.prepare(record))
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+        except Exception:
+            self.handleError(record)
+
+    @override
+    def flush(self) -> None:
+        """Wait until every queued record is sent, or the worker is gone."""
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks and self._thread is not None and self._thread.is_alive():
+                self._queue.all_tasks_done.wait(self.FLUSH_POLL_INTERVAL)
+
+    @override
+    def close(self) -> None:
+        """Send queued records and stop the worker, waiting at most `CLOSE_TIMEOUT` seconds."""
+        if self._thread is not None and self._thread.is_alive():
+            with contextlib.suppress(queue.Full):
+                self._queue.put(None, timeout=self.CLOSE_TIMEOUT)
+            self._thread.join(self.CLOSE_TIMEOUT)
+        super().close()
+
+    def _start_worker(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="discord-webhook-log", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        asyncio.run(self._worker())
+
+    async def _worker(self) -> None:
+        async with aiohttp.ClientSession() as session:
+            webhook = Webhook.from_url(self.webhook_url, session=session)
+            while True:
+                # The event loop is private to this thread, so blocking it only delays the next batch
+                batch = self._next_batch()
+                records = [record for record in batch if record is not None]
+                records.extend(self._make_summary(sample, count) for sample, count in self.suppressor.take_summaries())
+                try:
+                    await self._send_batch(webhook, records)
+                except Exception:
+                    self.handleError(records[0] if records else logging.makeLogRecord({}))
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+                if None in batch:
+                    return
+
+    def _next_batch(self) -> list[logging.LogRecord | None]:
+        """
+        Wait for a record, then collect the ones arriving within the batch window.
 
-            if len(formatted_message) > self.MAX_EMBED_DESCRIPTION:
-                self._send_as_content(record, formatted_message)
+        Returns an empty batch if none arrives within the suppression window, so summaries are still sent.
+        """
+        try:
+            batch = [self._queue.get(timeout=self.suppressor.window if self.suppressor.window > 0 else None)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.batch_window
+        while batch[-1] is not None and len(batch) < self.MAX_BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _make_summary(self, sample: logging.LogRecord, count: int) -> logging.LogRecord:
+        summary = copy.copy(sample)
+        summary.created = time.time()
+        first_line = sample.getMessage().partition("\n")[0]
+        summary.message = summary.msg = f"×{count} more in the last {self.suppressor.window:g}s: {first_line}"  # noqa: RUF001
+        summary.args = None
+        return summary
+
+    def _take_dropped(self) -> int:
+        with self._dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+        return dropped
+
+    async def _send_batch(self, webhook: Webhook, records: list[logging.LogRecord]) -> None:
+        """Send records as embeds packed into as few messages as possible, keeping their order."""
+        embeds: list[Embed] = []
+        if dropped := self._take_dropped():
+            embeds.append(
+                Embed(
+                    title=__name__,
+                    description=f"{dropped} log records were dropped, the queue was full",
+                    color=Color.orange(),
+                )
+            )
+
+        for record in records:
+            if len(record.message) > self.MAX_EMBED_DESCRIPTION:
+                await self._send_embeds(webhook, embeds)
+                embeds = []
+                await self._send_as_content(webhook, record, record.message)
             else:
-                self._send_as_embed(record, formatted_message)
+                embeds.append(self._make_embed(record, record.message))
 
-        except Exception:
-            self.handleError(record)
+        await self._send_embeds(webhook, embeds)
 
-    def _send_as_embed(self, record: logging.LogRecord, formatted_message: str) -> None:
-        """Send log record as a rich embed."""
+    def _make_embed(self, record: logging.LogRecord, formatted_message: str) -> Embed:
+        """Make a rich embed of a log record."""
         embed = Embed(title=record.name, description=formatted_message, color=self.COLOR_MAP.get(record.levelno))
         embed.set_footer(text=self.format_footer(record))
+        return embed
 
-        webhook = Webhook.from_url(self.webhook_url)
-        asyncio.run(webhook.send(embed=embed))
+    async def _send_embeds(self, webhook: Webhook, embeds: list[Embed]) -> None:
+        message: list[Embed] = []
+        length = 0
+        for embed in embeds:
+            if message and (len(message) == self.MAX_EMBEDS or length + len(embed) > self.MAX_EMBEDS_LENGTH):
+                await webhook.send(embeds=message)
+                message, length = [], 0
+            message.append(embed)
+            length += len(embed)
 
-    def _send_as_content(self, record: logging.LogRecord, formatted_message: str) -> None:
-        """Send long log record as split plain text messages."""
-        webhook = Webhook.from_url(self.webhook_url)
+        if message:
+            await webhook.send(embeds=message)
 
+    async def _send_as_content(self, webhook: Webhook, record: logging.LogRecord, formatted_message: str) -> None:
+        """Send long log record as split plain text messages."""
         base_content = f"[{record.levelname}] {self.format_footer(record)} - {record.name}:\n"
-        asyncio.run(webhook.send(content=base_content))
+        await webhook.send(content=base_content)
 
         available_length = self.MAX_CONTENT_LENGTH - self.DECORATORS_LEN
         lines = formatted_message.splitlines()
@@ -112,4 +377,100 @@ class DiscordWebhookHandler(logging.Handler):
 
         for chunk in chunks:
             content = f"```\n{chunk}\n```"
-            asyncio.run(webhook.send(content=content[: self.MAX_CONTENT_LENGTH]))
+            await webhook.send(content=content[: self.MAX_CONTENT_LENGTH])
+
+
+class LogDispatcher:
+    """
+    Thread passing queued records to handlers, shared by every `QueueFanoutHandler` of the process.
+
+    Started on the first record, so it runs in the process that logs, not in the one that configured logging.
+    """
+
+    def __init__(self) -> None:
+        self._queue: queue.SimpleQueue[
+            tuple[logging.LogRecord, logging.handlers.QueueListener] | threading.Event | None
+        ] = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def put(self, record: logging.LogRecord, listener: logging.handlers.QueueListener) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._start()
+        self._queue.put((record, listener))
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="log-dispatcher", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while (item := self._queue.get()) is not None:
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            record, listener = item
+            listener.handle(record)
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Wait until records queued so far are handled."""
+        if self._thread is None or not self._thread.is_alive() or threading.current_thread() is self._thread:
+            return
+        handled = threading.Event()
+        self._queue.put(handled)
+        handled.wait(timeout)
+
+    def stop(self) -> None:
+        """Handle queued records and stop the thread. Called at exit, before handlers are closed."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+
+log_dispatcher = LogDispatcher()
+atexit.register(log_dispatcher.stop)
+
+
+class QueueFanoutHandler(logging.handlers.QueueHandler):
+    """
+    A logging handler that only queues records, the shared `LogDispatcher` thread passes them to its handlers.
+
+    Configured like a `QueueHandler` in `dictConfig`, with the names of the target handlers in `handlers`
+    and `respect_handler_level: true` to keep their levels. Unlike a `QueueHandler`, all instances share one
+    thread, and records are formatted lazily there. Mutable arguments are read when the record is handled.
+    """
+
+    FLUSH_TIMEOUT: ClassVar[float] = 5.0
+
+    def __init__(
+        self,
+        log_queue: queue.Queue[logging.LogRecord] | None = None,
+        handlers: Sequence[logging.Handler] = (),
+        respect_handler_level: bool = True,
+    ) -> None:
+        """
+        Initialize the handler.
+
+        Args:
+            log_queue: Unused, records go to the shared dispatcher. Accepted as `dictConfig` passes one
+            handlers: Handlers to pass records to. `dictConfig` sets them on `listener` instead
+            respect_handler_level: Pass records only to handlers whose level they reach
+        """
+        super().__init__(log_queue or queue.Queue())
+        self.listener = logging.handlers.QueueListener(
+            self.queue, *handlers, respect_handler_level=respect_handler_level
+        )
+
+    @override
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    @override
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.listener is not None:
+            log_dispatcher.put(record, self.listener)
+
+    @override
+    def flush(self) -> None:
+        log_dispatcher.flush(self.FLUSH_TIMEOUT)
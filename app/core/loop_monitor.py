@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from types import FrameType
+from typing import Self
+
+from app.core.config import get_config
+from app.core.metrics import EVENT_LOOP_LAG, EVENT_LOOP_STALLS
+
+
+class EventLoopMonitor:
+    """
+    Measures how late the event loop runs scheduled callbacks, and reports what blocks it.
+
+    A task wakes up every `interval` and records how late it woke up. A watchdog thread notices when it is overdue
+    by more than `stall_threshold` while the loop is still blocked, and logs the stack of the event loop thread.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, interval: float, stall_threshold: float, log_interval: float) -> None:
+        """
+        Initialize the monitor.
+
+        Args:
+            interval: Seconds between lag measurements
+            stall_threshold: Lag in seconds after which the blocking stack is logged
+            log_interval: Minimum seconds between two logged stalls, stalls in between are only counted
+        """
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.log_interval = log_interval
+        self.stalls = 0
+        self._heartbeat = time.monotonic()
+        self._last_logged = float("-inf")
+        self._unlogged_stalls = 0
+
+    @classmethod
+    def from_config(cls) -> Self:
+        config = get_config().general
+        return cls(config.loop_monitor_interval, config.loop_stall_threshold, config.loop_stall_log_interval)
+
+    async def run(self) -> None:
+        """Measure the lag of the running loop until cancelled."""
+        stop = threading.Event()
+        watchdog = threading.Thread(
+            target=self._watch, args=(threading.get_ident(), stop), name="event-loop-watchdog", daemon=True
+        )
+        self._heartbeat = time.monotonic()
+        watchdog.start()
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                now = time.monotonic()
+                EVENT_LOOP_LAG.observe(max(now - self._heartbeat - self.interval, 0))
+                self._heartbeat = now
+        finally:
+            stop.set()
+
+    def _watch(self, loop_thread_id: int, stop: threading.Event) -> None:
+        stalled = False
+        while not stop.wait(self.stall_threshold / 2):
+            lag = time.monotonic() - self._heartbeat - self.interval
+            if lag < self.stall_threshold:
+                stalled = False
+            elif not stalled:
+                # Reported once per stall, while the loop is still in the blocking call
+                stalled = True
+                self._report_stall(lag, sys._current_frames().get(loop_thread_id))  # pyright: ignore[reportPrivateUsage]
+
+    def _report_stall(self, lag: float, frame: FrameType | None) -> None:
+        self.stalls += 1
+        EVENT_LOOP_STALLS.inc()
+        now = time.monotonic()
+        if now - self._last_logged < self.log_interval:
+            self._unlogged_stalls += 1
+            return
+
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else "unknown\n"
+        self.logger.warning(
+            "Event loop blocked for over %.3f seconds, %d more stalls since the last report. Blocked at:\n%s",
+            lag,
+            self._unlogged_stalls,
+            stack,
+        )
+        self._last_logged = now
+        self._unlogged_stalls = 0
@@ -0,0 +1,172 @@
+"""
+Prometheus metrics of the API and the services it talks to.
+
+With several worker processes, set `PROMETHEUS_MULTIPROC_DIR` to an empty directory shared by the workers before
+they start. Each worker then writes its samples there and `/metrics` reports them summed across all workers.
+"""
+
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+UNMATCHED_ROUTE = "<unmatched>"
+"""Route label of requests that matched no route, so unknown paths do not create new series."""
+KNOWN_METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "CONNECT", "TRACE"))
+OTHER_METHOD = "OTHER"
+"""Method label of requests with any other method, so made up methods do not create new series."""
+
+REQUESTS = Counter("http_requests", "HTTP requests handled", ["method", "route", "status"])
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time to handle an HTTP request", ["method", "route", "status"]
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests being handled", ["method"], multiprocess_mode="livesum"
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections", "Connections checked out of the pool", ["pool"], multiprocess_mode="livesum"
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections", "Connections open beyond the pool size", ["pool"], multiprocess_mode="livesum"
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time to get a connection from the pool",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+REDIS_PUBLISH_DURATION = Histogram(
+    "redis_publish_duration_seconds",
+    "Time to publish a message to Redis",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+REDIS_ERRORS = Counter("redis_errors", "Failed Redis operations", ["operation"])
+
+DISCORD_REQUEST_DURATION = Histogram(
+    "discord_request_duration_seconds", "Time of a request to the Discord API", ["route", "status"]
+)
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "Delay of scheduled callbacks of the event loop",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+EVENT_LOOP_STALLS = Counter("event_loop_stalls", "Times the event loop was blocked over the stall threshold")
+
+DISCORD_RATE_LIMITED = Counter("discord_rate_limited", "429 responses from the Discord API", ["route"])
+
+
+def is_multiprocess() -> bool:
+    return MULTIPROC_DIR_ENV in os.environ
+
+
+class StatsCollector(Collector):
+    """
+    Exports stats kept in memory by the worker, read when scraped.
+
+    With several worker processes, samples get a `pid` label, as the stats of one worker cannot be summed
+    with those of the others.
+    """
+
+    @property
+    def labels(self) -> dict[str, str]:
+        # Read when scraped, the collector may be made before the worker is forked
+        return {"pid": str(os.getpid())} if is_multiprocess() else {}
+
+    def counter(self, name: str, documentation: str, value: float) -> CounterMetricFamily:
+        labels = self.labels
+        family = CounterMetricFamily(name, documentation, labels=list(labels))
+        family.add_metric(list(labels.values()), value)
+        return family
+
+    def gauge(self, name: str, documentation: str, value: float) -> GaugeMetricFamily:
+        labels = self.labels
+        family = GaugeMetricFamily(name, documentation, labels=list(labels))
+        family.add_metric(list(labels.values()), value)
+        return family
+
+
+stats_collectors: list[Collector] = []
+"""Collectors of in-memory stats, also exported by the per-scrape registry of multiprocess mode."""
+
+
+def register_stats_collector(collector: Collector) -> None:
+    """Export a collector of in-memory stats with the other metrics."""
+    REGISTRY.register(collector)
+    stats_collectors.append(collector)
+
+
+def render_latest() -> tuple[bytes, str]:
+    """
+    Render all metrics in the text exposition format.
+
+    Returns:
+        Body and its content type
+    """
+    if is_multiprocess():
+        # A fresh registry per scrape, so files of workers started since the last one are picked up
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        for collector in stats_collectors:
+            registry.register(collector)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """Drop the live gauges of this worker. Call on shutdown."""
+    if is_multiprocess():
+        multiprocess.mark_process_dead(os.getpid())  # pyright: ignore[reportUnknownMemberType]
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting requests and timing them per method, route template and status.
+
+    Routes are labelled by their template, e.g. `/v1/players/{id}`, as set by the router in the request scope.
+    Methods other than the standard ones are labelled `OTHER`.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method: str = scope["method"] if scope["method"] in KNOWN_METHODS else OTHER_METHOD
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            in_progress.dec()
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            REQUESTS.labels(method, route, status_code).inc()
+            REQUEST_DURATION.labels(method, route, status_code).observe(duration)
@@ -0,0 +1,105 @@
+"""Profiling of a running worker, one profile at a time."""
+
+import asyncio
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from types import FrameType
+
+
+class ProfilerBusyError(Exception):
+    """Another profile of the worker is running."""
+
+
+_lock = threading.Lock()
+
+
+@contextmanager
+def _exclusive() -> Iterator[None]:
+    if not _lock.acquire(blocking=False):
+        raise ProfilerBusyError
+    try:
+        yield
+    finally:
+        _lock.release()
+
+
+def _frame_name(frame: FrameType) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_qualname}"
+
+
+def collapse_stack(frame: FrameType | None, thread_name: str) -> str:
+    """Format a stack as a line of the collapsed stacks format, outermost frame first and the thread as the root."""
+    names: list[str] = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.append(thread_name)
+    return ";".join(reversed(names))
+
+
+def sample_stacks(seconds: float, interval: float) -> Counter[str]:
+    """
+    Sample the stacks of all threads of the process, except the calling one.
+
+    Args:
+        seconds: How long to sample for
+        interval: Seconds between samples
+
+    Returns:
+        Number of times each collapsed stack was seen
+    """
+    stacks: Counter[str] = Counter()
+    own_id = threading.get_ident()
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():  # pyright: ignore[reportPrivateUsage]
+            if thread_id != own_id:
+                stacks[collapse_stack(frame, thread_names.get(thread_id, str(thread_id)))] += 1
+        time.sleep(interval)
+    return stacks
+
+
+async def profile_collapsed(seconds: float, interval: float = 0.005) -> str:
+    """
+    Sample all threads from a separate one, so the profile shows where the event loop spends its time too.
+
+    Returns:
+        Collapsed stacks, one per line followed by its sample count, as taken by flamegraph tools
+
+    Raises:
+        ProfilerBusyError: If another profile is running
+    """
+    with _exclusive():
+        stacks = await asyncio.to_thread(sample_stacks, seconds, interval)
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+async def profile_pstats(seconds: float, limit: int = 100) -> str:
+    """
+    Profile the event loop thread with the deterministic profiler. Work of other threads is not included.
+
+    Returns:
+        Report of the functions with the most cumulative time
+
+    Raises:
+        ProfilerBusyError: If another profile is running
+    """
+    with _exclusive():
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.disable()
+
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+    return output.getvalue()
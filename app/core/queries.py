@@ -0,0 +1,92 @@
+"""Counting of the SQL statements a request issues, to catch routes that query more than they should."""
+
+import logging
+from collections import Counter
+from collections.abc import Generator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import Engine, event
+from sqlalchemy.engine import Connection
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+@dataclass
+class QueryCount:
+    """Statements executed while counting, with how many times each was executed."""
+
+    statements: Counter[str] = field(default_factory=Counter[str])
+
+    @property
+    def total(self) -> int:
+        return self.statements.total()
+
+    def most_repeated(self) -> tuple[str, int] | None:
+        """Get the statement executed the most times, repeats of one statement usually mean an N+1."""
+        return most_common[0] if (most_common := self.statements.most_common(1)) else None
+
+
+_active: ContextVar[tuple[QueryCount, ...]] = ContextVar("query_counts", default=())
+
+
+def _count_statement(_conn: Connection, _cursor: Any, statement: str, *_: Any) -> None:  # noqa: ANN401
+    for count in _active.get():
+        count.statements[statement] += 1
+
+
+def instrument_engines() -> None:
+    """Count statements of all engines."""
+    if not event.contains(Engine, "before_cursor_execute", _count_statement):
+        event.listen(Engine, "before_cursor_execute", _count_statement)
+
+
+@contextmanager
+def count_queries() -> Generator[QueryCount]:
+    """Count statements executed in the block, including by tasks and threads it spawns. Counts can be nested."""
+    instrument_engines()
+    count = QueryCount()
+    token = _active.set((*_active.get(), count))
+    try:
+        yield count
+    finally:
+        _active.reset(token)
+
+
+class QueryBudgetMiddleware:
+    """ASGI middleware logging a warning for each HTTP request that executes more statements than its budget."""
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, app: ASGIApp, budget: int) -> None:
+        """
+        Initialize the middleware.
+
+        Args:
+            app: Application to wrap
+            budget: Statements a request may execute without a warning
+        """
+        self.app = app
+        self.budget = budget
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with count_queries() as count:
+            await self.app(scope, receive, send)
+
+        if count.total > self.budget:
+            route = getattr(scope.get("route"), "path", scope["path"])
+            statement, repeats = count.most_repeated() or ("", 0)
+            self.logger.warning(
+                "%s %s executed %d statements, over the budget of %d. Most repeated, %d times: %s",
+                scope["method"],
+                route,
+                count.total,
+                self.budget,
+                repeats,
+                statement,
+            )
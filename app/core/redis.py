@@ -1,5 +1,6 @@
 # pyright: reportUnknownMemberType = false
 import logging
+import time
 from functools import lru_cache
 
 from redis import RedisError
@@ -7,6 +8,8 @@ from redis.asyncio import ConnectionPool, Redis
 from redis.asyncio.client import PubSub
 
 from app.core.config import get_config
+from app.core.metrics import REDIS_ERRORS, REDIS_PUBLISH_DURATION
+from app.core.timing import timed
 
 
 class RedisClient:
@@ -52,6 +55,18 @@ class RedisClient:
         """
         return f"{self.channel_prefix}.{channel}" if self.channel_prefix else channel
 
+    def get_full_key_name(self, key: str) -> str:
+        """
+        Get the full key name, prefixed the same way as channels.
+
+        Args:
+            key: Base key name
+
+        Returns:
+            Full key name with prefix
+        """
+        return self.get_full_channel_name(key)
+
     async def publish(self, channel: str, message: str) -> int:
         """
         Publish a message to a channel.
@@ -66,12 +81,17 @@ class RedisClient:
         Raises:
             RedisError: If there's an issue with Redis communication
         """
+        start = time.perf_counter()
         try:
-            async with self.get_client() as client:
-                return await client.publish(self.get_full_channel_name(channel), message)
+            with timed("redis"):
+                async with self.get_client() as client:
+                    return await client.publish(self.get_full_channel_name(channel), message)
         except RedisError as e:
+            REDIS_ERRORS.labels("publish").inc()
             self.logger.error(f"Failed to publish to Redis channel {channel}: {e}")
             raise
+        finally:
+            REDIS_PUBLISH_DURATION.observe(time.perf_counter() - start)
 
     async def subscribe(self, *channels: str) -> PubSub:
         """
@@ -96,6 +116,7 @@ class RedisClient:
 
             return pubsub
         except RedisError as e:
+            REDIS_ERRORS.labels("subscribe").inc()
             self.logger.error(f"Failed to subscribe to Redis channels {channels}: {e}")
             raise
 
@@ -0,0 +1,137 @@
+"""
+Flight recorder of slow requests, keeping what they did for inspection after the fact.
+
+Disabled unless a threshold is configured. Every request then keeps its statements while it runs, which costs
+a list append per statement. Only requests slower than the threshold are turned into entries, so fast ones pay
+nothing more. Bind parameters are left out of entries unless enabled, as they include secrets like token hashes.
+"""
+
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field, replace
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Self
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import get_config
+from app.core.timing import RequestTimings, TimedStatement, instrument_engines, time_request
+from app.core.utils import utcnow2
+
+
+@dataclass
+class SlowRequest:
+    time: datetime
+    method: str
+    route: str
+    path: str
+    path_params: dict[str, Any]
+    query_string: str
+    status: int
+    duration: float
+    """Seconds from receiving the request to finishing the response."""
+    timings: RequestTimings
+    statements: list[TimedStatement] = field(default_factory=list[TimedStatement])
+
+    def to_dict(self) -> dict[str, Any]:
+        entry = asdict(self)
+        entry["time"] = self.time.isoformat()
+        del entry["timings"]["statements"]
+        return entry
+
+
+class SlowRequestRecorder:
+    """Ring buffer of the latest requests slower than a threshold."""
+
+    logger = logging.getLogger("app.slow_requests")
+    """Entries are logged to it as JSON lines if dumping is enabled."""
+
+    def __init__(self, threshold: float, size: int = 100, *, dump: bool = False, parameters: bool = False) -> None:
+        """
+        Initialize the recorder.
+
+        Args:
+            threshold: Seconds a request has to take to be recorded, 0 disables recording
+            size: Number of latest entries kept
+            dump: Whether to log entries as JSON lines
+            parameters: Whether to keep bind parameters of statements
+        """
+        self.threshold = threshold
+        self.dump = dump
+        self.parameters = parameters
+        self.entries: deque[SlowRequest] = deque(maxlen=size)
+
+    @classmethod
+    def from_config(cls) -> Self:
+        config = get_config().general
+        return cls(
+            config.slow_request_threshold,
+            config.slow_request_buffer_size,
+            dump=config.slow_request_dump,
+            parameters=config.slow_request_parameters,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def record(self, entry: SlowRequest) -> None:
+        if not self.parameters:
+            statements = [replace(statement, parameters=None) for statement in entry.statements]
+            entry.statements = entry.timings.statements = statements
+        self.entries.append(entry)
+        if self.dump:
+            self.logger.info(json.dumps(entry.to_dict(), default=str))
+
+
+@lru_cache(maxsize=1)
+def get_slow_request_recorder() -> SlowRequestRecorder:
+    return SlowRequestRecorder.from_config()
+
+
+class SlowRequestMiddleware:
+    """ASGI middleware recording HTTP requests slower than the threshold of a recorder."""
+
+    def __init__(self, app: ASGIApp, recorder: SlowRequestRecorder) -> None:
+        self.app = app
+        self.recorder = recorder
+        instrument_engines()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        with time_request() as timings:
+            if timings.statements is None:
+                timings.statements = []
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                if (duration := time.perf_counter() - start) >= self.recorder.threshold:
+                    self.recorder.record(
+                        SlowRequest(
+                            time=utcnow2(),
+                            method=scope["method"],
+                            route=getattr(scope.get("route"), "path", scope["path"]),
+                            path=scope["path"],
+                            path_params=dict(scope.get("path_params", {})),
+                            query_string=scope["query_string"].decode("latin-1"),
+                            status=status_code,
+                            duration=duration,
+                            timings=timings,
+                            statements=timings.statements,
+                        )
+                    )
@@ -0,0 +1,127 @@
+import json
+import logging
+from functools import lru_cache
+from hashlib import sha256
+from typing import ClassVar, Self
+
+from pydantic import BaseModel
+from redis import RedisError
+
+from app.core.config import get_config
+from app.core.redis import RedisClient, default_client
+
+
+class Snapshot(BaseModel):
+    """Rendered list of items, identified by a hash of its content."""
+
+    digest: str
+    items: list[str]
+
+    @classmethod
+    def from_items(cls, items: list[str]) -> Self:
+        return cls(digest=sha256(json.dumps(items).encode()).hexdigest(), items=items)
+
+    def etag(self, variant: str = "") -> str:
+        """
+        Get a strong ETag of a representation of this snapshot.
+
+        Args:
+            variant: Identifies the representation, e.g. the query string of a page
+        """
+        return f'"{sha256(f"{self.digest}:{variant}".encode()).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an `If-None-Match` header against an ETag, using weak comparison as RFC 9110 requires."""
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
+class SnapshotStore:
+    """
+    Redis cache of rendered lists, invalidated by per-scope version counters.
+
+    Writers bump the versions of the scopes they changed and readers look snapshots up by the current version,
+    so a snapshot is never served after a successful bump. Old versions expire on their own.
+    """
+
+    VERSION_KEY: ClassVar[str] = "snapshot_version"
+    SNAPSHOT_KEY: ClassVar[str] = "snapshot"
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, redis_client: RedisClient, max_ttl: float) -> None:
+        """
+        Initialize the store.
+
+        Args:
+            redis_client: Redis client to keep versions and snapshots in
+            max_ttl: Maximum seconds a snapshot is kept
+        """
+        self.redis_client = redis_client
+        self.max_ttl = max_ttl
+
+    @classmethod
+    def from_config(cls) -> Self:
+        return cls(default_client(), get_config().general.whitelist_snapshot_ttl)
+
+    def _version_key(self, scope: str) -> str:
+        return self.redis_client.get_full_key_name(f"{self.VERSION_KEY}:{scope}")
+
+    def _snapshot_key(self, name: str, version: int) -> str:
+        return self.redis_client.get_full_key_name(f"{self.SNAPSHOT_KEY}:{name}:{version}")
+
+    async def get_version(self, scope: str) -> int:
+        """
+        Get the current version of a scope.
+
+        Raises:
+            RedisError: If there's an issue with Redis communication
+        """
+        async with self.redis_client.get_client() as client:
+            version = await client.get(self._version_key(scope))
+        return int(version or 0)
+
+    async def bump(self, *scopes: str) -> None:
+        """Invalidate snapshots of the given scopes. Failures are logged, snapshots then expire by TTL."""
+        try:
+            async with self.redis_client.get_client() as client:
+                for scope in scopes:
+                    await client.incr(self._version_key(scope))
+        except RedisError:
+            self.logger.warning("Snapshot version of %s was not bumped, stale snapshots expire by TTL", scopes)
+
+    async def get(self, name: str, version: int) -> Snapshot | None:
+        """
+        Get a snapshot of the given version.
+
+        Raises:
+            RedisError: If there's an issue with Redis communication
+        """
+        async with self.redis_client.get_client() as client:
+            raw = await client.get(self._snapshot_key(name, version))
+        return Snapshot.model_validate_json(raw) if raw is not None else None
+
+    async def store(self, name: str, version: int, items: list[str], ttl: float | None = None) -> Snapshot:
+        """
+        Store a snapshot of the given version.
+
+        Args:
+            name: Snapshot name
+            version: Version of the scope the items were read at
+            items: Items to store
+            ttl: Seconds the items stay valid, capped by `max_ttl`
+
+        Raises:
+            RedisError: If there's an issue with Redis communication
+        """
+        snapshot = Snapshot.from_items(items)
+        ttl = self.max_ttl if ttl is None else min(ttl, self.max_ttl)
+        async with self.redis_client.get_client() as client:
+            await client.set(self._snapshot_key(name, version), snapshot.model_dump_json(), px=max(1, int(ttl * 1000)))
+        return snapshot
+
+
+@lru_cache(maxsize=1)
+def get_snapshot_store() -> SnapshotStore:
+    return SnapshotStore.from_config()
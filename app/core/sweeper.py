@@ -0,0 +1,261 @@
+import asyncio
+import json
+import logging
+import os
+from collections.abc import Callable, Sequence
+from contextlib import AbstractAsyncContextManager
+from datetime import UTC, datetime, timedelta
+from typing import Any, ClassVar, Self
+
+from redis import RedisError
+from sqlalchemy import ColumnElement
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import col, delete, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import get_config
+from app.core.db import get_db_client
+from app.core.redis import RedisClient, default_client
+from app.core.utils import utcnow2
+from app.database.models import CkeyLinkToken, Donation, Whitelist, WhitelistBan, WhitelistChange
+
+
+type ExpiringModel = Whitelist | WhitelistBan | Donation
+type SessionFactory = Callable[[], AbstractAsyncContextManager[AsyncSession]]
+
+
+class ExpirationSweeper:
+    """
+    Materializes expiration of whitelists, whitelist bans and donations, and deletes rows no longer needed.
+
+    Every expired row gets `valid=False`, marked as set by the sweeper, and is announced on the expiry channel,
+    one message per batch.
+    Expired whitelists are also logged as whitelist changes, so delta syncs see them.
+    Expired link tokens and whitelist changes older than the retention are deleted.
+    Runs in every worker, but a Redis lock lets only one of them sweep per interval.
+    """
+
+    LOCK_KEY: ClassVar[str] = "expiration_sweeper"
+    EVENT_CHANNEL: ClassVar[str] = "expiry"
+    EXPIRING_MODELS: ClassVar[dict[str, type[ExpiringModel]]] = {
+        "whitelist": Whitelist,
+        "whitelist_ban": WhitelistBan,
+        "donation": Donation,
+    }
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(
+        self,
+        session_factory: SessionFactory,
+        redis_client: RedisClient,
+        interval: float,
+        batch_size: int,
+        change_retention: float,
+    ) -> None:
+        """
+        Initialize the sweeper.
+
+        Args:
+            session_factory: Returns a session context manager that commits on exit
+            redis_client: Redis client for the lock and events
+            interval: Seconds between sweeps
+            batch_size: Maximum number of rows changed per transaction
+            change_retention: Seconds whitelist changes are kept for delta syncs
+
+        Raises:
+            ValueError: If the interval is not positive, the lock would never be taken and sweeps never wait
+        """
+        if interval <= 0:
+            raise ValueError("Expiration sweep interval must be positive")
+        self.session_factory = session_factory
+        self.redis_client = redis_client
+        self.interval = interval
+        self.batch_size = batch_size
+        self.change_retention = timedelta(seconds=change_retention)
+        self.worker_id = f"{os.getpid()}:{id(self)}"
+
+    @classmethod
+    def from_config(cls) -> Self:
+        config = get_config().general
+        return cls(
+            get_db_client().async_session,
+            default_client(),
+            config.expiration_sweep_interval,
+            config.expiration_sweep_batch_size,
+            config.whitelist_change_retention,
+        )
+
+    async def acquire_lock(self) -> bool:
+        """
+        Try to become the worker sweeping this interval.
+
+        The lock is not released, it expires with the interval, so sweeps do not repeat within one.
+
+        Returns:
+            True if this worker should sweep
+        """
+        try:
+            async with self.redis_client.get_client() as client:
+                return bool(
+                    await client.set(
+                        self.redis_client.get_full_key_name(self.LOCK_KEY),
+                        self.worker_id,
+                        nx=True,
+                        px=int(self.interval * 1000),
+                    )
+                )
+        except RedisError as e:
+            self.logger.warning("Could not acquire expiration sweeper lock: %s", str(e))
+            return False
+
+    async def publish_expired(self, kind: str, rows: Sequence[ExpiringModel]) -> None:
+        message = json.dumps({"kind": kind, "items": [row.model_dump(mode="json") for row in rows]})
+        try:
+            await self.redis_client.publish(self.EVENT_CHANNEL, message)
+        except RedisError:
+            self.logger.warning("Expiry event of %d %s rows was not published", len(rows), kind)
+
+    async def expire(self, kind: str, model: type[ExpiringModel]) -> int:
+        """
+        Set `valid=False` on expired rows of a model in batches.
+
+        The update repeats the conditions of the selection, so rows a concurrent patch extended in between are
+        skipped. Changes and events are made only of the rows actually updated.
+
+        Returns:
+            Number of rows expired
+        """
+        now = utcnow2()
+        expired = 0
+        while True:
+            async with self.session_factory() as session:
+                ids = (
+                    await session.exec(
+                        select(col(model.id))
+                        .where(model.valid)
+                        .where(model.expiration_time <= now)
+                        .order_by(col(model.id))
+                        .limit(self.batch_size)
+                    )
+                ).all()
+                if not ids:
+                    break
+
+                await session.execute(  # pyright: ignore[reportDeprecated]
+                    update(model)
+                    .where(col(model.id).in_(ids))
+                    .where(col(model.valid))
+                    .where(col(model.expiration_time) <= now)
+                    .values(valid=False, expired_by_sweeper=True)
+                )
+                rows = (
+                    await session.exec(
+                        select(model)
+                        .where(col(model.id).in_(ids))
+                        .where(col(model.expired_by_sweeper))
+                        .where(col(model.expiration_time) <= now)
+                        .order_by(col(model.id))
+                    )
+                ).all()
+                if model is Whitelist:
+                    # Whitelist status changes, so delta syncs have to see it even after `valid` hides the expiration
+                    session.add_all(
+                        WhitelistChange(server_type=row.server_type, player_id=row.player_id)
+                        for row in rows
+                        if isinstance(row, Whitelist)
+                    )
+
+            if rows:
+                await self.publish_expired(kind, rows)
+            expired += len(rows)
+            if len(ids) < self.batch_size:
+                break
+
+        return expired
+
+    async def delete_in_batches(
+        self, model: type[CkeyLinkToken | WhitelistChange], condition: ColumnElement[bool]
+    ) -> int:
+        """
+        Delete rows of a model matching the condition in batches.
+
+        Returns:
+            Number of rows deleted
+        """
+        deleted = 0
+        while True:
+            async with self.session_factory() as session:
+                ids = (await session.exec(select(col(model.id)).where(condition).limit(self.batch_size))).all()
+                if ids:
+                    await session.execute(delete(model).where(col(model.id).in_(ids)))  # pyright: ignore[reportDeprecated]
+
+            deleted += len(ids)
+            if len(ids) < self.batch_size:
+                return deleted
+
+    async def delete_expired_tokens(self) -> int:
+        """
+        Delete expired link tokens in batches.
+
+        Returns:
+            Number of tokens deleted
+        """
+        return await self.delete_in_batches(CkeyLinkToken, col(CkeyLinkToken.expiration_time) <= utcnow2())
+
+    async def delete_old_changes(self) -> int:
+        """
+        Delete whitelist changes older than the retention in batches.
+
+        Returns:
+            Number of changes deleted
+        """
+        return await self.delete_in_batches(
+            WhitelistChange, col(WhitelistChange.change_time) <= utcnow2() - self.change_retention
+        )
+
+    async def sweep(self) -> None:
+        for kind, model in self.EXPIRING_MODELS.items():
+            if expired := await self.expire(kind, model):
+                self.logger.info("Expired %d %s rows", expired, kind)
+
+        if deleted := await self.delete_expired_tokens():
+            self.logger.info("Deleted %d expired link tokens", deleted)
+
+        if deleted := await self.delete_old_changes():
+            self.logger.info("Deleted %d whitelist changes older than the retention", deleted)
+
+    async def run(self) -> None:
+        """Sweep every `interval` seconds until cancelled."""
+        while True:
+            try:
+                if await self.acquire_lock():
+                    await self.sweep()
+            except SQLAlchemyError as e:
+                self.logger.warning("Expiration sweep failed: %s", str(e))
+            except Exception:
+                # The task runs for the life of the worker, one bad sweep must not end it
+                self.logger.exception("Expiration sweep failed")
+            await asyncio.sleep(self.interval)
+
+
+def reactivate_if_extended(row: ExpiringModel, update_data: dict[str, Any]) -> None:
+    """
+    Undo the expiration the sweeper materialized on a row when a patch extends it into the future.
+
+    Rows made invalid otherwise, e.g. by a ban or an admin, stay invalid. A `valid` set by the patch itself
+    takes precedence and is no longer the sweeper's. Call before applying the patch.
+    """
+    if "valid" in update_data:
+        row.expired_by_sweeper = False
+        return
+
+    expiration_time: datetime | None = update_data.get("expiration_time")
+    if not row.expired_by_sweeper or expiration_time is None:
+        return
+    if expiration_time.tzinfo is not None:
+        expiration_time = expiration_time.astimezone(UTC).replace(tzinfo=None)
+
+    if expiration_time > utcnow2():
+        row.valid = True
+        row.expired_by_sweeper = False
@@ -0,0 +1,141 @@
+"""
+Per-request breakdown of where time went, reported in a `Server-Timing` header.
+
+Times are accumulated in the context of the request, so they include work of all tasks and threads it spawns.
+Concurrent calls are summed, e.g. two Discord requests made at once count twice.
+"""
+
+import time
+from collections.abc import Generator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, override
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import Engine, event
+from sqlalchemy.engine import Connection
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+@dataclass
+class TimedStatement:
+    statement: str
+    parameters: Any
+    duration: float
+
+
+@dataclass
+class RequestTimings:
+    """Seconds a request spent in each service."""
+
+    db: float = 0.0
+    db_queries: int = 0
+    redis: float = 0.0
+    discord: float = 0.0
+    serialize: float = 0.0
+    statements: list[TimedStatement] | None = field(default=None, repr=False)
+    """Executed statements with their bind parameters, only kept if not None."""
+
+    def header(self) -> str:
+        """Format as a `Server-Timing` header value, durations in milliseconds."""
+        return ", ".join(
+            (
+                f"db;dur={self.db * 1000:.2f}",
+                f"db_queries;count={self.db_queries}",
+                f"redis;dur={self.redis * 1000:.2f}",
+                f"discord;dur={self.discord * 1000:.2f}",
+                f"serialize;dur={self.serialize * 1000:.2f}",
+            )
+        )
+
+
+_timings: ContextVar[RequestTimings | None] = ContextVar("request_timings", default=None)
+
+
+def current_timings() -> RequestTimings | None:
+    """Get the timings of the current request, None outside of a timed request."""
+    return _timings.get()
+
+
+@contextmanager
+def time_request() -> Generator[RequestTimings]:
+    """Time the block as a request, or as part of the request being timed already."""
+    if (timings := _timings.get()) is not None:
+        yield timings
+        return
+    timings = RequestTimings()
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+@contextmanager
+def timed(service: str) -> Generator[None]:
+    """Add the time spent in the block to a service of the current request, if it is timed."""
+    if (timings := _timings.get()) is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(timings, service, getattr(timings, service) + time.perf_counter() - start)
+
+
+QUERY_START_KEY = "request_timings_query_start"
+
+
+def _before_cursor_execute(conn: Connection, *_: Any) -> None:  # noqa: ANN401
+    if _timings.get() is not None:
+        conn.info.setdefault(QUERY_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn: Connection, _cursor: Any, statement: str, parameters: Any, *_: Any) -> None:  # noqa: ANN401
+    if (timings := _timings.get()) is not None and (starts := conn.info.get(QUERY_START_KEY)):
+        duration = time.perf_counter() - starts.pop()
+        timings.db += duration
+        timings.db_queries += 1
+        if timings.statements is not None:
+            timings.statements.append(TimedStatement(statement, parameters, duration))
+
+
+def instrument_engines() -> None:
+    """Time queries of all engines. Only requests in a timed context pay for more than a context lookup."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSON response recording the time to render its body as `serialize`."""
+
+    @override
+    def render(self, content: Any) -> bytes:
+        with timed("serialize"):
+            return super().render(content)
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware timing each HTTP request and adding the breakdown to its response headers."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        instrument_engines()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with time_request() as timings:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    MutableHeaders(scope=message).append("Server-Timing", timings.header())
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
@@ -4,6 +4,7 @@ from secrets import token_urlsafe
 from typing import Unpack
 
 from pydantic import ConfigDict
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship, SQLModel
 
 from app.core.utils import utcnow2
@@ -79,6 +80,14 @@ class WhitelistBase(BaseSqlModel):
 
 
 class Whitelist(WhitelistBase, table=True):
+    __table_args__ = (
+        # Active whitelists of a server type, covers the player join
+        Index("ix_whitelist_active", "server_type", "valid", "expiration_time", "player_id"),
+    )
+
+    expired_by_sweeper: bool = Field(default=False)
+    """Whether `valid=False` was set by the expiration sweeper, so extending the expiration may undo it."""
+
     player: Player = Relationship(
         back_populates="whitelists", sa_relationship_kwargs={"foreign_keys": "Whitelist.player_id"}
     )
@@ -96,6 +105,15 @@ class WhitelistBanBase(WhitelistBase):
 
 
 class WhitelistBan(WhitelistBanBase, table=True):
+    __table_args__ = (
+        Index("ix_whitelist_ban_active", "server_type", "valid", "expiration_time", "player_id"),
+        # Active bans of a player, checked on every new whitelist
+        Index("ix_whitelist_ban_player_active", "player_id", "server_type", "valid", "expiration_time"),
+    )
+
+    expired_by_sweeper: bool = Field(default=False)
+    """Whether `valid=False` was set by the expiration sweeper, so extending the expiration may undo it."""
+
     player: Player = Relationship(
         back_populates="whitelist_bans",
         sa_relationship_kwargs={"foreign_keys": "WhitelistBan.player_id"},
@@ -106,6 +124,25 @@ class WhitelistBan(WhitelistBanBase, table=True):
     )
 
 
+class WhitelistChange(BaseSqlModel, table=True):
+    """
+    Log of whitelist and whitelist ban writes, `id` is the change sequence used by delta syncs.
+
+    Expirations are logged by the expiration sweeper when it marks the whitelist invalid, until then delta syncs
+    derive them from `Whitelist.expiration_time`. The sweeper deletes changes older than the retention.
+    """
+
+    __table_args__ = (
+        Index("ix_whitelist_change_server_type_id", "server_type", "id"),
+        Index("ix_whitelist_change_change_time", "change_time"),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    server_type: str = Field(max_length=32)
+    player_id: int = Field(foreign_key="player.id")
+    change_time: datetime = Field(default_factory=utcnow2)
+
+
 class ApiAuth(BaseSqlModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
     token_hash: str = Field(max_length=64, unique=True, index=True)
@@ -123,4 +160,9 @@ class DonationBase(BaseSqlModel):
 
 
 class Donation(DonationBase, table=True):
+    __table_args__ = (Index("ix_donation_active", "valid", "expiration_time", "player_id"),)
+
+    expired_by_sweeper: bool = Field(default=False)
+    """Whether `valid=False` was set by the expiration sweeper, so extending the expiration may undo it."""
+
     player: Player = Relationship(back_populates="donations")
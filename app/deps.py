@@ -1,11 +1,13 @@
 import hashlib
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
 from typing import Annotated, Any
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.core.bearer_cache import get_bearer_cache
 from app.core.db import get_db_client
 from app.database.models import ApiAuth
 
@@ -18,6 +20,23 @@ def get_session() -> Generator[Session, Any, Any]:
 SessionDep = Annotated[Session, Depends(get_session)]
 
 
+async def get_async_session() -> AsyncGenerator[AsyncSession, Any]:
+    async with get_db_client().async_session_factory() as session:
+        yield session
+
+
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_session)]
+
+
+async def get_read_session() -> AsyncGenerator[AsyncSession, Any]:
+    """Session that reads from a replica when one is available. Sticks to the primary after any write."""
+    async with get_db_client().async_session_factory(use_replica=True) as session:
+        yield session
+
+
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_session)]
+
+
 def hash_bearer_token(token: str) -> str:
     return hashlib.sha256(token.encode()).hexdigest()
 
@@ -33,16 +52,24 @@ BEARER_SCHEME = HTTPBearer()
 HTTPAuthCredDep = Depends(BEARER_SCHEME)
 
 
-def verify_bearer(session: SessionDep, credentials: HTTPAuthorizationCredentials = HTTPAuthCredDep) -> str:
+async def verify_bearer(session: AsyncSessionDep, credentials: HTTPAuthorizationCredentials = HTTPAuthCredDep) -> str:
     """
     Dependency to verify the Bearer token is valid and present in the database.
 
+    Verification results are cached per worker, so the database is only queried for unknown tokens.
+
     Raises a 401 Unauthorized if the token is missing or invalid.
     """
     token = credentials.credentials
 
     hashed_token = hash_bearer_token(token)
-    if session.exec(select(ApiAuth).where(ApiAuth.token_hash == hashed_token)).first() is None:
+    bearer_cache = get_bearer_cache()
+    valid = bearer_cache.get(hashed_token)
+    if valid is None:
+        valid = (await session.exec(select(ApiAuth.id).where(ApiAuth.token_hash == hashed_token))).first() is not None
+        bearer_cache.store(hashed_token, valid)
+
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or missing bearer token",
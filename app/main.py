@@ -1,18 +1,76 @@
+import asyncio
+import logging
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, status
 from fastapi.responses import FileResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 
+from app.core.bearer_cache import get_bearer_cache
 from app.core.config import get_config
+from app.core.db import get_db_client
+from app.core.loop_monitor import EventLoopMonitor
+from app.core.metrics import MetricsMiddleware, mark_process_dead
+from app.core.queries import QueryBudgetMiddleware
+from app.core.redis import default_client
+from app.core.slow_requests import SlowRequestMiddleware, get_slow_request_recorder
+from app.core.sweeper import ExpirationSweeper
+from app.core.timing import ServerTimingMiddleware, TimedJSONResponse
+from app.routes.debug import router as debug_router
+from app.routes.metrics import router as metrics_router
 from app.routes.v1.main_router import v1_router
+from app.routes.v1.player import oauth_client
+
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncGenerator[None]:
+    db_client = get_db_client()
+    await oauth_client.start()
+    background_tasks: list[asyncio.Task[None]] = [
+        asyncio.create_task(get_bearer_cache().listen(default_client())),
+        asyncio.create_task(ExpirationSweeper.from_config().run()),
+    ]
+
+    if db_client.replica_router.replicas:
+        background_tasks.append(asyncio.create_task(db_client.replica_router.monitor()))
+    if get_config().general.loop_monitor_interval > 0:
+        background_tasks.append(asyncio.create_task(EventLoopMonitor.from_config().run()))
+
+    yield
+
+    for task in background_tasks:
+        task.cancel()
+    # A task that already failed must not keep the clients below from closing
+    for result in await asyncio.gather(*background_tasks, return_exceptions=True):
+        if isinstance(result, Exception):
+            logger.error("Background task failed", exc_info=result)
+    await oauth_client.close()
+    await db_client.async_close()
+    mark_process_dead()
 
 
 app = FastAPI(
     title=get_config().general.name,
     version=get_config().general.version,
     description=get_config().general.description,
+    lifespan=lifespan,
+    default_response_class=TimedJSONResponse,
 )
+app.add_middleware(MetricsMiddleware)
+if get_config().general.server_timing:
+    app.add_middleware(ServerTimingMiddleware)
+if get_config().general.query_budget > 0:
+    app.add_middleware(QueryBudgetMiddleware, budget=get_config().general.query_budget)
+if get_slow_request_recorder().enabled:
+    app.add_middleware(SlowRequestMiddleware, recorder=get_slow_request_recorder())
 app.mount("/nanoui", StaticFiles(directory="app/public/nanoui"), name="nanoui")
 app.include_router(v1_router)
+app.include_router(metrics_router)
+app.include_router(debug_router)
 
 
 @app.get("/", status_code=status.HTTP_301_MOVED_PERMANENTLY)
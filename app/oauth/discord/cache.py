@@ -0,0 +1,68 @@
+import json
+from collections.abc import Mapping
+from hashlib import sha256
+from typing import Self
+
+from app.core.cache import CacheStats, MemoryCacheBackend, RedisCacheBackend, TieredCache
+from app.core.config import get_config
+from app.core.redis import default_client
+from app.core.typing import JSONAny
+
+
+class DiscordResponseCache:
+    """
+    Cache of Discord API responses, shared by workers through Redis behind a per-worker LRU tier.
+
+    Keys are hashes of the route and the access token, so tokens are never stored.
+    """
+
+    def __init__(self, cache: TieredCache, default_ttl: float, route_ttls: Mapping[str, float] | None = None) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            cache: Tiers to store responses in
+            default_ttl: Seconds a response is cached
+            route_ttls: Seconds responses of specific routes are cached, overrides `default_ttl`
+        """
+        self.cache = cache
+        self.default_ttl = default_ttl
+        self.route_ttls = dict(route_ttls or {})
+
+    @classmethod
+    def from_config(cls) -> Self:
+        config = get_config().oauth
+        return cls(
+            TieredCache(
+                MemoryCacheBackend(config.response_cache_size, config.response_cache_local_ttl),
+                RedisCacheBackend(default_client()),
+                fill_ttl=config.response_cache_local_ttl,
+            ),
+            config.response_cache_ttl,
+            config.response_cache_route_ttls,
+        )
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.cache.stats
+
+    @staticmethod
+    def key(route: str, token: str) -> str:
+        return f"discord:{sha256(f'{route}:{token}'.encode()).hexdigest()}"
+
+    def ttl(self, route: str) -> float:
+        return self.route_ttls.get(route, self.default_ttl)
+
+    async def get(self, route: str, token: str) -> JSONAny | None:
+        """
+        Get a cached response.
+
+        Returns:
+            Response body, or None if not cached
+        """
+        raw = await self.cache.get(self.key(route, token))
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, route: str, token: str, data: JSONAny) -> None:
+        if (ttl := self.ttl(route)) > 0:
+            await self.cache.set(self.key(route, token), json.dumps(data), ttl)
@@ -1,14 +1,15 @@
 # pyright: reportUnknownMemberType = false
+import asyncio
 import re
-from os import environ
 from typing import Any
 
 import aiohttp
-from aiocache import cached  # pyright: ignore[reportMissingTypeStubs]
-from app.core.config import ConfigSection
+from app.core.timing import timed
 from app.core.typing import JSONAny
+from app.oauth.discord.cache import DiscordResponseCache
 from app.oauth.discord.exeptions import RateLimitedError, ScopeMissingError, UnauthorizedError
 from app.oauth.discord.models import GuildPreview, User
+from app.oauth.discord.ratelimit import RateLimitScheduler
 from fastapi import Depends, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from starlette.datastructures import URL
@@ -25,7 +26,18 @@ class DiscordOAuthClient:
     """Client for Discord Oauth2."""
 
     def __init__(
-        self, client_id: int, client_secret: str, redirect_uri: str, scopes: tuple[str, ...] = ("identify",)
+        self,
+        client_id: int,
+        client_secret: str,
+        redirect_uri: str,
+        scopes: tuple[str, ...] = ("identify",),
+        *,
+        connection_limit: int = 100,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: float = 30.0,
+        request_timeout: float = 10.0,
+        global_rate_limit: int = 50,
+        cache: DiscordResponseCache | None = None,
     ) -> None:
         """
         Initialize the Discord OAuth client.
@@ -35,11 +47,54 @@ class DiscordOAuthClient:
             client_secret: Discord application client secret.
             redirect_uri: Discord application redirect URI.
             scopes: Discord application scopes.
+            connection_limit: Maximum number of simultaneous connections to Discord.
+            dns_cache_ttl: Seconds resolved Discord addresses are cached.
+            keepalive_timeout: Seconds an idle connection is kept open for reuse.
+            request_timeout: Total timeout of a single request in seconds.
+            global_rate_limit: Requests per second sent with one token, 0 disables the limit.
+            cache: Cache of GET responses, responses are not cached if None.
         """
         self.client_id: int = client_id
         self.client_secret: str = client_secret
         self.redirect_uri: str = redirect_uri
         self.scopes: tuple[str, ...] = scopes
+        self.connection_limit = connection_limit
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.request_timeout = request_timeout
+        self._session: aiohttp.ClientSession | None = None
+        self.scheduler = RateLimitScheduler(global_limit=global_rate_limit)
+        self.cache = cache
+        self._in_flight: dict[tuple[str, str], asyncio.Task[JSONAny]] = {}
+        self.coalesced_requests = 0
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """
+        HTTP session shared by all requests, keeps connections to Discord alive between them.
+
+        Opened on first use if `start` was not called.
+        """
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.connection_limit,
+                    ttl_dns_cache=self.dns_cache_ttl,
+                    keepalive_timeout=self.keepalive_timeout,
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout),
+            )
+        return self._session
+
+    async def start(self) -> None:
+        """Open the shared HTTP session. Call on application startup."""
+        _ = self.session
+
+    async def close(self) -> None:
+        """Close the shared HTTP session and its connections. Call on application shutdown."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
 
     def get_oauth_login_url(self, state: str) -> URL:
         """Return a Discord Login URL with state."""
@@ -51,23 +106,53 @@ class DiscordOAuthClient:
             state=state,
         )
 
-    @cached(ttl=550, skip_cache_func=lambda _: environ.get(ConfigSection.TEST_ENV) == "true")  # pyright: ignore [reportUnknownLambdaType]
     async def request(self, route: str, token: str, method: str = "GET") -> JSONAny:
+        """
+        Request a Discord API route on behalf of a user.
+
+        Concurrent GET requests of the same route and token share one request to Discord.
+        """
+        with timed("discord"):
+            if method != "GET":
+                return await self._request(route, token, method)
+
+            if self.cache is not None and (cached := await self.cache.get(route, token)) is not None:
+                return cached
+
+            key = (route, token)
+            if (task := self._in_flight.get(key)) is None:
+                task = asyncio.ensure_future(self._request(route, token, method))
+                self._in_flight[key] = task
+                task.add_done_callback(lambda done: self._forget_in_flight(key, done))
+            else:
+                self.coalesced_requests += 1
+            # One caller giving up must not cancel the request for the others
+            return await asyncio.shield(task)
+
+    def _forget_in_flight(self, key: tuple[str, str], task: asyncio.Task[JSONAny]) -> None:
+        self._in_flight.pop(key, None)
+        if not task.cancelled():
+            # Retrieved here in case every caller was cancelled, so it is not logged as never retrieved
+            task.exception()
+
+    async def _request(self, route: str, token: str, method: str) -> JSONAny:
         headers = {"Authorization": f"Bearer {token}"}
         if method == "GET":
-            async with aiohttp.ClientSession() as session:
-                resp = await session.get(f"{DISCORD_API_URL}{route}", headers=headers)
-                data = await resp.json()
+            resp, data = await self.scheduler.send(
+                f"GET {route}", token, lambda: self.session.get(f"{DISCORD_API_URL}{route}", headers=headers)
+            )
         elif method == "POST":
-            async with aiohttp.ClientSession() as session:
-                resp = await session.post(f"{DISCORD_API_URL}{route}", headers=headers)
-                data = await resp.json()
+            resp, data = await self.scheduler.send(
+                f"POST {route}", token, lambda: self.session.post(f"{DISCORD_API_URL}{route}", headers=headers)
+            )
         else:
             raise ValueError(f"Method {method} not supported")
         if resp.status == status.HTTP_401_UNAUTHORIZED:
             raise UnauthorizedError
         if resp.status == status.HTTP_429_TOO_MANY_REQUESTS:
-            raise RateLimitedError(data, dict(resp.headers))
+            raise RateLimitedError(data if isinstance(data, dict) else {}, dict(resp.headers))
+        if method == "GET" and self.cache is not None and resp.status == status.HTTP_200_OK:
+            await self.cache.set(route, token, data)
         return data
 
     async def get_access_token(self, code: str) -> tuple[str | None, str | None]:
@@ -79,10 +164,11 @@ class DiscordOAuthClient:
             "redirect_uri": self.redirect_uri,
             "scope": self.scopes,
         }
-        async with aiohttp.ClientSession() as session:
-            resp = await session.post(DISCORD_TOKEN_URL, data=payload)
-            resp_json: dict[str, Any] = await resp.json()
-            return resp_json.get("access_token"), resp_json.get("refresh_token")
+        _, data = await self.scheduler.send(
+            "POST /oauth2/token", "", lambda: self.session.post(DISCORD_TOKEN_URL, data=payload)
+        )
+        resp_json: dict[str, Any] = data if isinstance(data, dict) else {}
+        return resp_json.get("access_token"), resp_json.get("refresh_token")
 
     async def refresh_access_token(self, refresh_token: str) -> tuple[str | None, str | None]:
         payload = {
@@ -91,10 +177,11 @@ class DiscordOAuthClient:
             "grant_type": "refresh_token",
             "refresh_token": refresh_token,
         }
-        async with aiohttp.ClientSession() as session:
-            resp = await session.post(DISCORD_TOKEN_URL, data=payload)
-            resp_json: dict[str, Any] = await resp.json()
-            return resp_json.get("access_token"), resp_json.get("refresh_token")
+        _, data = await self.scheduler.send(
+            "POST /oauth2/token", "", lambda: self.session.post(DISCORD_TOKEN_URL, data=payload)
+        )
+        resp_json: dict[str, Any] = data if isinstance(data, dict) else {}
+        return resp_json.get("access_token"), resp_json.get("refresh_token")
 
     async def user(self, token: str) -> User:
         if "identify" not in self.scopes:
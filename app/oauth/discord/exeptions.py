@@ -15,8 +15,8 @@ class RateLimitedError(Exception):
     def __init__(self, json: JSONObject, headers: dict[str, str]) -> None:
         self.json: JSONObject = json
         self.headers: dict[str, str] = headers
-        self.message: str = json["message"]
-        self.retry_after: int = json["retry_after"]
+        self.message: str = json.get("message", "You are being rate limited.")
+        self.retry_after: float = json.get("retry_after", 0)
         super().__init__(self.message)
 
 
@@ -0,0 +1,293 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable, Iterable, Mapping
+from dataclasses import dataclass, field
+from typing import Any, override
+
+from aiohttp import ClientResponse
+from app.core.cache import TTLCache
+from app.core.metrics import DISCORD_RATE_LIMITED, DISCORD_REQUEST_DURATION, StatsCollector
+from app.core.typing import JSONAny
+from fastapi import status
+from prometheus_client.core import Metric
+
+
+@dataclass
+class Bucket:
+    """Rate limit state of one Discord bucket, as learned from response headers."""
+
+    limit: int | None = None
+    """Requests allowed per window, None until learned."""
+    remaining: int = 0
+    reset_at: float = 0.0
+    """Monotonic time the current window ends."""
+    window: float | None = None
+    """Discord's reset timestamp of the current window, identifies it."""
+    period: float = 0.0
+    """Length of the last window, assumed for windows started before a response tells otherwise."""
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    """Waiting requests line up on it in FIFO order."""
+    learned: bool = False
+    """Whether rate limit headers of a response told how the bucket is limited."""
+    probing: bool = False
+    """Whether a request learning the limits is in flight."""
+    probed: asyncio.Event = field(default_factory=asyncio.Event)
+    """Set when the request learning the limits finished, whether or not it learned them."""
+
+
+@dataclass
+class GlobalLimit:
+    """Requests sent with one token across all buckets."""
+
+    sent: deque[float]
+    """Send times within the last second."""
+    reset_at: float = 0.0
+    """Monotonic time a global rate limit on the token ends."""
+
+
+@dataclass
+class RateLimitStats:
+    queued: int = 0
+    """Requests currently waiting for their turn."""
+    requests: int = 0
+    delayed: int = 0
+    """Requests that had to wait for a bucket or the global limit."""
+    wait_time: float = 0.0
+    max_wait_time: float = 0.0
+    rate_limited: int = 0
+    """429 responses received despite pacing."""
+    retries: int = 0
+
+
+class RateLimitCollector(StatsCollector):
+    """Exports the `RateLimitStats` of a Discord rate limit scheduler."""
+
+    def __init__(self, stats: RateLimitStats) -> None:
+        self.stats = stats
+
+    @override
+    def collect(self) -> Iterable[Metric]:
+        stats = self.stats
+        yield self.gauge("discord_requests_queued", "Discord requests waiting for their turn", stats.queued)
+        yield self.counter("discord_scheduled_requests", "Discord requests sent by the scheduler", stats.requests)
+        yield self.counter(
+            "discord_delayed_requests", "Discord requests that waited for a bucket or the global limit", stats.delayed
+        )
+        yield self.counter("discord_wait_seconds", "Time Discord requests waited for their turn", stats.wait_time)
+        yield self.gauge(
+            "discord_max_wait_seconds", "Longest time a Discord request waited for its turn", stats.max_wait_time
+        )
+        yield self.counter(
+            "discord_paced_rate_limited", "429 responses from the Discord API despite pacing", stats.rate_limited
+        )
+        yield self.counter("discord_retries", "Retries of rate limited Discord requests", stats.retries)
+
+
+def _header_number(headers: Mapping[str, str], name: str) -> float | None:
+    try:
+        return float(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class RateLimitScheduler:
+    """
+    Paces requests to Discord so they stay within its rate limits.
+
+    Limits are learned per bucket from `X-RateLimit-*` headers. Until a response carries them, requests of the bucket
+    are sent one at a time. Requests of an exhausted bucket wait for its reset in FIFO order instead of being
+    rejected, and all requests respect the global limit of their token.
+    Rate limited requests are retried after `retry_after` with jitter.
+    """
+
+    BUCKET_CACHE_SIZE = 10000
+    BUCKET_CACHE_TTL = 600.0
+    DELAY_THRESHOLD = 0.001
+    """Waits shorter than this are event loop scheduling, not pacing."""
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, global_limit: int = 50, max_retries: int = 3, jitter: float = 0.5) -> None:
+        """
+        Initialize the scheduler.
+
+        Args:
+            global_limit: Requests allowed per second per token across all buckets, 0 disables the limit
+            max_retries: Times a rate limited request is retried before giving up
+            jitter: Maximum random seconds added to `retry_after`, spreads out retries of queued requests
+        """
+        self.global_limit = global_limit
+        self.max_retries = max_retries
+        self.jitter = jitter
+        self.stats = RateLimitStats()
+        self._bucket_ids: dict[str, str] = {}
+        self._buckets: TTLCache[str, Bucket] = TTLCache(self.BUCKET_CACHE_SIZE, self.BUCKET_CACHE_TTL)
+        self._global_limits: TTLCache[str, GlobalLimit] = TTLCache(self.BUCKET_CACHE_SIZE, self.BUCKET_CACHE_TTL)
+
+    def get_bucket(self, route: str, major: str) -> Bucket:
+        """
+        Get the bucket of a route.
+
+        Args:
+            route: Method and route, e.g. `GET /users/@me`
+            major: Identifies whose limit it is, e.g. the access token
+        """
+        key = f"{self._bucket_ids.get(route, route)}:{major}"
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = Bucket()
+        # Refreshes the TTL of buckets in use
+        self._buckets.set(key, bucket)
+        return bucket
+
+    def get_global_limit(self, major: str) -> GlobalLimit:
+        """Get the global limit state of a token, `major` of requests made without one."""
+        global_limit = self._global_limits.get(major)
+        if global_limit is None:
+            global_limit = GlobalLimit(deque(maxlen=self.global_limit))
+        self._global_limits.set(major, global_limit)
+        return global_limit
+
+    async def _wait_global(self, major: str) -> None:
+        global_limit = self.get_global_limit(major)
+        while True:
+            now = time.monotonic()
+            delay = global_limit.reset_at - now
+            if self.global_limit and len(global_limit.sent) == self.global_limit:
+                delay = max(delay, global_limit.sent[0] + 1 - now)
+            if delay <= 0:
+                global_limit.sent.append(now)
+                return
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _release_probe(bucket: Bucket) -> None:
+        bucket.probing = False
+        bucket.probed.set()
+
+    async def _reserve(self, bucket: Bucket, major: str) -> bool:
+        """
+        Wait in line until the bucket and the global limit allow a request, and take it.
+
+        Returns:
+            True if the request has to learn the limits of the bucket, release it with `_release_probe` once sent
+        """
+        async with bucket.lock:
+            while not bucket.learned:
+                if not bucket.probing:
+                    # The first request learns the limits, others wait for it
+                    bucket.probing = True
+                    bucket.probed.clear()
+                    try:
+                        await self._wait_global(major)
+                    except BaseException:
+                        self._release_probe(bucket)
+                        raise
+                    return True
+                await bucket.probed.wait()
+
+            if bucket.limit is not None:
+                now = time.monotonic()
+                if bucket.remaining <= 0 and bucket.reset_at > now:
+                    await asyncio.sleep(bucket.reset_at - now)
+                now = time.monotonic()
+                if bucket.reset_at <= now:
+                    bucket.remaining = bucket.limit
+                    bucket.reset_at = now + bucket.period
+                    bucket.window = None
+                bucket.remaining -= 1
+
+            await self._wait_global(major)
+            return False
+
+    def _update(self, route: str, major: str, bucket: Bucket, headers: Mapping[str, str]) -> None:
+        limit = _header_number(headers, "X-RateLimit-Limit")
+        remaining = _header_number(headers, "X-RateLimit-Remaining")
+        reset_after = _header_number(headers, "X-RateLimit-Reset-After")
+        window = _header_number(headers, "X-RateLimit-Reset")
+
+        if limit is not None and remaining is not None and reset_after is not None:
+            if bucket.limit is not None and window is not None and window == bucket.window:
+                # Responses of concurrent requests in the same window may come out of order
+                bucket.remaining = min(bucket.remaining, int(remaining))
+            else:
+                bucket.remaining = int(remaining)
+                bucket.reset_at = time.monotonic() + reset_after
+                bucket.window = window
+                bucket.period = max(bucket.period, reset_after)
+            bucket.limit = int(limit)
+            bucket.learned = True
+
+        if (bucket_id := headers.get("X-RateLimit-Bucket")) and self._bucket_ids.get(route) != bucket_id:
+            self._bucket_ids[route] = str(bucket_id)
+            # Requests of the route made from now on share what was learned, unless the bucket is already known
+            if self._buckets.get(key := f"{bucket_id}:{major}") is None:
+                self._buckets.set(key, bucket)
+
+    def _handle_rate_limited(self, major: str, data: JSONAny, headers: Mapping[str, str]) -> float:
+        """Remember a rate limit response and get the seconds to wait before retrying."""
+        self.stats.rate_limited += 1
+        body: dict[str, Any] = data if isinstance(data, dict) else {}
+        retry_after = float(body.get("retry_after") or _header_number(headers, "Retry-After") or 1)
+        if body.get("global") or headers.get("X-RateLimit-Global"):
+            self.get_global_limit(major).reset_at = time.monotonic() + retry_after
+        return retry_after
+
+    async def send(
+        self, route: str, major: str, send: Callable[[], Awaitable[ClientResponse]]
+    ) -> tuple[ClientResponse, JSONAny]:
+        """
+        Send a request once its bucket allows it.
+
+        Args:
+            route: Method and route, e.g. `GET /users/@me`
+            major: Identifies whose limit it is, e.g. the access token
+            send: Sends the request
+
+        Returns:
+            Response and its JSON body. Still 429 if retries ran out
+        """
+        attempt = 0
+        while True:
+            bucket = self.get_bucket(route, major)
+            self.stats.queued += 1
+            start = time.monotonic()
+            try:
+                probe = await self._reserve(bucket, major)
+            finally:
+                self.stats.queued -= 1
+            self._record_wait(time.monotonic() - start)
+
+            start = time.perf_counter()
+            try:
+                response = await send()
+                data: JSONAny = await response.json()
+                self._update(route, major, bucket, response.headers)
+            finally:
+                if probe:
+                    # Without rate limit headers the bucket stays unlearned and the next request probes again
+                    self._release_probe(bucket)
+            DISCORD_REQUEST_DURATION.labels(route, response.status).observe(time.perf_counter() - start)
+
+            if response.status != status.HTTP_429_TOO_MANY_REQUESTS:
+                return response, data
+
+            DISCORD_RATE_LIMITED.labels(route).inc()
+            retry_after = self._handle_rate_limited(major, data, response.headers)
+            if attempt >= self.max_retries:
+                return response, data
+
+            attempt += 1
+            self.stats.retries += 1
+            self.logger.warning("Rate limited on %s, retrying in %.2f seconds", route, retry_after)
+            await asyncio.sleep(retry_after + random.uniform(0, self.jitter))
+
+    def _record_wait(self, wait_time: float) -> None:
+        self.stats.requests += 1
+        if wait_time > self.DELAY_THRESHOLD:
+            self.stats.delayed += 1
+        self.stats.wait_time += wait_time
+        self.stats.max_wait_time = max(self.stats.max_wait_time, wait_time)
@@ -0,0 +1,138 @@
+import asyncio
+from typing import Annotated, Any, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import get_config
+from app.core.heap import (
+    AllocationStat,
+    HeapStatus,
+    TracingNotStartedError,
+    count_app_objects,
+    get_heap_diagnostics,
+)
+from app.core.profiler import ProfilerBusyError, profile_collapsed, profile_pstats
+from app.core.slow_requests import get_slow_request_recorder
+from app.deps import AUTH_RESPONSES, verify_bearer
+
+
+router = APIRouter(prefix="/debug", tags=["Debug"], dependencies=[Depends(verify_bearer)], responses=AUTH_RESPONSES)
+
+
+@router.get("/slow_requests", status_code=status.HTTP_200_OK)
+async def get_slow_requests() -> list[dict[str, Any]]:
+    """Latest requests of this worker slower than the configured threshold, newest first."""
+    return [entry.to_dict() for entry in reversed(get_slow_request_recorder().entries)]
+
+
+@router.get(
+    "/profile",
+    status_code=status.HTTP_200_OK,
+    response_class=PlainTextResponse,
+    responses={
+        status.HTTP_404_NOT_FOUND: {"description": "Profiling is disabled"},
+        status.HTTP_409_CONFLICT: {"description": "Another profile is running"},
+    },
+)
+async def get_profile(
+    seconds: Annotated[float, Query(gt=0)] = 10.0, output: Literal["collapsed", "pstats"] = "collapsed"
+) -> str:
+    """
+    Profile the worker handling this request for a number of seconds.
+
+    `collapsed` samples the stacks of all threads, one line per stack for flamegraph tools.
+    `pstats` profiles the event loop thread deterministically and reports functions by cumulative time.
+    """
+    config = get_config().general
+    if not config.profiling_enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profiling is disabled")
+    if seconds > config.profiling_max_seconds:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Profiles are limited to {config.profiling_max_seconds:g} seconds",
+        )
+
+    try:
+        if output == "pstats":
+            return await profile_pstats(seconds)
+        return await profile_collapsed(seconds)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Another profile is running") from e
+
+
+def require_heap_diagnostics() -> None:
+    if not get_config().general.heap_diagnostics_enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Heap diagnostics are disabled")
+
+
+heap_router = APIRouter(
+    prefix="/heap",
+    dependencies=[Depends(require_heap_diagnostics)],
+    responses={status.HTTP_404_NOT_FOUND: {"description": "Heap diagnostics are disabled"}},
+)
+
+HEAP_SNAPSHOT_RESPONSES: dict[int | str, dict[str, Any]] = {
+    status.HTTP_404_NOT_FOUND: {"description": "Heap diagnostics are disabled, or snapshot not found"}
+}
+
+
+@heap_router.get("", status_code=status.HTTP_200_OK)
+async def get_heap_status() -> HeapStatus:
+    return get_heap_diagnostics().status()
+
+
+@heap_router.post("/tracing", status_code=status.HTTP_200_OK)
+async def start_heap_tracing(frames: Annotated[int, Query(ge=1, le=100)] = 1) -> HeapStatus:
+    """Start tracing allocations of this worker. Slows it down and takes memory until stopped."""
+    get_heap_diagnostics().start(frames)
+    return get_heap_diagnostics().status()
+
+
+@heap_router.delete("/tracing", status_code=status.HTTP_200_OK)
+async def stop_heap_tracing() -> HeapStatus:
+    get_heap_diagnostics().stop()
+    return get_heap_diagnostics().status()
+
+
+# Snapshots and object counts walk the whole heap, so they run in a thread to keep the event loop serving
+
+
+@heap_router.post(
+    "/snapshots",
+    status_code=status.HTTP_201_CREATED,
+    responses={status.HTTP_409_CONFLICT: {"description": "Allocations are not traced"}},
+)
+async def take_heap_snapshot() -> int:
+    """Snapshot the traced allocations, returns the snapshot id."""
+    try:
+        return await asyncio.to_thread(get_heap_diagnostics().take_snapshot)
+    except TracingNotStartedError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Allocations are not traced") from e
+
+
+@heap_router.get("/snapshots/{id}", status_code=status.HTTP_200_OK, responses=HEAP_SNAPSHOT_RESPONSES)
+async def get_heap_snapshot(id: int, limit: Annotated[int, Query(ge=1)] = 20) -> list[AllocationStat]:
+    """Lines that allocated the most memory alive in the snapshot."""
+    try:
+        return await asyncio.to_thread(get_heap_diagnostics().top, id, limit)
+    except KeyError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Snapshot not found") from e
+
+
+@heap_router.get("/snapshots/{id}/diff/{other_id}", status_code=status.HTTP_200_OK, responses=HEAP_SNAPSHOT_RESPONSES)
+async def diff_heap_snapshots(id: int, other_id: int, limit: Annotated[int, Query(ge=1)] = 20) -> list[AllocationStat]:
+    """Lines whose allocated memory changed the most from snapshot `id` to the later `other_id`."""
+    try:
+        return await asyncio.to_thread(get_heap_diagnostics().diff, id, other_id, limit)
+    except KeyError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Snapshot not found") from e
+
+
+@heap_router.get("/objects", status_code=status.HTTP_200_OK)
+async def get_app_object_counts() -> dict[str, int]:
+    """Live objects of the app's own types, e.g. `app.database.models.Player`, most common first."""
+    return await asyncio.to_thread(count_app_objects)
+
+
+router.include_router(heap_router)
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends, Response, status
+
+from app.core.metrics import render_latest
+from app.deps import AUTH_RESPONSES, verify_bearer
+
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", status_code=status.HTTP_200_OK, responses=AUTH_RESPONSES, dependencies=[Depends(verify_bearer)])
+async def get_metrics() -> Response:
+    """Metrics of all workers in the Prometheus text exposition format."""
+    content, content_type = render_latest()
+    return Response(content, media_type=content_type)
@@ -6,12 +6,13 @@ from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlmodel import select
 from sqlmodel.sql.expression import Select
 
+from app.core.sweeper import reactivate_if_extended
 from app.core.utils import utcnow2
 from app.database.models import Donation, Player
-from app.deps import SessionDep, verify_bearer
+from app.deps import AsyncSessionDep, ReadSessionDep, verify_bearer
 from app.routes.v1.player import get_or_create_player_by_discord_id
 from app.schemas.v1.donate import DonationPatch, NewDonationDiscord
-from app.schemas.v1.generic import PaginatedResponse, paginate_selection
+from app.schemas.v1.generic import PageQuery, PageSizeQuery, PaginatedResponse, paginate_selection
 
 
 logger = logging.getLogger(__name__)
@@ -38,29 +39,33 @@ def filter_donations(
 
 @router.get("", status_code=status.HTTP_200_OK)
 async def get_donations(
-    session: SessionDep,
+    session: ReadSessionDep,
     request: Request,
     ckey: str | None = None,
     discord_id: str | None = None,
     active_only: bool = True,
-    page: int = 1,
-    page_size: int = 50,
+    page: PageQuery = 1,
+    page_size: PageSizeQuery = 50,
+    cursor: str | None = None,
+    include_total: bool = True,
 ) -> PaginatedResponse[Donation]:
     selection = cast(Select[tuple[Donation]], select(Donation).join(Player))  # pyright: ignore[reportInvalidCast]
     selection = filter_donations(selection, ckey, discord_id, active_only)
 
-    return paginate_selection(session, selection, request, page, page_size)
+    return await paginate_selection(
+        session, selection, request, page, page_size, keys=(Donation.id,), cursor=cursor, include_total=include_total
+    )
 
 
 @router.get("/{id}", status_code=status.HTTP_200_OK)
-async def get_donation_by_id(session: SessionDep, id: int) -> Donation | None:
-    return session.exec(select(Donation).where(Donation.id == id)).first()
+async def get_donation_by_id(session: ReadSessionDep, id: int) -> Donation | None:
+    return (await session.exec(select(Donation).where(Donation.id == id))).first()
 
 
-async def create_donation_helper(session: SessionDep, donation: Donation) -> Donation:
+async def create_donation_helper(session: AsyncSessionDep, donation: Donation) -> Donation:
     session.add(donation)
-    session.commit()
-    session.refresh(donation)
+    await session.commit()
+    await session.refresh(donation)
 
     logger.info("Donation created: %s", donation.model_dump_json())
 
@@ -76,7 +81,7 @@ async def create_donation_helper(session: SessionDep, donation: Donation) -> Don
         status.HTTP_404_NOT_FOUND: {"description": "Player not found"},
     },
 )
-async def create_donation_by_discord(session: SessionDep, new_donation: NewDonationDiscord) -> Donation:
+async def create_donation_by_discord(session: AsyncSessionDep, new_donation: NewDonationDiscord) -> Donation:
     """Creating a new donation from any other identifier doesnt make much sense."""
     player = await get_or_create_player_by_discord_id(session, new_donation.discord_id)
 
@@ -92,15 +97,16 @@ async def create_donation_by_discord(session: SessionDep, new_donation: NewDonat
 
 
 @router.patch("/{id}", status_code=status.HTTP_200_OK, dependencies=[Depends(verify_bearer)])
-async def update_donation(session: SessionDep, id: int, donation_patch: DonationPatch) -> Donation:  # pylint: disable=redefined-builtin
+async def update_donation(session: AsyncSessionDep, id: int, donation_patch: DonationPatch) -> Donation:  # pylint: disable=redefined-builtin
     donation = await get_donation_by_id(session, id)
     if not donation:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Donation not found")
 
     update_data = donation_patch.model_dump(exclude_unset=True)
+    reactivate_if_extended(donation, update_data)
     for key, value in update_data.items():
         setattr(donation, key, value)
 
-    session.commit()
-    session.refresh(donation)
+    await session.commit()
+    await session.refresh(donation)
     return donation
@@ -1,17 +1,25 @@
+import asyncio
 import logging
+from os import environ
+from typing import cast
 
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.responses import RedirectResponse
 from sqlalchemy.exc import IntegrityError
-from sqlmodel import Session, func, select
+from sqlmodel import select
+from sqlmodel.sql.expression import Select
 
-from app.core.config import get_config
+from app.core.cache import CacheCollector
+from app.core.config import ConfigSection, get_config
+from app.core.link_tokens import LinkTokenStoreDep
+from app.core.metrics import register_stats_collector
 from app.core.redis import default_client
-from app.core.utils import utcnow2
-from app.database.models import CkeyLinkToken, Player
-from app.deps import AUTH_RESPONSES, SessionDep, verify_bearer
+from app.database.models import Player
+from app.deps import AUTH_RESPONSES, AsyncSessionDep, ReadSessionDep, verify_bearer
 from app.oauth.discord import DiscordOAuthClient
-from app.schemas.v1.generic import PaginatedResponse
+from app.oauth.discord.cache import DiscordResponseCache
+from app.oauth.discord.ratelimit import RateLimitCollector
+from app.schemas.v1.generic import PageQuery, PageSizeQuery, PaginatedResponse, paginate_selection
 from app.schemas.v1.player import NewPlayer, PlayerPatch
 
 
@@ -27,31 +35,16 @@ oauth_client = DiscordOAuthClient(
     get_config().oauth.client_secret,
     f"{get_config().oauth.endpoint_url}{CALLBACK_PATH}",
     scopes=("identify", "guilds"),
+    connection_limit=get_config().oauth.http_connection_limit,
+    dns_cache_ttl=get_config().oauth.http_dns_cache_ttl,
+    keepalive_timeout=get_config().oauth.http_keepalive_timeout,
+    request_timeout=get_config().oauth.http_timeout,
+    global_rate_limit=get_config().oauth.discord_global_rate_limit,
+    cache=None if environ.get(ConfigSection.TEST_ENV) == "true" else DiscordResponseCache.from_config(),
 )
-
-
-async def get_token_by_ckey(session: Session, ckey: str) -> str:
-    """
-    Get or generate a token for the given player ckey.
-
-    If token doesn't exist - generates a new one.
-    If token already exists, makes sure that it is still valid, if not - regenerates it.
-    """
-    token_entry = session.exec(select(CkeyLinkToken).where(CkeyLinkToken.ckey == ckey)).first()
-    if token_entry is None:
-        token_entry = CkeyLinkToken(ckey=ckey)
-    elif token_entry.expiration_time < utcnow2():
-        session.delete(token_entry)
-        session.commit()
-        token_entry = CkeyLinkToken(ckey=ckey)
-    else:
-        return token_entry.token
-
-    session.add(token_entry)
-    session.commit()
-    session.refresh(token_entry)
-
-    return token_entry.token
+register_stats_collector(RateLimitCollector(oauth_client.scheduler.stats))
+if oauth_client.cache is not None:
+    register_stats_collector(CacheCollector("discord", oauth_client.cache.stats))
 
 
 @oauth_router.get("/login", status_code=status.HTTP_307_TEMPORARY_REDIRECT)
@@ -63,21 +56,23 @@ async def login(token: str) -> RedirectResponse:
 @oauth_router.post(
     "/token", status_code=status.HTTP_201_CREATED, dependencies=[Depends(verify_bearer)], responses=AUTH_RESPONSES
 )
-async def generate_state(session: SessionDep, ckey: str) -> str:
+async def generate_state(link_tokens: LinkTokenStoreDep, ckey: str) -> str:
     """
     Generate a state token for the given ckey and returns it.
 
     The state token is used to validate the authorization flow.
+    If the ckey already has a valid token, it is returned instead.
     """
-    return await get_token_by_ckey(session, ckey)
+    return await link_tokens.get_or_create(ckey)
 
 
 @oauth_router.get(CALLBACK_PATH)
-async def callback(session: SessionDep, code: str, state: str) -> Player:
+async def callback(session: AsyncSessionDep, link_tokens: LinkTokenStoreDep, code: str, state: str) -> Player:
     """
     The callback endpoint for the discord oauth2 flow.
 
     It takes the code and state parameters and verifies the state token.
+    The state token is claimed by one request only, and used up once the link is stored.
 
     If the state token is invalid, it raises a 401 Unauthorized response.
 
@@ -93,7 +88,9 @@ async def callback(session: SessionDep, code: str, state: str) -> Player:
     if discord_token is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not get discord token")
 
-    user_guilds = await oauth_client.guilds(discord_token)
+    user_guilds, discord_user = await asyncio.gather(
+        oauth_client.guilds(discord_token), oauth_client.get_user(discord_token)
+    )
     config = get_config()
     if all(guild.id != config.oauth.discord_server_id for guild in user_guilds):
         raise HTTPException(
@@ -102,33 +99,31 @@ async def callback(session: SessionDep, code: str, state: str) -> Player:
             headers={"Location": config.oauth.discord_server_invite},
         )
 
-    token_string = state
-    token = session.exec(
-        select(CkeyLinkToken)
-        .where(CkeyLinkToken.token == token_string)
-        .where(CkeyLinkToken.expiration_time > utcnow2())
-    ).first()
-    if token is None:
+    ckey = await link_tokens.claim(state)
+    if ckey is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Wrong or expired token")
 
-    ckey = token.ckey
-    discord_user = await oauth_client.get_user(discord_token)
     discord_id = discord_user.id
 
-    if link := session.exec(select(Player).where(Player.discord_id == discord_id)).first():
-        # General player account already exists
-        if link.ckey is not None:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Player already linked")
-
-        logger.debug("Linking a preexisting player %s to ckey %s", link.discord_id, ckey)
-        link.ckey = ckey
-    else:
-        link = Player(ckey=ckey, discord_id=discord_id)
-
-    session.add(link)
-    session.delete(token)
-    session.commit()
-    session.refresh(link)
+    try:
+        if link := (await session.exec(select(Player).where(Player.discord_id == discord_id))).first():
+            # General player account already exists
+            if link.ckey is not None:
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Player already linked")
+
+            logger.debug("Linking a preexisting player %s to ckey %s", link.discord_id, ckey)
+            link.ckey = ckey
+        else:
+            link = Player(ckey=ckey, discord_id=discord_id)
+
+        session.add(link)
+        await session.commit()
+    except BaseException:
+        # The token is only used up by a stored link
+        await link_tokens.restore(state, ckey)
+        raise
+    await link_tokens.revoke(state, ckey)
+    await session.refresh(link)
 
     logger.info("Linked ckey %s to %s", link.ckey, link.discord_id)
     logger.info("New linked user %s guilds: %s", link.discord_id, ", ".join(guild.name for guild in user_guilds))
@@ -143,14 +138,14 @@ async def callback(session: SessionDep, code: str, state: str) -> Player:
 player_router = APIRouter(prefix="/players", tags=["Player"])
 
 
-async def get_or_create_player_by_discord_id(session: SessionDep, discord_id: str) -> Player:
-    result = session.exec(select(Player).where(Player.discord_id == discord_id)).first()
+async def get_or_create_player_by_discord_id(session: AsyncSessionDep, discord_id: str) -> Player:
+    result = (await session.exec(select(Player).where(Player.discord_id == discord_id))).first()
 
     if result is None:
         player = Player(discord_id=discord_id)
         session.add(player)
-        session.commit()
-        session.refresh(player)
+        await session.commit()
+        await session.refresh(player)
         return player
 
     return result
@@ -164,8 +159,8 @@ async def get_or_create_player_by_discord_id(session: SessionDep, discord_id: st
         status.HTTP_404_NOT_FOUND: {"description": "Player not found"},
     },
 )
-async def get_player_by_discord_id(session: SessionDep, discord_id: str) -> Player:
-    result = session.exec(select(Player).where(Player.discord_id == discord_id)).first()
+async def get_player_by_discord_id(session: ReadSessionDep, discord_id: str) -> Player:
+    result = (await session.exec(select(Player).where(Player.discord_id == discord_id))).first()
 
     if result is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Player not found")
@@ -181,8 +176,8 @@ async def get_player_by_discord_id(session: SessionDep, discord_id: str) -> Play
         status.HTTP_404_NOT_FOUND: {"description": "Player not found"},
     },
 )
-async def get_player_by_ckey(session: SessionDep, ckey: str) -> Player:
-    result = session.exec(select(Player).where(Player.ckey == ckey)).first()
+async def get_player_by_ckey(session: ReadSessionDep, ckey: str) -> Player:
+    result = (await session.exec(select(Player).where(Player.ckey == ckey))).first()
 
     if result is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Player not found")
@@ -192,19 +187,29 @@ async def get_player_by_ckey(session: SessionDep, ckey: str) -> Player:
 
 @player_router.get("", status_code=status.HTTP_200_OK)
 async def get_players(
-    session: SessionDep, request: Request, page: int = 1, page_size: int = 50
+    session: ReadSessionDep,
+    request: Request,
+    page: PageQuery = 1,
+    page_size: PageSizeQuery = 50,
+    cursor: str | None = None,
+    include_total: bool = True,
 ) -> PaginatedResponse[Player]:
-    total = session.exec(select(func.count()).select_from(Player)).one()
-    selection = select(Player).offset((page - 1) * page_size).limit(page_size)
-    items = session.exec(selection).all()
-
-    return PaginatedResponse(items=items, total=total, page=page, page_size=page_size, current_url=request.url)
+    return await paginate_selection(
+        session,
+        cast(Select[tuple[Player]], select(Player)),  # pyright: ignore[reportInvalidCast]
+        request,
+        page,
+        page_size,
+        keys=(Player.id,),
+        cursor=cursor,
+        include_total=include_total,
+    )
 
 
 @player_router.post(
     "", status_code=status.HTTP_201_CREATED, responses=AUTH_RESPONSES, dependencies=[Depends(verify_bearer)]
 )
-async def create_player(session: SessionDep, new_player: NewPlayer) -> Player:
+async def create_player(session: AsyncSessionDep, new_player: NewPlayer) -> Player:
     """Used internally and for force linking players manually."""
     # TODO: considering HTTPException as success really smells here
     try:
@@ -218,8 +223,8 @@ async def create_player(session: SessionDep, new_player: NewPlayer) -> Player:
 
     player = Player(**new_player.model_dump())
     session.add(player)
-    session.commit()
-    session.refresh(player)
+    await session.commit()
+    await session.refresh(player)
     logger.info("Force linked %s to %s", player.ckey, player.discord_id)
     await update_player_event(player)
     return player
@@ -233,8 +238,8 @@ async def create_player(session: SessionDep, new_player: NewPlayer) -> Player:
         status.HTTP_404_NOT_FOUND: {"description": "Player not found"},
     },
 )
-async def get_player_by_id(session: SessionDep, id: int) -> Player:  # pylint: disable=redefined-builtin
-    result = session.exec(select(Player).where(Player.id == id)).first()
+async def get_player_by_id(session: ReadSessionDep, id: int) -> Player:  # pylint: disable=redefined-builtin
+    result = (await session.exec(select(Player).where(Player.id == id))).first()
 
     if result is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Player not found")
@@ -245,21 +250,21 @@ async def get_player_by_id(session: SessionDep, id: int) -> Player:  # pylint: d
 @player_router.patch(
     "/{id}", status_code=status.HTTP_200_OK, responses=AUTH_RESPONSES, dependencies=[Depends(verify_bearer)]
 )
-async def update_player(session: SessionDep, id: int, player_patch: PlayerPatch) -> Player:  # pylint: disable=redefined-builtin
+async def update_player(session: AsyncSessionDep, id: int, player_patch: PlayerPatch) -> Player:  # pylint: disable=redefined-builtin
     player = await get_player_by_id(session, id)
     update_data = player_patch.model_dump(exclude_unset=True)
 
     for key, value in update_data.items():
         setattr(player, key, value)
     try:
-        session.commit()
+        await session.commit()
     except IntegrityError as e:
         logger.warning("Update failed. Patch: %s. Error: %s", player_patch, e)
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Update violates database constraints",
         ) from e
-    session.refresh(player)
+    await session.refresh(player)
     logger.info("Player updated: %s", player.model_dump_json())
     await update_player_event(player)
     return player
@@ -1,17 +1,40 @@
 import logging
+from collections.abc import Sequence
+from datetime import datetime, timedelta
 from operator import eq, gt, ne
-from typing import TypeVar, cast
+from typing import Annotated, Any, TypeVar, cast
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status
-from sqlmodel import func, select, update
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from redis import RedisError
+from sqlalchemy import or_, union
+from sqlmodel import col, func, select, update
 from sqlmodel.sql.expression import Select
 
+from app.core.config import get_config
+from app.core.snapshot import etag_matches, get_snapshot_store
+from app.core.sweeper import reactivate_if_extended
 from app.core.utils import utcnow2
-from app.database.models import Player, Whitelist, WhitelistBan
-from app.deps import AUTH_RESPONSES, SessionDep, verify_bearer
+from app.database.models import Player, Whitelist, WhitelistBan, WhitelistChange
+from app.deps import AUTH_RESPONSES, AsyncSessionDep, ReadSessionDep, verify_bearer
 from app.routes.v1.player import get_player_by_discord_id
-from app.schemas.v1.generic import PaginatedResponse, paginate_selection
-from app.schemas.v1.whitelist import NewWhitelist, NewWhitelistBan, WhitelistPatch
+from app.schemas.v1.generic import (
+    PageQuery,
+    PageSizeQuery,
+    PaginatedResponse,
+    decode_cursor,
+    encode_cursor,
+    paginate_selection,
+    paginate_sorted,
+)
+from app.schemas.v1.whitelist import (
+    NewWhitelist,
+    NewWhitelistBan,
+    WhitelistCheck,
+    WhitelistCheckResult,
+    WhitelistDelta,
+    WhitelistPatch,
+    WhitelistStatus,
+)
 
 
 logger = logging.getLogger(__name__)
@@ -23,13 +46,13 @@ whitelist_router = APIRouter(prefix="/whitelists", tags=["Whitelist"])
 
 
 def __filter_whitelists(
-    selection: Select[tuple[T, ...]],
+    selection: Select[T],
     ckey: str | None = None,
     discord_id: str | None = None,
     admin_id: int | None = None,
     server_type: str | None = None,
     active_only: bool = True,
-) -> Select[tuple[T, ...]]:
+) -> Select[T]:
     if active_only:
         selection = select_only_active_whitelists(selection)
     if ckey is not None:
@@ -43,10 +66,91 @@ def __filter_whitelists(
     return selection
 
 
-def select_only_active_whitelists(selection: Select[tuple[T, ...]]) -> Select[tuple[T, ...]]:
+def select_only_active_whitelists(selection: Select[T]) -> Select[T]:
     return selection.where(Whitelist.valid).where(Whitelist.expiration_time > utcnow2())
 
 
+def record_whitelist_change(session: AsyncSessionDep, server_type: str, player_id: int) -> None:
+    """Add a change of the player's whitelist status to the session, for delta syncs."""
+    session.add(WhitelistChange(server_type=server_type, player_id=player_id))
+
+
+# region Snapshots
+
+ALL_SERVER_TYPES = "*"
+
+
+def whitelist_snapshot_scope(server_type: str | None) -> str:
+    return f"whitelist:{server_type if server_type is not None else ALL_SERVER_TYPES}"
+
+
+async def bump_whitelist_snapshots(server_type: str) -> None:
+    """Invalidate cached whitelist snapshots of the server type. Call after committing the change."""
+    await get_snapshot_store().bump(whitelist_snapshot_scope(server_type), whitelist_snapshot_scope(None))
+
+
+async def paginate_whitelist_snapshot(
+    session: AsyncSessionDep,
+    selection: Select[tuple[str]],
+    request: Request,
+    response: Response,
+    *,
+    name: str,
+    key: Any,  # noqa: ANN401
+    server_type: str | None,
+    active_only: bool,
+    page: int,
+    page_size: int,
+    cursor: str | None,
+    include_total: bool,
+    if_none_match: str | None,
+) -> PaginatedResponse[str]:
+    """
+    Paginate a list of whitelisted identifiers from a snapshot cached in Redis.
+
+    The snapshot is looked up by the version of the server type, so unchanged lists are served without
+    touching the database, and with 304 if the client already has the page.
+    Active-only snapshots are kept no longer than until the next whitelist expires.
+    Falls back to querying the database if Redis is unavailable.
+
+    Raises:
+        HTTPException: 304 if `if_none_match` matches the page
+    """
+    store = get_snapshot_store()
+    snapshot_name = f"{name}:{whitelist_snapshot_scope(server_type)}:{active_only}"
+    try:
+        version = await store.get_version(whitelist_snapshot_scope(server_type))
+        snapshot = await store.get(snapshot_name, version)
+        if snapshot is None:
+            # Typed as rows for `paginate_selection`, the selection is of a single column
+            items = sorted(cast(Sequence[str], (await session.scalars(selection)).all()))
+            ttl: float | None = None
+            if active_only:
+                next_expiration_selection = cast(Select[datetime], select(func.min(col(Whitelist.expiration_time))))  # pyright: ignore[reportInvalidCast]
+                next_expiration = await session.scalar(
+                    __filter_whitelists(next_expiration_selection, server_type=server_type)
+                )
+                ttl = (next_expiration - utcnow2()).total_seconds() if next_expiration is not None else None
+            snapshot = await store.store(snapshot_name, version, items, ttl)
+    except RedisError:
+        logger.warning("Whitelist snapshot unavailable, querying the database")
+        return await paginate_selection(
+            session, selection, request, page, page_size, keys=(key,), cursor=cursor, include_total=include_total
+        )
+
+    etag = snapshot.etag(request.url.query)
+    if if_none_match is not None and etag_matches(if_none_match, etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    response.headers["ETag"] = etag
+    return paginate_sorted(
+        snapshot.items, request, page, page_size, keys=(key,), cursor=cursor, include_total=include_total
+    )
+
+
+# endregion
+
+
 # region Get
 
 
@@ -59,37 +163,52 @@ def select_only_active_whitelists(selection: Select[tuple[T, ...]]) -> Select[tu
     },
 )
 async def get_whitelists(
-    session: SessionDep,
+    session: ReadSessionDep,
     request: Request,
     ckey: str | None = None,
     discord_id: str | None = None,
     admin_discord_id: str | None = None,
     server_type: str | None = None,
     active_only: bool = True,
-    page: int = 1,
-    page_size: int = 50,
+    page: PageQuery = 1,
+    page_size: PageSizeQuery = 50,
+    cursor: str | None = None,
+    include_total: bool = True,
 ) -> PaginatedResponse[Whitelist]:
     selection = cast(Select[tuple[Whitelist]], select(Whitelist).join(Player, eq(Player.id, Whitelist.player_id)))  # pyright: ignore[reportInvalidCast]
     admin = await get_player_by_discord_id(session, admin_discord_id) if admin_discord_id is not None else None
     selection = __filter_whitelists(selection, ckey, discord_id, admin and admin.id, server_type, active_only)
 
-    return paginate_selection(session, selection, request, page, page_size)
+    return await paginate_selection(
+        session, selection, request, page, page_size, keys=(Whitelist.id,), cursor=cursor, include_total=include_total
+    )
+
+
+SNAPSHOT_RESPONSES = {
+    status.HTTP_304_NOT_MODIFIED: {"description": "Not modified since the page with the given ETag"},
+}
 
 
+# Snapshots are rendered from the primary, so a lagging replica is never cached under a new version
 @whitelist_router.get(
     "/ckeys",
     status_code=status.HTTP_200_OK,
     responses={
         status.HTTP_200_OK: {"description": "Whitelisted ckeys"},
+        **SNAPSHOT_RESPONSES,
     },
 )
 async def get_whitelisted_ckeys(
-    session: SessionDep,
+    session: AsyncSessionDep,
     request: Request,
+    response: Response,
     server_type: str | None = None,
     active_only: bool = True,
-    page: int = 1,
-    page_size: int = 50,
+    page: PageQuery = 1,
+    page_size: PageSizeQuery = 50,
+    cursor: str | None = None,
+    include_total: bool = True,
+    if_none_match: Annotated[str | None, Header()] = None,
 ) -> PaginatedResponse[str]:
     selection = cast(
         Select[tuple[str]],
@@ -97,7 +216,21 @@ async def get_whitelisted_ckeys(
     )  # pyright: ignore[reportInvalidCast]
     selection = __filter_whitelists(selection, server_type=server_type, active_only=active_only)
 
-    return paginate_selection(session, selection, request, page, page_size)
+    return await paginate_whitelist_snapshot(
+        session,
+        selection,
+        request,
+        response,
+        name="ckeys",
+        key=Player.ckey,
+        server_type=server_type,
+        active_only=active_only,
+        page=page,
+        page_size=page_size,
+        cursor=cursor,
+        include_total=include_total,
+        if_none_match=if_none_match,
+    )
 
 
 @whitelist_router.get(
@@ -105,22 +238,125 @@ async def get_whitelisted_ckeys(
     status_code=status.HTTP_200_OK,
     responses={
         status.HTTP_200_OK: {"description": "Whitelisted discord ids"},
+        **SNAPSHOT_RESPONSES,
     },
 )
 async def get_whitelisted_discord_ids(
-    session: SessionDep,
+    session: AsyncSessionDep,
     request: Request,
+    response: Response,
     server_type: str | None = None,
     active_only: bool = True,
-    page: int = 1,
-    page_size: int = 50,
+    page: PageQuery = 1,
+    page_size: PageSizeQuery = 50,
+    cursor: str | None = None,
+    include_total: bool = True,
+    if_none_match: Annotated[str | None, Header()] = None,
 ) -> PaginatedResponse[str]:
     selection = cast(
         Select[tuple[str]], select(Player.discord_id).join(Whitelist, eq(Player.id, Whitelist.player_id)).distinct()
     )  # pyright: ignore[reportInvalidCast]
     selection = __filter_whitelists(selection, server_type=server_type, active_only=active_only)
 
-    return paginate_selection(session, selection, request, page, page_size)
+    return await paginate_whitelist_snapshot(
+        session,
+        selection,
+        request,
+        response,
+        name="discord_ids",
+        key=Player.discord_id,
+        server_type=server_type,
+        active_only=active_only,
+        page=page,
+        page_size=page_size,
+        cursor=cursor,
+        include_total=include_total,
+        if_none_match=if_none_match,
+    )
+
+
+WHITELIST_CHANGE_SETTLE_TIME = timedelta(seconds=10)
+"""
+Changes younger than this are sent again by the next delta.
+Sequence numbers are assigned on insert, so a slow transaction could still commit a lower one.
+"""
+
+
+@whitelist_router.get(
+    "/delta",
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {"description": "Whitelist changes since the cursor"},
+        status.HTTP_400_BAD_REQUEST: {"description": "Invalid cursor"},
+        status.HTTP_410_GONE: {"description": "Changes since the cursor are no longer kept, fetch the full list"},
+    },
+)
+async def get_whitelist_delta(session: AsyncSessionDep, server_type: str, since: str | None = None) -> WhitelistDelta:
+    """
+    Get ckeys and discord ids whose whitelist status changed since the cursor, including expirations.
+
+    Without `since` an empty delta is returned, only to get a cursor to start from.
+    Get the cursor first, then the full list, then poll with the cursor of every delta.
+    Cursors older than the change retention get 410, start over from the full list then.
+    """
+    now = utcnow2()
+    last_seq, synced_time = (
+        decode_cursor(since, (WhitelistChange.id, WhitelistChange.change_time)) if since is not None else (0, now)
+    )
+    retention = timedelta(seconds=get_config().general.whitelist_change_retention)
+    if now - synced_time > retention - WHITELIST_CHANGE_SETTLE_TIME:
+        # Changes after the cursor may already be deleted by the expiration sweeper
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Cursor expired")
+
+    settled_seq = (
+        await session.exec(
+            select(func.max(col(WhitelistChange.id)))
+            .where(col(WhitelistChange.id) > last_seq)
+            .where(col(WhitelistChange.change_time) <= now - WHITELIST_CHANGE_SETTLE_TIME)
+        )
+    ).one()
+    delta = WhitelistDelta(
+        added_ckeys=[],
+        removed_ckeys=[],
+        added_discord_ids=[],
+        removed_discord_ids=[],
+        cursor=encode_cursor([max(settled_seq or 0, last_seq), now]),
+    )
+    if since is None:
+        return delta
+
+    changed_players = (
+        select(WhitelistChange.player_id)
+        .where(WhitelistChange.server_type == server_type)
+        .where(col(WhitelistChange.id) > last_seq)
+    )
+    expired_players = (
+        select(Whitelist.player_id)
+        .where(Whitelist.server_type == server_type)
+        .where(Whitelist.valid)
+        .where(Whitelist.expiration_time > synced_time)
+        .where(Whitelist.expiration_time <= now)
+    )
+    active = select_only_active_whitelists(
+        cast(
+            Select[int],
+            select(col(Whitelist.id))
+            .where(Whitelist.player_id == Player.id)
+            .where(Whitelist.server_type == server_type),
+        )  # pyright: ignore[reportInvalidCast]
+    ).exists()
+    players = await session.exec(
+        select(Player.ckey, Player.discord_id, active).where(
+            col(Player.id).in_(union(changed_players, expired_players))
+        )
+    )
+
+    for ckey, discord_id, is_active in players:
+        if ckey is not None:
+            (delta.added_ckeys if is_active else delta.removed_ckeys).append(ckey)
+        (delta.added_discord_ids if is_active else delta.removed_discord_ids).append(discord_id)
+
+    return delta
 
 
 @whitelist_router.get(
@@ -131,8 +367,8 @@ async def get_whitelisted_discord_ids(
         status.HTTP_404_NOT_FOUND: {"description": "Whitelist not found"},
     },
 )
-def get_whitelist(session: SessionDep, id: int) -> Whitelist:
-    wl = session.exec(select(Whitelist).where(Whitelist.id == id)).first()
+async def get_whitelist(session: ReadSessionDep, id: int) -> Whitelist:
+    wl = (await session.exec(select(Whitelist).where(Whitelist.id == id))).first()
 
     if wl is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Whitelist not found")
@@ -140,6 +376,58 @@ def get_whitelist(session: SessionDep, id: int) -> Whitelist:
     return wl
 
 
+# endregion
+# region Check
+
+
+@whitelist_router.post(
+    "/check",
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {"description": "Whitelist and ban status of every checked player"},
+    },
+)
+async def check_whitelists(session: ReadSessionDep, check: WhitelistCheck) -> WhitelistCheckResult:
+    """Check whitelist and ban status of many players at once, e.g. on round start."""
+    whitelisted = select_only_active_whitelists(
+        cast(
+            Select[int],
+            select(col(Whitelist.id))
+            .where(Whitelist.player_id == Player.id)
+            .where(Whitelist.server_type == check.server_type),
+        )  # pyright: ignore[reportInvalidCast]
+    ).exists()
+    banned = select_only_active_whitelist_bans(
+        cast(
+            Select[int],
+            select(col(WhitelistBan.id))
+            .where(WhitelistBan.player_id == Player.id)
+            .where(WhitelistBan.server_type == check.server_type),
+        )  # pyright: ignore[reportInvalidCast]
+    ).exists()
+
+    not_listed = WhitelistStatus(whitelisted=False, banned=False)
+    result = WhitelistCheckResult(
+        ckeys=dict.fromkeys(check.ckeys, not_listed), discord_ids=dict.fromkeys(check.discord_ids, not_listed)
+    )
+    if not check.ckeys and not check.discord_ids:
+        return result
+
+    players = await session.exec(
+        select(Player.ckey, Player.discord_id, whitelisted, banned).where(
+            or_(col(Player.ckey).in_(check.ckeys), col(Player.discord_id).in_(check.discord_ids))
+        )
+    )
+    for ckey, discord_id, is_whitelisted, is_banned in players:
+        player_status = WhitelistStatus(whitelisted=is_whitelisted, banned=is_banned)
+        if ckey in result.ckeys:
+            result.ckeys[ckey] = player_status
+        if discord_id in result.discord_ids:
+            result.discord_ids[discord_id] = player_status
+
+    return result
+
+
 # endregion
 # region Post
 
@@ -155,10 +443,10 @@ WHITELIST_POST_RESPONSES = {
 @whitelist_router.post(
     "", status_code=status.HTTP_201_CREATED, responses=WHITELIST_POST_RESPONSES, dependencies=[Depends(verify_bearer)]
 )
-async def create_whitelist(session: SessionDep, new_wl: NewWhitelist, ignore_bans: bool = False) -> Whitelist:
+async def create_whitelist(session: AsyncSessionDep, new_wl: NewWhitelist, ignore_bans: bool = False) -> Whitelist:
     # TODO: wls only by discord and use `get_or_create_player_by_discord_id()`
-    player = session.exec(select(Player).where(new_wl.get_player_clause())).first()
-    admin = session.exec(select(Player).where(new_wl.get_admin_clause())).first()
+    player = (await session.exec(select(Player).where(new_wl.get_player_clause()))).first()
+    admin = (await session.exec(select(Player).where(new_wl.get_admin_clause()))).first()
 
     if player is None or admin is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Player or admin not found")
@@ -174,7 +462,7 @@ async def create_whitelist(session: SessionDep, new_wl: NewWhitelist, ignore_ban
         )
         selection = select_only_active_whitelist_bans(selection)
 
-        if session.exec(selection).first() is not None:
+        if (await session.exec(selection)).first() is not None:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT, detail="Player is banned from this type of whitelist."
             )
@@ -186,8 +474,10 @@ async def create_whitelist(session: SessionDep, new_wl: NewWhitelist, ignore_ban
         admin_id=admin.id,  # pyright: ignore[reportArgumentType]
     )
     session.add(wl)
-    session.commit()
-    session.refresh(wl)
+    record_whitelist_change(session, wl.server_type, wl.player_id)
+    await session.commit()
+    await session.refresh(wl)
+    await bump_whitelist_snapshots(wl.server_type)
     logger.info("Whitelist created: %s", wl.model_dump_json())
     return wl
 
@@ -205,14 +495,17 @@ WHITELIST_PATCH_RESPONSES = {
 @whitelist_router.patch(
     "/{id}", status_code=status.HTTP_200_OK, responses=WHITELIST_PATCH_RESPONSES, dependencies=[Depends(verify_bearer)]
 )
-async def update_whitelist(session: SessionDep, id: int, wl_patch: WhitelistPatch) -> Whitelist:  # pylint: disable=redefined-builtin
-    wl = get_whitelist(session, id)
+async def update_whitelist(session: AsyncSessionDep, id: int, wl_patch: WhitelistPatch) -> Whitelist:  # pylint: disable=redefined-builtin
+    wl = await get_whitelist(session, id)
     update_data = wl_patch.model_dump(exclude_unset=True)
+    reactivate_if_extended(wl, update_data)
     for key, value in update_data.items():
         setattr(wl, key, value)
 
-    session.commit()
-    session.refresh(wl)
+    record_whitelist_change(session, wl.server_type, wl.player_id)
+    await session.commit()
+    await session.refresh(wl)
+    await bump_whitelist_snapshots(wl.server_type)
     logger.info("Whitelist updated: %s", wl.model_dump_json())
     return wl
 
@@ -254,15 +547,17 @@ def select_only_active_whitelist_bans(selection: Select[T]) -> Select[T]:
 
 @whitelist_ban_router.get("", status_code=status.HTTP_200_OK)
 async def get_whitelist_bans(
-    session: SessionDep,
+    session: ReadSessionDep,
     request: Request,
     ckey: str | None = None,
     discord_id: str | None = None,
     admin_discord_id: str | None = None,
     server_type: str | None = None,
     active_only: bool = True,
-    page: int = 1,
-    page_size: int = 50,
+    page: PageQuery = 1,
+    page_size: PageSizeQuery = 50,
+    cursor: str | None = None,
+    include_total: bool = True,
 ) -> PaginatedResponse[WhitelistBan]:
     selection = cast(
         Select[tuple[WhitelistBan]], select(WhitelistBan).join(Player, eq(Player.id, WhitelistBan.player_id))
@@ -271,16 +566,16 @@ async def get_whitelist_bans(
     admin = await get_player_by_discord_id(session, admin_discord_id) if admin_discord_id is not None else None
 
     selection = filter_whitelist_bans(selection, ckey, discord_id, admin and admin.id, server_type, active_only)
-    total = session.exec(select(func.count()).select_from(selection.subquery())).one()
-    selection = selection.offset((page - 1) * page_size).limit(page_size)
-    items = session.exec(selection).all()
 
-    return PaginatedResponse(
-        items=items,
-        total=total,
-        page=page,
-        page_size=page_size,
-        current_url=request.url,
+    return await paginate_selection(
+        session,
+        selection,
+        request,
+        page,
+        page_size,
+        keys=(WhitelistBan.id,),
+        cursor=cursor,
+        include_total=include_total,
     )
 
 
@@ -292,8 +587,8 @@ async def get_whitelist_bans(
         status.HTTP_404_NOT_FOUND: {"description": "Whitelist not found"},
     },
 )
-async def get_whitelist_ban(session: SessionDep, id: int) -> WhitelistBan:
-    wl_ban = session.exec(select(WhitelistBan).where(WhitelistBan.id == id)).first()
+async def get_whitelist_ban(session: ReadSessionDep, id: int) -> WhitelistBan:
+    wl_ban = (await session.exec(select(WhitelistBan).where(WhitelistBan.id == id))).first()
 
     if wl_ban is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Whitelist ban not found")
@@ -316,10 +611,10 @@ BAN_POST_RESPONSES = {
     "", status_code=status.HTTP_201_CREATED, responses=BAN_POST_RESPONSES, dependencies=[Depends(verify_bearer)]
 )
 async def create_whitelist_ban(
-    session: SessionDep, new_ban: NewWhitelistBan, invalidate_wls: bool = True
+    session: AsyncSessionDep, new_ban: NewWhitelistBan, invalidate_wls: bool = True
 ) -> WhitelistBan:
-    player = session.exec(select(Player).where(new_ban.get_player_clause())).first()
-    admin = session.exec(select(Player).where(new_ban.get_admin_clause())).first()
+    player = (await session.exec(select(Player).where(new_ban.get_player_clause()))).first()
+    admin = (await session.exec(select(Player).where(new_ban.get_admin_clause()))).first()
 
     if player is None or admin is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Player or admin not found")
@@ -327,12 +622,13 @@ async def create_whitelist_ban(
     if invalidate_wls:
         query = (
             update(Whitelist)
-            .values(valid=False)
+            .values(valid=False, expired_by_sweeper=False)
             .where(eq(Whitelist.player_id, player.id))
             .where(eq(Whitelist.server_type, new_ban.server_type))
-            .where(gt(Whitelist.expiration_time, utcnow2()))
+            # Expired whitelists are revoked too, so extending them later does not undo the ban
+            .where(or_(gt(Whitelist.expiration_time, utcnow2()), col(Whitelist.expired_by_sweeper)))
         )
-        session.execute(query)  # pyright: ignore[reportDeprecated]
+        await session.execute(query)  # pyright: ignore[reportDeprecated]
 
     ban = WhitelistBan(
         **new_ban.model_dump(),
@@ -341,8 +637,11 @@ async def create_whitelist_ban(
         admin_id=admin.id,  # pyright: ignore[reportArgumentType]
     )
     session.add(ban)
-    session.commit()
-    session.refresh(ban)
+    record_whitelist_change(session, ban.server_type, ban.player_id)
+    await session.commit()
+    await session.refresh(ban)
+    if invalidate_wls:
+        await bump_whitelist_snapshots(ban.server_type)
     logger.info("Whitelist ban created: %s", ban.model_dump_json())
     return ban
 
@@ -363,15 +662,17 @@ WHITELIST_BAN_PATCH_RESPONSES = {
     responses=WHITELIST_BAN_PATCH_RESPONSES,
     dependencies=[Depends(verify_bearer)],
 )
-async def update_whitelist_ban(session: SessionDep, id: int, wl_ban_patch: WhitelistPatch) -> WhitelistBan:
+async def update_whitelist_ban(session: AsyncSessionDep, id: int, wl_ban_patch: WhitelistPatch) -> WhitelistBan:
     ban = await get_whitelist_ban(session, id)
 
     update_data = wl_ban_patch.model_dump(exclude_unset=True)
+    reactivate_if_extended(ban, update_data)
     for key, value in update_data.items():
         setattr(ban, key, value)
 
-    session.commit()
-    session.refresh(ban)
+    record_whitelist_change(session, ban.server_type, ban.player_id)
+    await session.commit()
+    await session.refresh(ban)
     logger.info("Whitelist ban updated: %s", ban.model_dump_json())
     return ban
 
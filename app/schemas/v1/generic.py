@@ -1,9 +1,16 @@
-from typing import TYPE_CHECKING, Any, Generic, TypeVar
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from bisect import bisect_right
+from collections.abc import Sequence
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING, Annotated, Any, Generic, TypeVar
 
-from app.deps import SessionDep
-from fastapi import Request
+from app.deps import AsyncSessionDep
+from fastapi import HTTPException, Query, Request, status
 from pydantic import BaseModel
-from sqlmodel import func, select
+from sqlalchemy import ColumnElement, DateTime, Integer, String, and_, or_
+from sqlmodel import AutoString, SQLModel, func, select
 from sqlmodel.sql.expression import Select
 
 
@@ -13,40 +20,208 @@ if TYPE_CHECKING:
 
 T = TypeVar("T")
 
+PageQuery = Annotated[int, Query(ge=1)]
+"""Page number query parameter, starting at 1."""
+PageSizeQuery = Annotated[int, Query(ge=1)]
+"""Items per page query parameter, an empty page would have no item to continue a cursor from."""
+
 
 class PaginatedResponse(BaseModel, Generic[T]):
     items: list[T]
-    total: int
+    total: int | None
     page: int
     page_size: int
     next_page: int | None = None
     previous_page: int | None = None
     next_page_path: str | None = None
     previous_page_path: str | None = None
+    next_cursor: str | None = None
+    """Opaque cursor of the next page, pass it as `cursor` to continue after the last item."""
+
+
+def page_links(page: int, has_more: bool, url: "URL | None" = None) -> dict[str, Any]:
+    """
+    Links to the neighbouring pages of a page located by number.
+
+    Computed before the response is made, as FastAPI validates the returned model again into the response model.
+
+    Returns:
+        Values of the `next_page*` and `previous_page*` fields
+    """
+    links: dict[str, Any] = {}
+    if has_more:
+        links["next_page"] = page + 1
+        links["next_page_path"] = url.include_query_params(page=page + 1).path if url else None
+    if page > 1:
+        links["previous_page"] = page - 1
+        links["previous_page_path"] = url.include_query_params(page=page - 1).path if url else None
+    return links
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode key values of the last item of a page into an opaque cursor."""
+    payload = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+    return urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
 
-    def __init__(self, **data: Any) -> None:  # noqa: ANN401
-        super().__init__(**data)
-        url: URL | None = data.get("current_url")
+def decode_cursor_value(key: Any, value: Any) -> Any:  # noqa: ANN401
+    """
+    Convert a value decoded from JSON back into the type of its key column.
+
+    Raises:
+        TypeError: If the value does not fit the column type, or the column type is not supported as a key
+    """
+    key_type = key.type
+    if isinstance(key_type, DateTime):
+        if isinstance(value, str):
+            decoded = datetime.fromisoformat(value)
+            # Columns hold naive UTC, an offset would make comparisons with them fail
+            if decoded.tzinfo is not None:
+                decoded = decoded.astimezone(UTC).replace(tzinfo=None)
+            return decoded
+    elif isinstance(key_type, String | AutoString):
+        if isinstance(value, str):
+            return value
+    elif isinstance(key_type, Integer):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+    else:
+        raise TypeError(f"Unsupported cursor key type {key_type!r}")
+    raise TypeError(f"Cursor value {value!r} does not match key type {key_type!r}")
+
+
+def decode_cursor(cursor: str, keys: Sequence[Any]) -> list[Any]:
+    """
+    Decode a cursor made by `encode_cursor` back into values of the given keys.
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed or does not match the keys
+    """
+    try:
+        values = json.loads(urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(keys):  # pyright: ignore[reportUnknownArgumentType]
+            raise ValueError("Cursor does not match pagination keys")
+        return [
+            decode_cursor_value(key, value)
+            for key, value in zip(keys, values, strict=True)  # pyright: ignore[reportUnknownArgumentType, reportUnknownVariableType]
+        ]
+    except (ValueError, TypeError, binascii.Error) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from e
+
+
+def after_cursor(keys: Sequence[Any], values: Sequence[Any]) -> ColumnElement[bool]:
+    """
+    Build a clause selecting rows ordered after the given key values.
+
+    Expanded into `k1 > v1 OR (k1 = v1 AND k2 > v2) ...`, as row value comparisons
+    are not used for index range scans by every supported database.
+    """
+    return or_(
+        *(
+            and_(*(key == value for key, value in zip(keys[:i], values[:i], strict=True)), keys[i] > values[i])
+            for i in range(len(keys))
+        )
+    )
 
-        if (self.page * self.page_size) < self.total:
-            self.next_page = self.page + 1
-            self.next_page_path = url.include_query_params(page=self.next_page).path if url else None
-        if self.page > 1:
-            self.previous_page = self.page - 1
-            self.previous_page_path = url.include_query_params(page=self.previous_page).path if url else None
 
+def cursor_values(item: Any, keys: Sequence[Any]) -> list[Any]:  # noqa: ANN401
+    """Get key values of an item. Items that are not models are selected key columns themselves."""
+    if isinstance(item, SQLModel):
+        return [getattr(item, key.key) for key in keys]
+    return [item]
 
-def paginate_selection(
-    session: SessionDep, selection: Select[tuple[T, ...]], request: Request, page: int, page_size: int
+
+async def paginate_selection(
+    session: AsyncSessionDep,
+    selection: Select[tuple[T, ...]],
+    request: Request,
+    page: int,
+    page_size: int,
+    *,
+    keys: Sequence[Any],
+    cursor: str | None = None,
+    include_total: bool = True,
 ) -> PaginatedResponse[T]:
-    total: int = session.exec(select(func.count()).select_from(selection.subquery())).one()
-    selection = selection.offset((page - 1) * page_size).limit(page_size)
-    items: Any = session.exec(selection).all()
+    """
+    Paginate a selection either by page number or by cursor.
+
+    Items are always ordered by `keys`, which have to uniquely identify a row
+    (primary key or e.g. `(expiration_time, id)`). When `cursor` is given, the page is located
+    with a keyset condition on `keys` instead of an offset, so deep pages cost the same as the first one.
+
+    Args:
+        session: Database session
+        selection: Selection to paginate
+        request: Current request, used to build page links
+        page: Page number, ignored when `cursor` is given
+        page_size: Number of items per page
+        keys: Columns the items are ordered by
+        cursor: Cursor returned as `next_cursor` by the previous page
+        include_total: Whether to count all matching items. Counting scans the whole selection
+
+    Returns:
+        Page of items
+    """
+    total: int | None = None
+    if include_total:
+        total = (await session.exec(select(func.count()).select_from(selection.subquery()))).one()
+
+    selection = selection.order_by(*keys)
+    if cursor is not None:
+        selection = selection.where(after_cursor(keys, decode_cursor(cursor, keys)))
+    else:
+        selection = selection.offset((page - 1) * page_size)
+
+    # One extra item tells whether there is a next page without counting
+    items: list[Any] = list((await session.exec(selection.limit(page_size + 1))).all())
+    has_more = len(items) > page_size
+    items = items[:page_size]
 
     return PaginatedResponse(
         items=items,
         total=total,
         page=page,
         page_size=page_size,
-        current_url=request.url,
+        next_cursor=encode_cursor(cursor_values(items[-1], keys)) if has_more and items else None,
+        # Page numbers are meaningless when walking by cursor
+        **(page_links(page, has_more, request.url) if cursor is None else {}),
+    )
+
+
+def paginate_sorted(
+    items: Sequence[Any],
+    request: Request,
+    page: int,
+    page_size: int,
+    *,
+    keys: Sequence[Any],
+    cursor: str | None = None,
+    include_total: bool = True,
+) -> PaginatedResponse[Any]:
+    """
+    Paginate a sorted sequence of unique key values the same way as `paginate_selection`.
+
+    Args:
+        items: Values of the single key column, sorted
+        request: Current request, used to build page links
+        page: Page number, ignored when `cursor` is given
+        page_size: Number of items per page
+        keys: Column the items are values of
+        cursor: Cursor returned as `next_cursor` by the previous page
+        include_total: Whether to return the number of items
+
+    Returns:
+        Page of items
+    """
+    start = bisect_right(items, decode_cursor(cursor, keys)[0]) if cursor is not None else (page - 1) * page_size
+    page_items = list(items[start : start + page_size])
+    has_more = start + page_size < len(items)
+
+    return PaginatedResponse(
+        items=page_items,
+        total=len(items) if include_total else None,
+        page=page,
+        page_size=page_size,
+        next_cursor=encode_cursor([page_items[-1]]) if has_more and page_items else None,
+        **(page_links(page, has_more, request.url) if cursor is None else {}),
     )
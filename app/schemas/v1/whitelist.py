@@ -4,7 +4,7 @@ from typing import override
 
 from app.core.utils import utcnow2
 from app.database.models import Player
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 # endregion
@@ -73,3 +73,43 @@ NewWhitelistBan = NewWhitelistBanDiscord | NewWhitelistBanCkey
 class WhitelistPatch(BaseModel):
     valid: bool | None = None
     expiration_time: datetime | None = None
+
+
+# endregion
+# region Delta
+class WhitelistDelta(BaseModel):
+    """
+    Whitelist changes of a server type since a cursor.
+
+    Players are reported by their current state, so applying a delta more than once is harmless.
+    """
+
+    added_ckeys: list[str]
+    removed_ckeys: list[str]
+    added_discord_ids: list[str]
+    removed_discord_ids: list[str]
+    cursor: str
+    """Pass as `since` to get the changes after this delta."""
+
+
+# endregion
+# region Check
+MAX_CHECKED_PLAYERS = 5000
+
+
+class WhitelistCheck(BaseModel):
+    server_type: str
+    ckeys: list[str] = Field(default_factory=list, max_length=MAX_CHECKED_PLAYERS)
+    discord_ids: list[str] = Field(default_factory=list, max_length=MAX_CHECKED_PLAYERS)
+
+
+class WhitelistStatus(BaseModel):
+    whitelisted: bool
+    banned: bool
+
+
+class WhitelistCheckResult(BaseModel):
+    """Statuses of the checked players. Unknown players are not whitelisted and not banned."""
+
+    ckeys: dict[str, WhitelistStatus]
+    discord_ids: dict[str, WhitelistStatus]
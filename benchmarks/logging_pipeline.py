@@ -0,0 +1,121 @@
+"""
+Latency of `logger.info` in request code and records/sec, with handlers called directly versus queued.
+
+Emulates concurrent requests on one event loop, each logging a few records. The handlers are the file and
+console handlers of `log_config.yaml`, writing to a temporary directory and /dev/null.
+
+Usage:
+    python -m benchmarks.logging_pipeline [--requests 2000] [--concurrency 100] [--records 5]
+"""
+
+import argparse
+import asyncio
+import logging
+import logging.handlers
+import os
+import statistics
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from app.core.log_handlers import QueueFanoutHandler, log_dispatcher
+
+
+FORMAT = "%(asctime)s - %(levelname)s - %(name)s - %(process)d:%(processName)s - %(funcName)s:%(lineno)d - %(message)s"
+
+
+def make_handlers(directory: Path) -> list[logging.Handler]:
+    formatter = logging.Formatter(FORMAT)
+    handlers: list[logging.Handler] = [
+        logging.handlers.RotatingFileHandler(directory / "debug.log", maxBytes=10485760, backupCount=5),
+        logging.handlers.RotatingFileHandler(directory / "errors.log", maxBytes=10485760, backupCount=5),
+        logging.StreamHandler(Path(os.devnull).open("w")),  # noqa: SIM115
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+async def request(logger: logging.Logger, index: int, records: int, latencies: list[float]) -> None:
+    for record in range(records):
+        start = time.perf_counter()
+        logger.info("Request %d handled step %d for %s", index, record, "player")
+        latencies.append(time.perf_counter() - start)
+        # Other requests run between log calls, as they would between awaits
+        await asyncio.sleep(0)
+
+
+async def run(logger: logging.Logger, requests: int, concurrency: int, records: int) -> list[float]:
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(index: int) -> None:
+        async with semaphore:
+            await request(logger, index, records, latencies)
+
+    await asyncio.gather(*(limited(index) for index in range(requests)))
+    return latencies
+
+
+def measure(
+    name: str,
+    handlers: list[logging.Handler],
+    drain: Callable[[], None],
+    *,
+    requests: int,
+    concurrency: int,
+    records: int,
+) -> None:
+    logger = logging.getLogger(f"benchmark.{name}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    for handler in handlers:
+        logger.addHandler(handler)
+
+    start = time.perf_counter()
+    latencies = asyncio.run(run(logger, requests, concurrency, records))
+    in_loop = time.perf_counter() - start
+    drain()
+    total = time.perf_counter() - start
+    for handler in handlers:
+        logger.removeHandler(handler)
+
+    latencies_us = sorted(latency * 1_000_000 for latency in latencies)
+    p99 = latencies_us[int(len(latencies_us) * 0.99) - 1]
+    print(
+        f"{name:>8}: logger.info median {statistics.median(latencies_us):6.1f} us, p99 {p99:7.1f} us, "
+        f"event loop {len(latencies) / in_loop:9.0f} records/s, handled {len(latencies) / total:9.0f} records/s"
+    )
+
+
+def main(requests: int, concurrency: int, records: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{requests} requests, {concurrency} concurrent, {records} records each")
+
+        (Path(directory) / "direct").mkdir()
+        direct_handlers = make_handlers(Path(directory) / "direct")
+        measure("direct", direct_handlers, lambda: None, requests=requests, concurrency=concurrency, records=records)
+
+        (Path(directory) / "queued").mkdir()
+        queued_handlers = make_handlers(Path(directory) / "queued")
+        measure(
+            "queued",
+            [QueueFanoutHandler(handlers=queued_handlers)],
+            log_dispatcher.flush,
+            requests=requests,
+            concurrency=concurrency,
+            records=records,
+        )
+
+        for handler in (*direct_handlers, *queued_handlers):
+            handler.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--records", type=int, default=5)
+    args = parser.parse_args()
+    main(args.requests, args.concurrency, args.records)
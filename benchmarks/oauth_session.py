@@ -0,0 +1,127 @@
+"""
+Per-callback latency of `DiscordOAuthClient` with a shared session versus a new session per request.
+
+Runs a local stand-in for the Discord endpoints used by the OAuth callback, behind a TCP proxy
+that delays every new connection to emulate TCP and TLS handshakes to discord.com.
+
+Usage:
+    python -m benchmarks.oauth_session [--callbacks 200] [--handshake-ms 30]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+
+import app.oauth.discord.client as discord_client
+from aiohttp import web
+from app.oauth.discord.client import DiscordOAuthClient
+
+
+async def token(_: web.Request) -> web.Response:
+    return web.json_response({"access_token": "access", "refresh_token": "refresh"})
+
+
+async def user(_: web.Request) -> web.Response:
+    return web.json_response({"id": "1", "username": "user", "discriminator": "0", "avatar": None})
+
+
+async def guilds(_: web.Request) -> web.Response:
+    return web.json_response([])
+
+
+async def start_stand_in() -> tuple[web.AppRunner, int]:
+    application = web.Application()
+    application.router.add_post("/api/oauth2/token", token)
+    application.router.add_get("/api/v10/users/@me", user)
+    application.router.add_get("/api/v10/users/@me/guilds", guilds)
+
+    runner = web.AppRunner(application, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, site._server.sockets[0].getsockname()[1]  # pyright: ignore[reportOptionalMemberAccess, reportPrivateUsage]
+
+
+async def start_handshake_proxy(target_port: int, handshake_delay: float) -> asyncio.Server:
+    """Forward connections to the stand-in, delaying each new one by `handshake_delay` seconds."""
+
+    async def pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while data := await reader.read(65536):
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle(client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter) -> None:
+        await asyncio.sleep(handshake_delay)
+        server_reader, server_writer = await asyncio.open_connection("127.0.0.1", target_port)
+        await asyncio.gather(pipe(client_reader, server_writer), pipe(server_reader, client_writer))
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+async def callback(client: DiscordOAuthClient, index: int, after_request: Callable[[], Awaitable[None]]) -> None:
+    """Discord calls made by the OAuth callback."""
+    await client.get_access_token(f"code-{index}")
+    await after_request()
+    await client.guilds(f"access-{index}")
+    await after_request()
+    await client.get_user(f"access-{index}")
+    await after_request()
+
+
+async def measure(client: DiscordOAuthClient, callbacks: int, offset: int, *, shared: bool) -> list[float]:
+    async def after_request() -> None:
+        if not shared:
+            # Same as opening a new session per request
+            await client.close()
+
+    timings: list[float] = []
+    for index in range(offset, offset + callbacks):
+        start = time.perf_counter()
+        await callback(client, index, after_request)
+        timings.append(time.perf_counter() - start)
+    await client.close()
+    return timings
+
+
+def report(name: str, timings: list[float]) -> None:
+    timings_ms = sorted(timing * 1000 for timing in timings)
+    p95 = timings_ms[int(len(timings_ms) * 0.95) - 1]
+    print(f"{name:>20}: median {statistics.median(timings_ms):7.2f} ms, p95 {p95:7.2f} ms")
+
+
+async def main(callbacks: int, handshake_ms: float) -> None:
+    runner, port = await start_stand_in()
+    proxy = await start_handshake_proxy(port, handshake_ms / 1000)
+    base_url = f"http://127.0.0.1:{proxy.sockets[0].getsockname()[1]}"
+    discord_client.DISCORD_API_URL = f"{base_url}/api/v10"
+    discord_client.DISCORD_TOKEN_URL = f"{base_url}/api/oauth2/token"
+
+    # Callbacks run back to back, far over Discord's global limit, pacing would measure the limit instead of the session
+    client = DiscordOAuthClient(
+        1, "secret", "http://127.0.0.1/callback", scopes=("identify", "guilds"), global_rate_limit=0
+    )
+    try:
+        per_request = await measure(client, callbacks, 0, shared=False)
+        shared = await measure(client, callbacks, callbacks, shared=True)
+    finally:
+        proxy.close()
+        await runner.cleanup()
+
+    print(f"{callbacks} callbacks, {handshake_ms} ms emulated handshake")
+    report("session per request", per_request)
+    report("shared session", shared)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callbacks", type=int, default=200)
+    parser.add_argument("--handshake-ms", type=float, default=30.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.callbacks, args.handshake_ms))
@@ -0,0 +1,33 @@
+"""
+Drop bearer tokens from the verification cache of every running worker.
+
+Workers invalidate tokens changed through the app on their own. Run this after adding, changing or removing
+`api_auth` rows any other way, e.g. with SQL, otherwise revoked tokens stay valid until `bearer_cache_ttl` passes.
+Without tokens the whole cache is dropped.
+
+Usage:
+    python -m scripts.invalidate_bearer_cache [--hashed] [TOKEN ...]
+"""
+
+import argparse
+import asyncio
+import sys
+
+from app.core.bearer_cache import get_bearer_cache
+from app.core.redis import default_client
+from app.deps import hash_bearer_token
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("tokens", nargs="*", metavar="TOKEN", help="bearer tokens to drop, everything if none given")
+    parser.add_argument("--hashed", action="store_true", help="tokens are given as stored `token_hash` values")
+    args = parser.parse_args()
+
+    token_hashes = [token if args.hashed else hash_bearer_token(token) for token in args.tokens]
+    if not asyncio.run(get_bearer_cache().publish_invalidation(default_client(), *token_hashes)):
+        sys.exit("Redis is unavailable, workers drop the tokens once bearer_cache_ttl passes")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,25 @@
 import random
 import string
-from collections.abc import Callable, Generator
+from collections.abc import AsyncGenerator, Awaitable, Callable, Generator, Sequence
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from typing import Self
 
 import pytest
+from app.core.link_tokens import RedisLinkTokenStore
+from app.core.queries import QueryCount, count_queries
+from app.core.redis import RedisClient
 from app.core.utils import utcnow2
 from app.database.models import ApiAuth, Player, Whitelist
-from app.deps import get_session, hash_bearer_token
+from app.deps import get_async_session, get_read_session, get_session, hash_bearer_token
 from app.main import app as main_app
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
+from pytest_mock import MockerFixture
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
 from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 
 @pytest.fixture(scope="session")
@@ -38,13 +47,96 @@ def db_session() -> Generator[Session]:
         yield session
 
 
+@pytest.fixture(scope="function")
+def async_db_engine(db_session: Session) -> Generator[AsyncEngine]:  # noqa: ARG001  # pyright: ignore[reportUnusedParameter]
+    # Shares the SQLite file created by `db_session`. No pooling, as the test client runs its own event loop
+    yield create_async_engine("sqlite+aiosqlite:///ci.db", poolclass=NullPool)
+
+
 @pytest.fixture(scope="function", autouse=True)
-def override_session(app: FastAPI, db_session: Session) -> Generator[None]:
+def override_session(app: FastAPI, db_session: Session, async_db_engine: AsyncEngine) -> Generator[None]:
+    async def get_test_async_session() -> AsyncGenerator[AsyncSession]:
+        async with AsyncSession(async_db_engine, expire_on_commit=False) as session:
+            yield session
+
     app.dependency_overrides[get_session] = lambda: db_session
+    app.dependency_overrides[get_async_session] = get_test_async_session
+    app.dependency_overrides[get_read_session] = get_test_async_session
     yield
     app.dependency_overrides = {}
 
 
+class FakeRedis:
+    """In-memory stand-in for the few Redis commands used for caching. Ignores expiration."""
+
+    def __init__(self) -> None:
+        self.data: dict[str, bytes] = {}
+        self.published: list[tuple[str, str]] = []
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        pass
+
+    async def get(self, key: str) -> bytes | None:
+        return self.data.get(key)
+
+    async def set(self, key: str, value: str, px: int | None = None, nx: bool = False) -> bool | None:  # noqa: ARG002  # pyright: ignore[reportUnusedParameter]
+        if nx and key in self.data:
+            return None
+        self.data[key] = value.encode()
+        return True
+
+    async def getdel(self, key: str) -> bytes | None:
+        return self.data.pop(key, None)
+
+    async def pttl(self, key: str) -> int:
+        return -1 if key in self.data else -2
+
+    async def delete(self, *keys: str) -> int:
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def incr(self, key: str) -> int:
+        value = int(self.data.get(key, b"0")) + 1
+        self.data[key] = str(value).encode()
+        return value
+
+    async def publish(self, channel: str, message: str) -> int:
+        self.published.append((channel, message))
+        return 0
+
+    def register_script(self, script: str) -> Callable[..., Awaitable[bytes]]:
+        """Get a Python stand-in for one of the app's Lua scripts, which need a real Redis to run."""
+        scripts = {RedisLinkTokenStore.GET_OR_CREATE_SCRIPT: self.get_or_create_link_token}
+        return scripts[script]
+
+    async def get_or_create_link_token(self, keys: Sequence[str], args: Sequence[object]) -> bytes:
+        ckey_key, token_key = keys
+        token, ckey, _ = args
+        if ckey_key not in self.data:
+            self.data[ckey_key] = str(token).encode()
+            self.data[token_key] = str(ckey).encode()
+        return self.data[ckey_key]
+
+
+@contextmanager
+def assert_queries(expected: int) -> Generator[QueryCount]:
+    """Assert the block executes exactly `expected` SQL statements, including those of the app under test."""
+    with count_queries() as count:
+        yield count
+    assert count.total == expected, f"Expected {expected} statements, executed {count.total}:\n" + "\n".join(
+        f"{repeats}x {statement}" for statement, repeats in count.statements.items()
+    )
+
+
+@pytest.fixture(scope="function")
+def fake_redis(mocker: MockerFixture) -> Generator[FakeRedis]:
+    redis = FakeRedis()
+    mocker.patch.object(RedisClient, "get_client", return_value=redis)
+    yield redis
+
+
 @pytest.fixture(scope="function")
 def bearer(db_session: Session) -> Generator[str]:
     token = str(random.randint(10000000, 99999999))
@@ -160,7 +252,6 @@ def whitelist_factory(db_session: Session) -> Generator[Callable[..., Whitelist]
         expiration_time = (
             expiration_time if expiration_time is not None else utcnow2() + timedelta(days=random.randint(-777, 777))
         )
-        valid = valid or random.choice([True, False])
         return create_whitelist(db_session, player, admin, server_type, expiration_time, valid)
 
     yield factory
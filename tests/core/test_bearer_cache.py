@@ -0,0 +1,146 @@
+from collections.abc import AsyncIterator, Generator
+from typing import Any
+from unittest.mock import AsyncMock
+
+import pytest
+from app.core.bearer_cache import BearerTokenCache, get_bearer_cache
+from app.core.redis import RedisClient
+from app.database.models import ApiAuth
+from app.deps import hash_bearer_token
+from fastapi import status
+from fastapi.testclient import TestClient
+from pytest_mock import MockerFixture
+from redis import RedisError
+from sqlmodel import Session, select
+
+
+@pytest.fixture
+def cache() -> BearerTokenCache:
+    return BearerTokenCache(max_size=10, ttl=60, negative_ttl=5)
+
+
+@pytest.fixture
+def bearer_cache() -> Generator[BearerTokenCache]:
+    cache = get_bearer_cache()
+    cache.invalidate()
+    yield cache
+    cache.invalidate()
+
+
+class TestBearerTokenCache:
+    def test_store_valid_and_invalid(self, cache: BearerTokenCache, mocker: MockerFixture) -> None:
+        monotonic = mocker.patch("app.core.cache.time.monotonic", return_value=0.0)
+        cache.store("valid", True)
+        cache.store("invalid", False)
+
+        assert cache.get("valid") is True
+        assert cache.get("invalid") is False
+        assert cache.get("unknown") is None
+
+        monotonic.return_value = 10.0
+        assert cache.get("valid") is True
+        assert cache.get("invalid") is None
+
+    def test_invalidate(self, cache: BearerTokenCache) -> None:
+        cache.store("a", True)
+        cache.store("b", True)
+
+        cache.invalidate("a")
+        assert cache.get("a") is None
+        assert cache.get("b") is True
+
+        cache.invalidate(BearerTokenCache.INVALIDATE_ALL)
+        assert cache.get("b") is None
+
+    async def test_publish_invalidation(self, cache: BearerTokenCache) -> None:
+        redis_client = AsyncMock(spec=RedisClient)
+
+        assert await cache.publish_invalidation(redis_client, "a", "b")
+        assert await cache.publish_invalidation(redis_client)
+
+        assert [call.args for call in redis_client.publish.call_args_list] == [
+            (BearerTokenCache.INVALIDATION_CHANNEL, "a"),
+            (BearerTokenCache.INVALIDATION_CHANNEL, "b"),
+            (BearerTokenCache.INVALIDATION_CHANNEL, BearerTokenCache.INVALIDATE_ALL),
+        ]
+
+    async def test_publish_invalidation_redis_error(self, cache: BearerTokenCache) -> None:
+        redis_client = AsyncMock(spec=RedisClient)
+        redis_client.publish.side_effect = RedisError("Connection refused")
+
+        assert not await cache.publish_invalidation(redis_client, "a")
+
+    async def test_listen(self, cache: BearerTokenCache, mocker: MockerFixture) -> None:
+        cache.store("a", True)
+        cache.store("b", True)
+
+        async def messages() -> AsyncIterator[dict[str, Any]]:
+            yield {"type": "subscribe", "data": 1}
+            cache.store("c", True)
+            yield {"type": "message", "data": b"a"}
+            raise RedisError("Connection lost")
+
+        pubsub = mocker.MagicMock()
+        pubsub.listen = messages
+        pubsub.aclose = AsyncMock()
+        redis_client = AsyncMock(spec=RedisClient)
+        redis_client.subscribe.side_effect = [pubsub, RedisError("Connection refused")]
+        mocker.patch("app.core.bearer_cache.asyncio.sleep", side_effect=[None, StopAsyncIteration])
+
+        with pytest.raises(StopAsyncIteration):
+            await cache.listen(redis_client)
+
+        # Everything is dropped on subscribe, then `a` by the message
+        assert cache.get("b") is None
+        assert cache.get("a") is None
+        assert cache.get("c") is True
+        pubsub.aclose.assert_awaited_once()
+
+
+class TestApiAuthEvents:
+    def test_commit_invalidates(self, db_session: Session, bearer_cache: BearerTokenCache) -> None:
+        token_hash = hash_bearer_token("new_token")
+        bearer_cache.store(token_hash, False)
+
+        db_session.add(ApiAuth(token_hash=token_hash))
+        db_session.commit()
+
+        assert bearer_cache.get(token_hash) is None
+
+    def test_delete_invalidates(self, db_session: Session, bearer: str, bearer_cache: BearerTokenCache) -> None:
+        token_hash = hash_bearer_token(bearer)
+        bearer_cache.store(token_hash, True)
+
+        auth = db_session.exec(select(ApiAuth).where(ApiAuth.token_hash == token_hash)).one()
+        db_session.delete(auth)
+        db_session.commit()
+
+        assert bearer_cache.get(token_hash) is None
+
+    def test_rollback_keeps_cache(self, db_session: Session, bearer_cache: BearerTokenCache) -> None:
+        token_hash = hash_bearer_token("new_token")
+        bearer_cache.store(token_hash, False)
+
+        db_session.add(ApiAuth(token_hash=token_hash))
+        db_session.flush()
+        db_session.rollback()
+
+        assert bearer_cache.get(token_hash) is False
+
+
+class TestVerifyBearer:
+    def test_valid_token_cached(self, client: TestClient, bearer: str, bearer_cache: BearerTokenCache) -> None:
+        headers = {"Authorization": f"Bearer {bearer}"}
+
+        response = client.post("donates", json={"discord_id": "1", "tier": 1}, headers=headers)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert bearer_cache.get(hash_bearer_token(bearer)) is True
+
+    def test_invalid_token_cached(self, client: TestClient, bearer_cache: BearerTokenCache) -> None:
+        response = client.post(
+            "donates", json={"discord_id": "1", "tier": 1}, headers={"Authorization": "Bearer wrong"}
+        )
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert bearer_cache.get(hash_bearer_token("wrong")) is False
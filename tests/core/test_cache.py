@@ -0,0 +1,95 @@
+import pytest
+from app.core.cache import MemoryCacheBackend, RedisCacheBackend, TieredCache, TTLCache
+from app.core.redis import RedisClient
+from pytest_mock import MockerFixture
+from redis import RedisError
+from tests.conftest import FakeRedis
+
+
+class TestTTLCache:
+    def test_init_invalid_size(self) -> None:
+        with pytest.raises(ValueError, match="Cache size must be positive"):
+            TTLCache[str, int](max_size=0, ttl=10)
+
+    def test_get_set(self) -> None:
+        cache = TTLCache[str, int](max_size=2, ttl=10)
+
+        assert cache.get("key") is None
+        cache.set("key", 1)
+        assert cache.get("key") == 1
+
+    def test_expiration(self, mocker: MockerFixture) -> None:
+        monotonic = mocker.patch("app.core.cache.time.monotonic", return_value=100.0)
+        cache = TTLCache[str, int](max_size=2, ttl=10)
+        cache.set("default", 1)
+        cache.set("short", 2, ttl=1)
+
+        monotonic.return_value = 105.0
+        assert cache.get("default") == 1
+        assert cache.get("short") is None
+        assert len(cache) == 1
+
+        monotonic.return_value = 110.0
+        assert cache.get("default") is None
+        assert len(cache) == 0
+
+    def test_evicts_least_recently_used(self) -> None:
+        cache = TTLCache[str, int](max_size=2, ttl=10)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_delete_and_clear(self) -> None:
+        cache = TTLCache[str, int](max_size=2, ttl=10)
+        cache.set("a", 1)
+        cache.set("b", 2)
+
+        cache.delete("a")
+        cache.delete("missing")
+        assert cache.get("a") is None
+        assert len(cache) == 1
+
+        cache.clear()
+        assert len(cache) == 0
+
+
+class TestTieredCache:
+    def test_init_without_backends(self) -> None:
+        with pytest.raises(ValueError, match="At least one cache backend is required"):
+            TieredCache()
+
+    @pytest.mark.asyncio
+    async def test_tiers(self, fake_redis: FakeRedis) -> None:
+        memory = MemoryCacheBackend(max_size=10, max_ttl=60)
+        redis = RedisCacheBackend(RedisClient("redis://localhost", channel_prefix="test"))
+        cache = TieredCache(memory, redis)
+
+        assert await cache.get("key") is None
+        await cache.set("key", "value", ttl=300)
+        assert fake_redis.data["test.cache:key"] == b"value"
+        assert await cache.get("key") == "value"
+
+        # Another worker only shares the Redis tier, and fills its own memory tier from it
+        other_memory = MemoryCacheBackend(max_size=10, max_ttl=60)
+        other = TieredCache(other_memory, redis)
+        assert await other.get("key") == "value"
+        assert await other_memory.get("key") == "value"
+
+        assert cache.stats.hits == {"memory": 1}
+        assert cache.stats.misses == 1
+        assert other.stats.hits == {"redis": 1}
+
+    @pytest.mark.asyncio
+    async def test_redis_errors_are_misses(self, mocker: MockerFixture) -> None:
+        redis_client = RedisClient("redis://localhost")
+        mocker.patch.object(redis_client, "get_client", side_effect=RedisError)
+        cache = TieredCache(RedisCacheBackend(redis_client))
+
+        await cache.set("key", "value", ttl=300)
+        assert await cache.get("key") is None
+        assert cache.stats.misses == 1
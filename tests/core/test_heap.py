@@ -0,0 +1,87 @@
+from collections.abc import Generator
+
+import pytest
+from app.core.config import get_config
+from app.core.heap import HeapDiagnostics, TracingNotStartedError, count_app_objects
+from app.database.models import Player
+from fastapi import status
+from fastapi.testclient import TestClient
+
+
+HEAP_URL = "http://127.0.0.1:8000/debug/heap"
+
+
+@pytest.fixture
+def heap() -> Generator[HeapDiagnostics]:
+    heap = HeapDiagnostics(max_snapshots=2)
+    yield heap
+    heap.stop()
+
+
+def allocate() -> list[bytearray]:
+    return [bytearray(1024) for _ in range(100)]
+
+
+def test_snapshots_need_tracing(heap: HeapDiagnostics) -> None:
+    with pytest.raises(TracingNotStartedError):
+        heap.take_snapshot()
+
+
+def test_diff(heap: HeapDiagnostics) -> None:
+    heap.start()
+    first = heap.take_snapshot()
+    allocated = allocate()
+    second = heap.take_snapshot()
+
+    diff = heap.diff(first, second)
+
+    assert diff[0].file == __file__
+    assert diff[0].count_diff >= len(allocated)
+    assert diff[0].size_diff >= 100 * 1024
+    assert heap.top(second)[0].size >= 100 * 1024
+
+
+def test_keeps_latest_snapshots(heap: HeapDiagnostics) -> None:
+    heap.start()
+    ids = [heap.take_snapshot() for _ in range(3)]
+
+    assert heap.status().snapshots == ids[1:]
+    with pytest.raises(KeyError):
+        heap.top(ids[0])
+
+
+def test_count_app_objects() -> None:
+    players = [Player(ckey=str(i), discord_id=str(i)) for i in range(3)]
+
+    assert count_app_objects()["app.database.models.Player"] >= len(players)
+
+
+def test_count_app_objects_skips_types_without_module_name() -> None:
+    without_module = type("WithoutModule", (), {"__module__": None})()
+
+    assert "WithoutModule" not in "".join(count_app_objects())
+    assert without_module is not None
+
+
+def test_heap_endpoints(client: TestClient, bearer: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    headers = {"Authorization": f"Bearer {bearer}"}
+    assert client.get(HEAP_URL).status_code == status.HTTP_403_FORBIDDEN
+    assert client.get(HEAP_URL, headers=headers).status_code == status.HTTP_404_NOT_FOUND
+
+    monkeypatch.setattr(get_config().general, "heap_diagnostics_enabled", True)
+    assert client.post(f"{HEAP_URL}/snapshots", headers=headers).status_code == status.HTTP_409_CONFLICT
+
+    assert client.post(f"{HEAP_URL}/tracing", headers=headers).json()["tracing"]
+    try:
+        first = client.post(f"{HEAP_URL}/snapshots", headers=headers).json()
+        second = client.post(f"{HEAP_URL}/snapshots", headers=headers).json()
+
+        assert client.get(f"{HEAP_URL}/snapshots/{second}", headers=headers).status_code == status.HTTP_200_OK
+        response = client.get(f"{HEAP_URL}/snapshots/{first}/diff/{second}", headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert set(response.json()[0]) == {"file", "line", "size", "count", "size_diff", "count_diff"}
+        assert client.get(f"{HEAP_URL}/snapshots/0", headers=headers).status_code == status.HTTP_404_NOT_FOUND
+    finally:
+        assert not client.delete(f"{HEAP_URL}/tracing", headers=headers).json()["tracing"]
+
+    assert isinstance(client.get(f"{HEAP_URL}/objects", headers=headers).json(), dict)
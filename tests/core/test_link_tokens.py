@@ -0,0 +1,124 @@
+import asyncio
+from collections.abc import AsyncGenerator, Callable
+from datetime import timedelta
+
+import pytest
+from app.core.link_tokens import RedisLinkTokenStore, SqlLinkTokenStore
+from app.core.redis import RedisClient, default_client
+from app.core.utils import utcnow2
+from app.database.models import CkeyLinkToken, Player
+from app.oauth.discord.models.guild import GuildPreview
+from app.oauth.discord.models.user import User
+from app.routes.v1.player import oauth_client
+from fastapi.testclient import TestClient
+from pytest_mock import MockerFixture
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from tests.conftest import FakeRedis, generate_discord_id
+
+
+@pytest.fixture
+async def async_session(async_db_engine: AsyncEngine) -> AsyncGenerator[AsyncSession]:
+    async with AsyncSession(async_db_engine, expire_on_commit=False) as session:
+        yield session
+
+
+class TestRedisLinkTokenStore:
+    @pytest.mark.asyncio
+    async def test_get_or_create(self, fake_redis: FakeRedis) -> None:
+        store = RedisLinkTokenStore(RedisClient("redis://localhost", channel_prefix="test"))
+
+        token = await store.get_or_create("ckey")
+
+        assert await store.get_or_create("ckey") == token
+        assert await store.get_or_create("other") != token
+        assert await store.get_ckey(token) == "ckey"
+        assert await store.get_ckey("wrong") is None
+        assert fake_redis.data[f"test.link_token:token:{token}"] == b"ckey"
+
+    @pytest.mark.asyncio
+    async def test_get_or_create_existing(self, fake_redis: FakeRedis) -> None:
+        store = RedisLinkTokenStore(RedisClient("redis://localhost", channel_prefix="test"))
+        fake_redis.data["test.link_token:ckey:ckey"] = b"existing"
+
+        assert await store.get_or_create("ckey") == "existing"
+        assert list(fake_redis.data) == ["test.link_token:ckey:ckey"]
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("fake_redis")
+    async def test_claim(self) -> None:
+        store = RedisLinkTokenStore(RedisClient("redis://localhost"))
+        token = await store.get_or_create("ckey")
+
+        assert await store.claim(token) == "ckey"
+        assert await store.claim(token) is None
+
+        await store.restore(token, "ckey")
+        assert await store.claim(token) == "ckey"
+
+        await store.revoke(token, "ckey")
+        assert await store.get_ckey(token) is None
+        assert await store.get_or_create("ckey") != token
+
+
+class TestSqlLinkTokenStore:
+    @pytest.mark.asyncio
+    async def test_get_or_create(self, async_session: AsyncSession, db_session: Session) -> None:
+        db_session.add(CkeyLinkToken(ckey="expired", token="old", expiration_time=utcnow2() - timedelta(minutes=1)))
+        db_session.commit()
+        store = SqlLinkTokenStore(async_session)
+
+        token = await store.get_or_create("ckey")
+
+        assert await store.get_or_create("ckey") == token
+        assert await store.get_ckey(token) == "ckey"
+        assert await store.get_ckey("old") is None
+        assert await store.get_or_create("expired") != "old"
+
+    @pytest.mark.asyncio
+    async def test_claim(self, async_session: AsyncSession, db_session: Session) -> None:
+        store = SqlLinkTokenStore(async_session)
+        token = await store.get_or_create("ckey")
+
+        assert await store.claim(token) == "ckey"
+        assert await store.claim(token) is None
+
+        await store.restore(token, "ckey")
+        assert await store.claim(token) == "ckey"
+
+        await async_session.commit()
+        await store.revoke(token, "ckey")
+
+        assert db_session.exec(select(CkeyLinkToken)).all() == []
+
+
+@pytest.mark.usefixtures("fake_redis")
+def test_generate_state(client: TestClient, bearer: str) -> None:
+    headers = {"Authorization": f"Bearer {bearer}"}
+
+    response = client.post("/oauth/token", params={"ckey": "ckey"}, headers=headers)
+    token = response.json()
+
+    assert response.status_code == 201
+    assert client.post("/oauth/token", params={"ckey": "ckey"}, headers=headers).json() == token
+
+
+@pytest.mark.usefixtures("fake_redis")
+def test_callback_keeps_token_of_failed_link(
+    client: TestClient, mocker: MockerFixture, player_factory: Callable[..., Player]
+) -> None:
+    mocker.patch.object(oauth_client, "get_access_token", return_value=("access", "refresh"))
+    mocker.patch.object(oauth_client, "guilds", return_value=[GuildPreview.model_construct(id="12345678")])
+    mocker.patch.object(oauth_client, "get_user", return_value=User.model_construct(id=generate_discord_id()))
+    store = RedisLinkTokenStore(default_client())
+    # The ckey is already linked to another player, so storing the link fails
+    ckey = player_factory().ckey
+    assert ckey is not None
+    token = asyncio.run(store.get_or_create(ckey))
+
+    with pytest.raises(IntegrityError):
+        client.get("/oauth/discord_oa", params={"code": "code", "state": token})
+
+    assert asyncio.run(store.get_ckey(token)) == ckey
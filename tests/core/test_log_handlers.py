@@ -1,10 +1,15 @@
 import logging
+import logging.config
+import threading
+import time
+from collections.abc import Generator
 from logging import LogRecord
-from unittest.mock import Mock
+from typing import override
+from unittest.mock import AsyncMock, Mock
 
 import pytest
-from app.core.log_handlers import DiscordWebhookHandler
-from discord import Color, Embed
+from app.core.log_handlers import DiscordWebhookHandler, DuplicateSuppressor, QueueFanoutHandler
+from discord import Color
 from pytest_mock import MockerFixture
 
 
@@ -22,38 +27,111 @@ def log_record() -> LogRecord:
     )
 
 
-class TestDiscordWebhookHandler:
-    def test_emit(self, mocker: MockerFixture, log_record: LogRecord) -> None:
-        webhook_mock = Mock()
-        webhook_from_url_mock = mocker.patch("app.core.log_handlers.Webhook.from_url", return_value=webhook_mock)
+@pytest.fixture
+def webhook_mock(mocker: MockerFixture) -> Mock:
+    webhook_mock = Mock()
+    webhook_mock.send = AsyncMock()
+    mocker.patch("app.core.log_handlers.Webhook.from_url", return_value=webhook_mock)
+    return webhook_mock
+
+
+@pytest.fixture
+def handler() -> Generator[DiscordWebhookHandler]:
+    handler = DiscordWebhookHandler(webhook_url="https://discord.com/api/webhooks/test", batch_window=0.1)
+    yield handler
+    handler.close()
+
 
-        handler = DiscordWebhookHandler(webhook_url="https://discord.com/api/webhooks/test")
+class TestDiscordWebhookHandler:
+    def test_emit(self, handler: DiscordWebhookHandler, webhook_mock: Mock, log_record: LogRecord) -> None:
         handler.emit(log_record)
+        handler.flush()
 
-        webhook_from_url_mock.assert_called_once_with("https://discord.com/api/webhooks/test")
         webhook_mock.send.assert_called_once()
 
         _, kwargs = webhook_mock.send.call_args
-        embed: Embed = kwargs["embed"]
+        [embed] = kwargs["embeds"]
         assert embed.description == "Test info message"
         assert embed.title == "test_logger"
         assert embed.color == Color.green()
         assert embed.footer is not None
         assert "test_function:42" in (embed.footer.text or "")
 
-    def test_emit_with_error(self, mocker: MockerFixture, log_record: LogRecord) -> None:
-        webhook_mock = Mock()
-        mocker.patch("app.core.log_handlers.Webhook.from_url", return_value=webhook_mock)
-        webhook_mock.send.side_effect = Exception("Network error")
+    def test_emit_batches(self, handler: DiscordWebhookHandler, webhook_mock: Mock) -> None:
+        for index in range(12):
+            handler.emit(make_record(f"Message {index}: %s"))
+        handler.flush()
 
-        handler = DiscordWebhookHandler(webhook_url="https://discord.com/api/webhooks/test")
+        assert [len(call.kwargs["embeds"]) for call in webhook_mock.send.call_args_list] == [10, 2]
 
+    def test_emit_with_error(
+        self, mocker: MockerFixture, handler: DiscordWebhookHandler, webhook_mock: Mock, log_record: LogRecord
+    ) -> None:
+        webhook_mock.send.side_effect = Exception("Network error")
         handle_error_mock = mocker.patch.object(handler, "handleError")
 
         handler.emit(log_record)
+        handler.flush()
 
         webhook_mock.send.assert_called_once()
-        handle_error_mock.assert_called_once_with(log_record)
+        [(record,), _] = handle_error_mock.call_args
+        assert record.getMessage() == "Test info message"
+
+    def test_repeats_are_summarised(self, webhook_mock: Mock) -> None:
+        handler = DiscordWebhookHandler(
+            webhook_url="https://discord.com/api/webhooks/test", batch_window=0.01, suppress_window=0.2
+        )
+        for _ in range(3):
+            handler.emit(make_record())
+        handler.flush()
+
+        deadline = time.monotonic() + 5
+        while webhook_mock.send.await_count < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        handler.close()
+
+        [first], [summary] = (call.kwargs["embeds"] for call in webhook_mock.send.call_args_list)
+        assert first.description == "Database error: down"
+        assert summary.description == "×2 more in the last 0.2s: Database error: down"  # noqa: RUF001
+
+    def test_overflow_is_dropped(self, mocker: MockerFixture, webhook_mock: Mock) -> None:
+        handler = DiscordWebhookHandler(webhook_url="https://discord.com/api/webhooks/test", queue_size=1)
+        start_worker = mocker.patch.object(handler, "_start_worker")
+        for index in range(3):
+            handler.emit(make_record(f"Message {index}: %s"))
+
+        assert handler.dropped == 2
+
+        mocker.stop(start_worker)
+        handler._start_worker()  # pyright: ignore[reportPrivateUsage]
+        handler.close()
+
+        [summary, embed] = webhook_mock.send.call_args.kwargs["embeds"]
+        assert summary.description == "2 log records were dropped, the queue was full"
+        assert embed.description == "Message 0: down"
+
+    def test_ignores_records_logged_while_sending(self, webhook_mock: Mock) -> None:
+        handler = DiscordWebhookHandler(
+            webhook_url="https://discord.com/api/webhooks/test", batch_window=0.01, suppress_window=0
+        )
+        fanout = QueueFanoutHandler(handlers=[handler])
+        logger = logging.getLogger("test_webhook.sending")
+        logger.addHandler(fanout)
+        logger.propagate = False
+
+        async def send(**_: object) -> None:
+            logger.warning("Webhook rate limited")
+
+        webhook_mock.send.side_effect = send
+        logger.error("Database error")
+        for _ in range(3):
+            fanout.flush()
+            handler.flush()
+        logger.removeHandler(fanout)
+        handler.close()
+
+        [call] = webhook_mock.send.call_args_list
+        assert [embed.description for embed in call.kwargs["embeds"]] == ["Database error"]
 
     def test_from_config(self, mocker: MockerFixture) -> None:
         config_mock = Mock()
@@ -71,3 +149,123 @@ class TestDiscordWebhookHandler:
 
         with pytest.raises(ValueError, match="Discord webhook URL not configured"):
             DiscordWebhookHandler.from_config()
+
+
+def make_record(msg: str = "Database error: %s", *args: object, exc: Exception | None = None) -> LogRecord:
+    exc_info = None
+    if exc is not None:
+        try:
+            raise exc
+        except Exception as e:
+            exc_info = (type(e), e, e.__traceback__)
+    return LogRecord("app.core.db", logging.ERROR, "db.py", 10, msg, args or ("down",), exc_info)
+
+
+class TestDuplicateSuppressor:
+    def test_suppresses_repeats_within_window(self, mocker: MockerFixture) -> None:
+        monotonic = mocker.patch("app.core.log_handlers.time.monotonic", return_value=100.0)
+        suppressor = DuplicateSuppressor(window=60, max_size=10)
+
+        assert suppressor.admit(make_record())
+        assert not suppressor.admit(make_record())
+        assert not suppressor.admit(make_record())
+        assert suppressor.admit(make_record("Other error"))
+        assert suppressor.take_summaries() == []
+
+        monotonic.return_value = 160.0
+        [(sample, count)] = suppressor.take_summaries()
+        assert sample.getMessage() == "Database error: down"
+        assert count == 2
+
+        # Still repeating, so the next summary is periodic
+        assert not suppressor.admit(make_record())
+        monotonic.return_value = 220.0
+        assert [count for _, count in suppressor.take_summaries()] == [1]
+
+        monotonic.return_value = 280.0
+        assert suppressor.take_summaries() == []
+        assert suppressor.admit(make_record())
+
+    def test_fingerprint_includes_exception(self) -> None:
+        suppressor = DuplicateSuppressor(window=60, max_size=10)
+
+        assert suppressor.admit(make_record(exc=ValueError()))
+        assert not suppressor.admit(make_record(exc=ValueError()))
+        assert suppressor.admit(make_record(exc=KeyError()))
+        # Arguments are not part of the fingerprint
+        assert not suppressor.admit(make_record("Database error: %s", "timeout", exc=KeyError()))
+
+    def test_bounded(self) -> None:
+        suppressor = DuplicateSuppressor(window=60, max_size=1)
+
+        assert suppressor.admit(make_record())
+        assert not suppressor.admit(make_record())
+        assert suppressor.admit(make_record("Other error"))
+
+        [(sample, count)] = suppressor.take_summaries()
+        assert sample.msg == "Database error: %s"
+        assert count == 1
+
+
+class ListHandler(logging.Handler):
+    def __init__(self, level: int = logging.NOTSET) -> None:
+        super().__init__(level)
+        self.records: list[LogRecord] = []
+        self.threads: set[str] = set()
+
+    @override
+    def emit(self, record: LogRecord) -> None:
+        self.records.append(record)
+        self.threads.add(threading.current_thread().name)
+
+
+class TestQueueFanoutHandler:
+    def test_dict_config(self) -> None:
+        logging.config.dictConfig(
+            {
+                "version": 1,
+                "disable_existing_loggers": False,
+                "handlers": {
+                    "all": {"()": ListHandler},
+                    "warnings": {"()": ListHandler, "level": "WARNING"},
+                    "all_queue": {
+                        "class": "app.core.log_handlers.QueueFanoutHandler",
+                        "handlers": ["all", "warnings"],
+                        "respect_handler_level": True,
+                    },
+                    "warnings_queue": {"class": "app.core.log_handlers.QueueFanoutHandler", "handlers": ["warnings"]},
+                },
+                "loggers": {
+                    "test_fanout.all": {"level": "DEBUG", "handlers": ["all_queue"], "propagate": False},
+                    "test_fanout.warnings": {"level": "DEBUG", "handlers": ["warnings_queue"], "propagate": False},
+                },
+            }
+        )
+        all_handler = logging.getHandlerByName("all")
+        warnings_handler = logging.getHandlerByName("warnings")
+        assert isinstance(all_handler, ListHandler)
+        assert isinstance(warnings_handler, ListHandler)
+
+        logging.getLogger("test_fanout.all").info("info")
+        logging.getLogger("test_fanout.all").warning("warning")
+        logging.getLogger("test_fanout.warnings").info("forced %s", "info")
+        queue_handler = logging.getHandlerByName("all_queue")
+        assert queue_handler is not None
+        queue_handler.flush()
+
+        assert [record.getMessage() for record in all_handler.records] == ["info", "warning"]
+        # Handler levels are ignored without respect_handler_level, like with QueueHandler
+        assert [record.getMessage() for record in warnings_handler.records] == ["warning", "forced info"]
+        assert all_handler.threads == warnings_handler.threads == {"log-dispatcher"}
+
+    def test_formats_lazily(self) -> None:
+        target = ListHandler()
+        handler = QueueFanoutHandler(handlers=[target])
+        record = LogRecord("test", logging.INFO, "file.py", 1, "message %s", ("argument",), None)
+
+        handler.handle(record)
+        handler.flush()
+
+        [handled] = target.records
+        assert handled is record
+        assert handled.args == ("argument",)
@@ -0,0 +1,41 @@
+import asyncio
+import logging
+import time
+
+import pytest
+from app.core.loop_monitor import EventLoopMonitor
+from prometheus_client import REGISTRY
+
+
+async def run_blocked(monitor: EventLoopMonitor, *blocks: float) -> None:
+    task = asyncio.create_task(monitor.run())
+    await asyncio.sleep(0.05)
+    for block in blocks:
+        time.sleep(block)
+        await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+@pytest.mark.asyncio
+async def test_measures_lag() -> None:
+    before = REGISTRY.get_sample_value("event_loop_lag_seconds_count") or 0
+
+    await run_blocked(EventLoopMonitor(0.01, 1.0, 60.0))
+
+    assert (REGISTRY.get_sample_value("event_loop_lag_seconds_count") or 0) > before
+
+
+@pytest.mark.asyncio
+async def test_logs_blocking_stack(caplog: pytest.LogCaptureFixture) -> None:
+    monitor = EventLoopMonitor(0.01, 0.05, 60.0)
+
+    with caplog.at_level(logging.WARNING, logger="app.core.loop_monitor"):
+        await run_blocked(monitor, 0.2, 0.2)
+
+    assert monitor.stalls == 2
+    # The second stall is within the log interval of the first
+    assert len(caplog.messages) == 1
+    assert "in run_blocked" in caplog.messages[0]
+    assert "time.sleep(block)" in caplog.messages[0]
@@ -0,0 +1,83 @@
+from app.core.cache import CacheCollector, CacheStats
+from app.core.db import MeteredQueuePool
+from app.core.metrics import OTHER_METHOD, UNMATCHED_ROUTE
+from app.oauth.discord.ratelimit import RateLimitCollector, RateLimitStats
+from fastapi import status
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY, CollectorRegistry
+from sqlalchemy import create_engine
+
+
+METRICS_URL = "http://127.0.0.1:8000/metrics"
+
+
+def sample(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_requests_labelled_by_route_template(client: TestClient) -> None:
+    labels = {"method": "GET", "route": "/v1/donates/{id}", "status": "200"}
+    before = sample("http_requests_total", **labels)
+
+    client.get("donates/123456")
+    client.get("donates/654321")
+
+    assert sample("http_requests_total", **labels) == before + 2
+    assert sample("http_request_duration_seconds_count", **labels) == before + 2
+    assert sample("http_requests_in_progress", method="GET") == 0
+
+
+def test_unmatched_routes_share_a_label(client: TestClient) -> None:
+    labels = {"method": "GET", "route": UNMATCHED_ROUTE, "status": "404"}
+    before = sample("http_requests_total", **labels)
+
+    client.get("no/such/route")
+
+    assert sample("http_requests_total", **labels) == before + 1
+
+
+def test_unknown_methods_share_a_label(client: TestClient) -> None:
+    labels = {"method": OTHER_METHOD, "route": UNMATCHED_ROUTE, "status": "404"}
+    before = sample("http_requests_total", **labels)
+
+    client.request("MADEUP", "no/such/route")
+
+    assert sample("http_requests_total", **labels) == before + 1
+    assert REGISTRY.get_sample_value("http_requests_total", {**labels, "method": "MADEUP"}) is None
+
+
+def test_stats_collectors() -> None:
+    registry = CollectorRegistry()
+    registry.register(RateLimitCollector(RateLimitStats(queued=2, requests=5, wait_time=1.5)))
+    registry.register(CacheCollector("test", CacheStats(hits={"memory": 3}, misses=1)))
+
+    assert registry.get_sample_value("discord_requests_queued") == 2
+    assert registry.get_sample_value("discord_scheduled_requests_total") == 5
+    assert registry.get_sample_value("discord_wait_seconds_total") == 1.5
+    assert registry.get_sample_value("cache_hits_total", {"cache": "test", "tier": "memory"}) == 3
+    assert registry.get_sample_value("cache_misses_total", {"cache": "test"}) == 1
+
+
+def test_metrics_endpoint(client: TestClient, bearer: str) -> None:
+    assert client.get(METRICS_URL).status_code == status.HTTP_403_FORBIDDEN
+
+    response = client.get(METRICS_URL, headers={"Authorization": f"Bearer {bearer}"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["Content-Type"].startswith("text/plain")
+    assert "# TYPE http_request_duration_seconds histogram" in response.text
+    assert "# TYPE discord_rate_limited_total counter" in response.text
+    assert "# TYPE discord_scheduled_requests_total counter" in response.text
+
+
+def test_metered_pool() -> None:
+    engine = create_engine("sqlite://", poolclass=MeteredQueuePool, pool_logging_name="test", pool_size=1)
+    waits_before = sample("db_pool_checkout_wait_seconds_count", pool="test")
+
+    with engine.connect(), engine.connect():
+        assert sample("db_pool_checked_out_connections", pool="test") == 2
+        assert sample("db_pool_overflow_connections", pool="test") == 1
+
+    assert sample("db_pool_checked_out_connections", pool="test") == 0
+    assert sample("db_pool_checkout_wait_seconds_count", pool="test") == waits_before + 2
+    engine.dispose()
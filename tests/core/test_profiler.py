@@ -0,0 +1,72 @@
+import asyncio
+import threading
+
+import pytest
+from app.core.config import get_config
+from app.core.profiler import ProfilerBusyError, profile_collapsed, profile_pstats, sample_stacks
+from fastapi import status
+from fastapi.testclient import TestClient
+
+
+PROFILE_URL = "http://127.0.0.1:8000/debug/profile"
+
+
+def spin(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sample_stacks() -> None:
+    stop = threading.Event()
+    thread = threading.Thread(target=spin, args=(stop,), name="spinner")
+    thread.start()
+    try:
+        stacks = sample_stacks(0.05, 0.001)
+    finally:
+        stop.set()
+        thread.join()
+
+    spinner = [stack for stack in stacks if stack.startswith("spinner;")]
+    assert spinner
+    assert all(f"{__name__}:spin" in stack for stack in spinner)
+
+
+@pytest.mark.asyncio
+async def test_one_profile_at_a_time() -> None:
+    running = asyncio.create_task(profile_collapsed(0.1))
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(ProfilerBusyError):
+        await profile_pstats(0.01)
+
+    assert await running
+
+
+@pytest.mark.asyncio
+async def test_profile_pstats() -> None:
+    async def busy() -> None:
+        await asyncio.sleep(0)
+        sum(range(1000))
+
+    task = asyncio.create_task(busy())
+    report = await profile_pstats(0.01)
+    await task
+
+    assert "test_profiler.py" in report
+    assert "busy" in report
+
+
+def test_profile_endpoint(client: TestClient, bearer: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    headers = {"Authorization": f"Bearer {bearer}"}
+    assert client.get(PROFILE_URL, headers=headers).status_code == status.HTTP_404_NOT_FOUND
+
+    monkeypatch.setattr(get_config().general, "profiling_enabled", True)
+    response = client.get(PROFILE_URL, params={"seconds": 0.05}, headers=headers)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["Content-Type"].startswith("text/plain")
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in response.text.splitlines())
+    assert (
+        client.get(PROFILE_URL, params={"seconds": 3600}, headers=headers).status_code
+        == status.HTTP_422_UNPROCESSABLE_ENTITY
+    )
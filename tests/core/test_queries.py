@@ -0,0 +1,46 @@
+import logging
+
+import pytest
+from app.core.queries import QueryBudgetMiddleware, count_queries
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import Engine, create_engine, text
+
+
+@pytest.fixture
+def engine() -> Engine:
+    return create_engine("sqlite://")
+
+
+def test_count_queries_nested(engine: Engine) -> None:
+    with engine.connect() as conn, count_queries() as outer:
+        conn.execute(text("SELECT 1"))
+        with count_queries() as inner:
+            conn.execute(text("SELECT 2"))
+            conn.execute(text("SELECT 2"))
+
+    assert outer.total == 3
+    assert inner.total == 2
+    assert inner.most_repeated() == ("SELECT 2", 2)
+
+
+def test_budget_exceeded(engine: Engine, caplog: pytest.LogCaptureFixture) -> None:
+    app = FastAPI()
+    app.add_middleware(QueryBudgetMiddleware, budget=2)
+
+    @app.get("/items/{count}")
+    async def items(count: int) -> None:  # pyright: ignore[reportUnusedFunction]
+        with engine.connect() as conn:
+            for _ in range(count):
+                conn.execute(text("SELECT 1"))
+
+    client = TestClient(app)
+    with caplog.at_level(logging.WARNING, logger="app.core.queries"):
+        client.get("/items/2")
+        assert caplog.records == []
+
+        client.get("/items/3")
+
+    assert caplog.messages == [
+        "GET /items/{count} executed 3 statements, over the budget of 2. Most repeated, 3 times: SELECT 1"
+    ]
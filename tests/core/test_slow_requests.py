@@ -0,0 +1,106 @@
+import asyncio
+import json
+import logging
+
+import pytest
+from app.core.slow_requests import SlowRequest, SlowRequestMiddleware, SlowRequestRecorder, get_slow_request_recorder
+from app.core.timing import RequestTimings, timed
+from app.core.utils import utcnow2
+from fastapi import FastAPI, status
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+
+@pytest.fixture
+def recorder() -> SlowRequestRecorder:
+    return SlowRequestRecorder(0.05, size=2, dump=True, parameters=True)
+
+
+@pytest.fixture
+def slow_client(recorder: SlowRequestRecorder) -> TestClient:
+    engine = create_engine("sqlite://")
+    app = FastAPI()
+    app.add_middleware(SlowRequestMiddleware, recorder=recorder)
+
+    @app.get("/items/{id}")
+    async def item(id: int, delay: float = 0) -> None:  # pyright: ignore[reportUnusedFunction]
+        with engine.connect() as conn:
+            conn.execute(text("SELECT :id"), {"id": id})
+        with timed("discord"):
+            await asyncio.sleep(delay)
+
+    return TestClient(app)
+
+
+def test_records_slow_requests(slow_client: TestClient, recorder: SlowRequestRecorder) -> None:
+    slow_client.get("/items/1")
+    slow_client.get("/items/2", params={"delay": 0.1})
+
+    assert len(recorder.entries) == 1
+    entry = recorder.entries[0]
+    assert entry.route == "/items/{id}"
+    assert entry.path_params == {"id": "2"}
+    assert entry.query_string == "delay=0.1"
+    assert entry.status == status.HTTP_200_OK
+    assert entry.duration >= 0.1
+    assert entry.timings.discord >= 0.1
+    assert [(statement.statement, statement.parameters) for statement in entry.statements] == [("SELECT ?", (2,))]
+
+
+def test_parameters_are_left_out_by_default() -> None:
+    recorder = SlowRequestRecorder(0.05)
+    engine = create_engine("sqlite://")
+    app = FastAPI()
+    app.add_middleware(SlowRequestMiddleware, recorder=recorder)
+
+    @app.get("/token")
+    async def token() -> None:  # pyright: ignore[reportUnusedFunction]
+        with engine.connect() as conn:
+            conn.execute(text("SELECT :token_hash"), {"token_hash": "secret"})
+        await asyncio.sleep(0.05)
+
+    TestClient(app).get("/token")
+
+    [entry] = recorder.entries
+    assert [(statement.statement, statement.parameters) for statement in entry.statements] == [("SELECT ?", None)]
+    assert "secret" not in json.dumps(entry.to_dict(), default=str)
+
+
+def test_ring_buffer(slow_client: TestClient, recorder: SlowRequestRecorder) -> None:
+    for id in range(3):
+        slow_client.get(f"/items/{id}", params={"delay": 0.05})
+
+    assert [entry.path_params["id"] for entry in recorder.entries] == ["1", "2"]
+
+
+def test_dump(slow_client: TestClient, caplog: pytest.LogCaptureFixture) -> None:
+    with caplog.at_level(logging.INFO, logger="app.slow_requests"):
+        slow_client.get("/items/1", params={"delay": 0.05})
+
+    entry = json.loads(caplog.messages[0])
+    assert entry["route"] == "/items/{id}"
+    assert entry["statements"][0]["parameters"] == [1]
+    assert "statements" not in entry["timings"]
+
+
+def test_slow_requests_endpoint(client: TestClient, bearer: str) -> None:
+    get_slow_request_recorder().entries.append(
+        SlowRequest(
+            time=utcnow2(),
+            method="GET",
+            route="/v1/whitelist_bans",
+            path="/v1/whitelist_bans",
+            path_params={},
+            query_string="",
+            status=status.HTTP_200_OK,
+            duration=3.0,
+            timings=RequestTimings(),
+        )
+    )
+    url = "http://127.0.0.1:8000/debug/slow_requests"
+
+    assert client.get(url).status_code == status.HTTP_403_FORBIDDEN
+    response = client.get(url, headers={"Authorization": f"Bearer {bearer}"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()[0]["route"] == "/v1/whitelist_bans"
@@ -0,0 +1,54 @@
+import pytest
+from app.core.redis import RedisClient
+from app.core.snapshot import Snapshot, SnapshotStore, etag_matches
+from pytest_mock import MockerFixture
+from redis import RedisError
+from tests.conftest import FakeRedis
+
+
+@pytest.fixture
+def store() -> SnapshotStore:
+    return SnapshotStore(RedisClient("redis://localhost:6379/0", channel_prefix="test"), max_ttl=60)
+
+
+class TestSnapshotStore:
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("fake_redis")
+    async def test_bump_invalidates(self, store: SnapshotStore) -> None:
+        version = await store.get_version("scope")
+        await store.store("name", version, ["a", "b"])
+
+        assert (await store.get("name", version)) == Snapshot.from_items(["a", "b"])
+
+        await store.bump("scope")
+
+        assert await store.get("name", await store.get_version("scope")) is None
+
+    @pytest.mark.asyncio
+    async def test_keys_are_prefixed(self, store: SnapshotStore, fake_redis: FakeRedis) -> None:
+        await store.bump("scope")
+        await store.store("name", 1, [])
+
+        assert set(fake_redis.data) == {"test.snapshot_version:scope", "test.snapshot:name:1"}
+
+    @pytest.mark.asyncio
+    async def test_bump_swallows_errors(self, store: SnapshotStore, mocker: MockerFixture) -> None:
+        mocker.patch.object(RedisClient, "get_client", side_effect=RedisError("down"))
+
+        await store.bump("scope")
+
+
+class TestEtag:
+    def test_depends_on_content_and_variant(self) -> None:
+        snapshot = Snapshot.from_items(["a"])
+
+        assert snapshot.etag("page=1") == Snapshot.from_items(["a"]).etag("page=1")
+        assert snapshot.etag("page=1") != snapshot.etag("page=2")
+        assert snapshot.etag() != Snapshot.from_items(["b"]).etag()
+
+    @pytest.mark.parametrize(
+        ("if_none_match", "matches"),
+        [('"x"', True), ('"y", "x"', True), ('W/"x"', True), ("*", True), ('"y"', False)],
+    )
+    def test_matches(self, if_none_match: str, matches: bool) -> None:
+        assert etag_matches(if_none_match, '"x"') is matches
@@ -0,0 +1,139 @@
+import asyncio
+import json
+from collections.abc import AsyncGenerator, Callable
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from typing import Any
+
+import pytest
+from app.core.redis import RedisClient
+from app.core.sweeper import ExpirationSweeper
+from app.core.utils import utcnow2
+from app.database.models import CkeyLinkToken, Player, Whitelist, WhitelistChange
+from pytest_mock import MockerFixture
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from tests.conftest import FakeRedis
+
+
+@pytest.fixture
+def sweeper(async_db_engine: AsyncEngine) -> ExpirationSweeper:
+    @asynccontextmanager
+    async def session_factory() -> AsyncGenerator[AsyncSession]:
+        async with AsyncSession(async_db_engine, expire_on_commit=False) as session:
+            yield session
+            await session.commit()
+
+    return ExpirationSweeper(
+        session_factory, RedisClient("redis://localhost:6379/0"), interval=60, batch_size=2, change_retention=3600
+    )
+
+
+class TestExpirationSweeper:
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("fake_redis")
+    async def test_lock_is_exclusive(self, sweeper: ExpirationSweeper) -> None:
+        other = ExpirationSweeper(
+            sweeper.session_factory, sweeper.redis_client, interval=60, batch_size=2, change_retention=3600
+        )
+
+        assert await sweeper.acquire_lock()
+        assert not await other.acquire_lock()
+
+    @pytest.mark.asyncio
+    async def test_expire_whitelists(
+        self,
+        sweeper: ExpirationSweeper,
+        fake_redis: FakeRedis,
+        db_session: Session,
+        whitelist_factory: Callable[..., Whitelist],
+    ) -> None:
+        expired = [whitelist_factory(expiration_time=utcnow2() - timedelta(minutes=1)) for _ in range(3)]
+        active = whitelist_factory(expiration_time=utcnow2() + timedelta(days=1))
+
+        assert await sweeper.expire("whitelist", Whitelist) == len(expired)
+
+        db_session.expire_all()
+        assert [(wl.valid, wl.expired_by_sweeper) for wl in expired] == [(False, True)] * len(expired)
+        assert active.valid
+        assert len(db_session.exec(select(WhitelistChange)).all()) == len(expired)
+        assert [json.loads(message)["kind"] for _, message in fake_redis.published] == ["whitelist", "whitelist"]
+
+    @pytest.mark.asyncio
+    async def test_delete_expired_tokens(self, sweeper: ExpirationSweeper, db_session: Session) -> None:
+        db_session.add_all(
+            CkeyLinkToken(ckey=str(i), expiration_time=utcnow2() - timedelta(minutes=1)) for i in range(3)
+        )
+        db_session.add(CkeyLinkToken(ckey="active"))
+        db_session.commit()
+
+        assert await sweeper.delete_expired_tokens() == 3
+        assert [token.ckey for token in db_session.exec(select(CkeyLinkToken)).all()] == ["active"]
+
+    @pytest.mark.asyncio
+    async def test_expire_skips_rows_extended_meanwhile(
+        self,
+        sweeper: ExpirationSweeper,
+        fake_redis: FakeRedis,
+        db_session: Session,
+        mocker: MockerFixture,
+        whitelist_factory: Callable[..., Whitelist],
+    ) -> None:
+        extended = whitelist_factory(expiration_time=utcnow2() - timedelta(minutes=1))
+        expired = whitelist_factory(expiration_time=utcnow2() - timedelta(minutes=1))
+        exec_ = AsyncSession.exec
+
+        async def exec_then_extend(session: AsyncSession, *args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+            result: Any = await exec_(session, *args, **kwargs)
+            if extended.expiration_time <= utcnow2():
+                # A patch committed between the selection and the update
+                extended.expiration_time = utcnow2() + timedelta(days=1)
+                db_session.add(extended)
+                db_session.commit()
+            return result
+
+        mocker.patch.object(AsyncSession, "exec", exec_then_extend)
+
+        assert await sweeper.expire("whitelist", Whitelist) == 1
+
+        db_session.expire_all()
+        assert extended.valid
+        assert not expired.valid
+        assert [change.player_id for change in db_session.exec(select(WhitelistChange)).all()] == [expired.player_id]
+        [(_, message)] = fake_redis.published
+        assert [item["id"] for item in json.loads(message)["items"]] == [expired.id]
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("fake_redis")
+    async def test_run_survives_failed_sweeps(self, sweeper: ExpirationSweeper, mocker: MockerFixture) -> None:
+        sweeper.interval = 0.01
+        sweep = mocker.patch.object(sweeper, "sweep", side_effect=[RuntimeError("bug"), None])
+        mocker.patch.object(sweeper, "acquire_lock", return_value=True)
+
+        task = asyncio.create_task(sweeper.run())
+        while sweep.await_count < 2 and not task.done():
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+        assert sweep.await_count == 2
+
+    def test_interval_must_be_positive(self, sweeper: ExpirationSweeper) -> None:
+        with pytest.raises(ValueError):
+            ExpirationSweeper(
+                sweeper.session_factory, sweeper.redis_client, interval=0, batch_size=2, change_retention=3600
+            )
+
+    @pytest.mark.asyncio
+    async def test_delete_old_changes(self, sweeper: ExpirationSweeper, db_session: Session, player: Player) -> None:
+        assert player.id is not None
+        db_session.add_all(
+            WhitelistChange(server_type="main", player_id=player.id, change_time=utcnow2() - timedelta(hours=2))
+            for _ in range(3)
+        )
+        recent = WhitelistChange(server_type="main", player_id=player.id)
+        db_session.add(recent)
+        db_session.commit()
+
+        assert await sweeper.delete_old_changes() == 3
+        assert [change.id for change in db_session.exec(select(WhitelistChange)).all()] == [recent.id]
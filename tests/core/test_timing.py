@@ -0,0 +1,45 @@
+import time
+
+from app.core.timing import RequestTimings, ServerTimingMiddleware, TimedJSONResponse, current_timings, timed
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+
+def test_header() -> None:
+    timings = RequestTimings(db=0.0125, db_queries=3, redis=0.001, discord=0.2, serialize=0.0005)
+
+    assert timings.header() == (
+        "db;dur=12.50, db_queries;count=3, redis;dur=1.00, discord;dur=200.00, serialize;dur=0.50"
+    )
+
+
+def test_timed_outside_request() -> None:
+    with timed("redis"):
+        pass
+
+    assert current_timings() is None
+
+
+def test_middleware() -> None:
+    engine = create_engine("sqlite://")
+    app = FastAPI(default_response_class=TimedJSONResponse)
+    app.add_middleware(ServerTimingMiddleware)
+
+    @app.get("/")
+    async def endpoint() -> list[int]:  # pyright: ignore[reportUnusedFunction]
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+        with timed("discord"):
+            time.sleep(0.01)
+        return [1, 2, 3]
+
+    header = TestClient(app).get("/").headers["Server-Timing"]
+
+    metrics = dict(metric.split(";") for metric in header.split(", "))
+    assert metrics["db_queries"] == "count=2"
+    assert float(metrics["discord"].removeprefix("dur=")) >= 10
+    assert float(metrics["db"].removeprefix("dur=")) > 0
+    assert float(metrics["serialize"].removeprefix("dur=")) > 0
+    engine.dispose()
@@ -0,0 +1,60 @@
+from operator import eq
+from typing import Any, cast
+
+import pytest
+from app.database.models import Donation, Player, Whitelist, WhitelistBan
+from app.routes.v1.donate import filter_donations
+from app.routes.v1.whitelist import select_only_active_whitelist_bans, select_only_active_whitelists
+from sqlalchemy import text
+from sqlmodel import Session, select
+from sqlmodel.sql.expression import Select
+
+
+def query_plan(db_session: Session, query: Select[Any]) -> str:
+    sql = query.compile(db_session.get_bind(), compile_kwargs={"literal_binds": True})
+    return "\n".join(row[-1] for row in db_session.execute(text(f"EXPLAIN QUERY PLAN {sql}")))  # pyright: ignore[reportDeprecated]
+
+
+class TestActiveRecordIndexes:
+    @pytest.mark.parametrize(
+        ("query", "index"),
+        [
+            (
+                select_only_active_whitelists(
+                    cast(
+                        Select[tuple[str]],
+                        select(Player.ckey)
+                        .join(Whitelist, eq(Whitelist.player_id, Player.id))
+                        .where(Whitelist.server_type == "default"),
+                    )  # pyright: ignore[reportInvalidCast]
+                ),
+                "ix_whitelist_active",
+            ),
+            (
+                select_only_active_whitelist_bans(
+                    cast(Select[WhitelistBan], select(WhitelistBan).where(WhitelistBan.server_type == "default"))  # pyright: ignore[reportInvalidCast]
+                ),
+                "ix_whitelist_ban_active",
+            ),
+            (
+                select_only_active_whitelist_bans(
+                    cast(
+                        Select[WhitelistBan],
+                        select(WhitelistBan)
+                        .where(WhitelistBan.player_id == 1)
+                        .where(WhitelistBan.server_type == "default"),
+                    )  # pyright: ignore[reportInvalidCast]
+                ),
+                "ix_whitelist_ban_player_active",
+            ),
+            (
+                filter_donations(cast(Select[tuple[Donation]], select(Donation).join(Player))),  # pyright: ignore[reportInvalidCast]
+                "ix_donation_active",
+            ),
+        ],
+    )
+    def test_active_queries_use_index(self, db_session: Session, query: Select[Any], index: str) -> None:
+        plan = query_plan(db_session, query)
+
+        assert f"INDEX {index} " in plan
+        assert "expiration_time>?" in plan
@@ -1,8 +1,11 @@
 # pyright: reportUnknownMemberType=false
+import asyncio
 from typing import Any
 
 import aiohttp
 import pytest
+from app.core.cache import MemoryCacheBackend, TieredCache
+from app.oauth.discord.cache import DiscordResponseCache
 from app.oauth.discord.client import DiscordOAuthClient
 from app.oauth.discord.exeptions import RateLimitedError, ScopeMissingError, UnauthorizedError
 from app.oauth.discord.models.guild import GuildPreview
@@ -42,6 +45,20 @@ class TestDiscordOAuthClient:
         assert "response_type=code" in url.query
         assert "state=test_state" in url.query
 
+    async def test_session_is_shared(self, client: DiscordOAuthClient) -> None:
+        """Test requests reuse one pooled session until the client is closed."""
+        session = client.session
+
+        assert client.session is session
+        assert isinstance(session.connector, aiohttp.TCPConnector)
+        assert session.connector.limit == client.connection_limit
+
+        await client.close()
+
+        assert session.closed
+        assert client.session is not session
+        await client.close()
+
     async def test_request_success(self, client: DiscordOAuthClient, mocker: MockerFixture) -> None:
         """Test successful API request."""
         response_data = {"id": "123", "username": "test_user"}
@@ -55,9 +72,7 @@ class TestDiscordOAuthClient:
         mock_session = mocker.MagicMock()
         mock_session.get = mock_get
 
-        cm_mock = mocker.AsyncMock()
-        cm_mock.__aenter__.return_value = mock_session
-        mocker.patch("aiohttp.ClientSession", return_value=cm_mock)
+        mocker.patch("aiohttp.ClientSession", return_value=mock_session)
 
         result: Any = await client.request("/users/@me", "test_token")
 
@@ -78,9 +93,7 @@ class TestDiscordOAuthClient:
         mock_session = mocker.MagicMock()
         mock_session.get = mock_get
 
-        mock_cm = mocker.AsyncMock(spec=aiohttp.ClientSession)
-        mock_cm.__aenter__.return_value = mock_session
-        mocker.patch("aiohttp.ClientSession", return_value=mock_cm)
+        mocker.patch("aiohttp.ClientSession", return_value=mock_session)
 
         with pytest.raises(UnauthorizedError):
             await client.request("/users/@me", "test_token")
@@ -107,6 +120,7 @@ class TestDiscordOAuthClient:
         mock_session.__aenter__.return_value = mock_session
 
         mocker.patch("aiohttp.ClientSession", return_value=mock_session)
+        client.scheduler.max_retries = 0
 
         with pytest.raises(RateLimitedError) as exc_info:
             await client.request("/users/@me", "test_token")
@@ -144,6 +158,59 @@ class TestDiscordOAuthClient:
 
         assert result == expected_data
 
+    async def test_request_cached(self, client: DiscordOAuthClient, mocker: MockerFixture) -> None:
+        """Test GET responses are served from the cache, per token, without the token in the key."""
+        expected_data = {"id": "1"}
+
+        mock_response = mocker.AsyncMock()
+        mock_response.status = status.HTTP_200_OK
+        mock_response.json.return_value = expected_data
+        mock_response.headers = {}
+
+        mock_session = mocker.AsyncMock()
+        mock_session.get.return_value = mock_response
+        mocker.patch("aiohttp.ClientSession", return_value=mock_session)
+
+        memory = MemoryCacheBackend(max_size=10, max_ttl=60)
+        client.cache = DiscordResponseCache(TieredCache(memory), default_ttl=60, route_ttls={"/uncached": 0})
+
+        assert await client.request("/users/@me", "test_token") == expected_data
+        assert await client.request("/users/@me", "test_token") == expected_data
+        assert await client.request("/users/@me", "other_token") == expected_data
+        await client.request("/uncached", "test_token")
+        await client.request("/uncached", "test_token")
+
+        assert mock_session.get.await_count == 4
+        assert client.cache.stats.hits == {"memory": 1}
+        assert all("test_token" not in key for key in memory._cache._entries)  # pyright: ignore[reportPrivateUsage]
+
+    async def test_request_coalesced(self, client: DiscordOAuthClient, mocker: MockerFixture) -> None:
+        """Test concurrent identical GET requests share one request to Discord."""
+        mock_response = mocker.AsyncMock()
+        mock_response.status = status.HTTP_200_OK
+        mock_response.json.return_value = {"id": "1"}
+        mock_response.headers = {}
+
+        async def get(*_: Any, **_kwargs: Any) -> Any:  # noqa: ANN401
+            await asyncio.sleep(0.01)
+            return mock_response
+
+        mock_session = mocker.AsyncMock()
+        mock_session.get.side_effect = get
+        mocker.patch("aiohttp.ClientSession", return_value=mock_session)
+
+        results = await asyncio.gather(
+            *(client.request("/users/@me", "test_token") for _ in range(3)),
+            client.request("/users/@me", "other_token"),
+        )
+
+        assert results == [{"id": "1"}] * 4
+        assert mock_session.get.await_count == 2
+        assert client.coalesced_requests == 2
+
+        await client.request("/users/@me", "test_token")
+        assert mock_session.get.await_count == 3
+
     async def test_request_invalid_method(self, client: DiscordOAuthClient) -> None:
         """Test invalid method in request."""
         for method in ["PUT", "DELETE", "OPTIONS", "PATCH", "TRACE"]:
@@ -167,9 +234,7 @@ class TestDiscordOAuthClient:
         mock_session = mocker.MagicMock()
         mock_session.post = mock_post
 
-        cm_mock = mocker.AsyncMock()
-        cm_mock.__aenter__.return_value = mock_session
-        mocker.patch("aiohttp.ClientSession", return_value=cm_mock)
+        mocker.patch("aiohttp.ClientSession", return_value=mock_session)
 
         access_token, refresh_token = await client.get_access_token("test_code")
 
@@ -204,9 +269,7 @@ class TestDiscordOAuthClient:
         mock_session = mocker.MagicMock()
         mock_session.post = mock_post
 
-        cm_mock = mocker.AsyncMock()
-        cm_mock.__aenter__.return_value = mock_session
-        mocker.patch("aiohttp.ClientSession", return_value=cm_mock)
+        mocker.patch("aiohttp.ClientSession", return_value=mock_session)
 
         access_token, refresh_token = await client.refresh_access_token("old_refresh_token")
 
@@ -0,0 +1,113 @@
+import asyncio
+import time
+from typing import Any
+
+import aiohttp
+from app.oauth.discord.ratelimit import RateLimitScheduler
+from fastapi import status
+from pytest_mock import MockerFixture
+
+
+def make_response(mocker: MockerFixture, status_code: int, json: Any, headers: dict[str, str]) -> Any:  # noqa: ANN401
+    response = mocker.MagicMock()
+    response.status = status_code
+    response.json = mocker.AsyncMock(return_value=json)
+    response.headers = headers
+    return response
+
+
+def limited(remaining: int, reset_after: float) -> dict[str, str]:
+    return {
+        "X-RateLimit-Limit": "1",
+        "X-RateLimit-Remaining": str(remaining),
+        "X-RateLimit-Reset": str(time.time() + reset_after),
+        "X-RateLimit-Reset-After": str(reset_after),
+        "X-RateLimit-Bucket": "bucket",
+    }
+
+
+class TestRateLimitScheduler:
+    async def test_waits_for_bucket_reset(self, mocker: MockerFixture) -> None:
+        """Test requests of an exhausted bucket are queued until it resets."""
+        scheduler = RateLimitScheduler()
+        send = mocker.AsyncMock(side_effect=lambda: make_response(mocker, status.HTTP_200_OK, {}, limited(0, 0.1)))
+
+        start = time.monotonic()
+        await asyncio.gather(*(scheduler.send("GET /users/@me", "token", send) for _ in range(3)))
+
+        assert time.monotonic() - start >= 0.2
+        assert send.await_count == 3
+        assert scheduler.stats.delayed == 2
+        assert scheduler.stats.rate_limited == 0
+        assert scheduler.stats.queued == 0
+
+    async def test_buckets_are_separate_per_major(self, mocker: MockerFixture) -> None:
+        """Test different tokens do not wait for each other."""
+        scheduler = RateLimitScheduler()
+        send = mocker.AsyncMock(return_value=make_response(mocker, status.HTTP_200_OK, {}, limited(0, 10)))
+
+        await scheduler.send("GET /users/@me", "first", send)
+        await asyncio.wait_for(scheduler.send("GET /users/@me", "second", send), timeout=1)
+
+        assert scheduler.stats.delayed == 0
+
+    async def test_retries_rate_limited(self, mocker: MockerFixture) -> None:
+        """Test a 429 response is retried after `retry_after` and the global limit is respected."""
+        scheduler = RateLimitScheduler(jitter=0)
+        rate_limited = make_response(
+            mocker, status.HTTP_429_TOO_MANY_REQUESTS, {"retry_after": 0.05, "global": True}, {}
+        )
+        ok = make_response(mocker, status.HTTP_200_OK, {"id": "1"}, {})
+        send = mocker.AsyncMock(side_effect=[rate_limited, ok])
+
+        response, data = await scheduler.send("GET /users/@me", "token", send)
+
+        assert response is ok
+        assert data == {"id": "1"}
+        assert scheduler.stats.retries == 1
+        assert scheduler.get_global_limit("token").reset_at > 0
+        assert scheduler.get_global_limit("other").reset_at == 0
+
+    async def test_gives_up_after_retries(self, mocker: MockerFixture) -> None:
+        """Test the 429 response is returned once retries run out."""
+        scheduler = RateLimitScheduler(max_retries=0)
+        rate_limited = make_response(mocker, status.HTTP_429_TOO_MANY_REQUESTS, {"retry_after": 5}, {})
+        send = mocker.AsyncMock(return_value=rate_limited)
+
+        response, _ = await scheduler.send("GET /users/@me", "token", send)
+
+        assert response is rate_limited
+        assert send.await_count == 1
+
+    async def test_failed_probe_does_not_learn_bucket(self, mocker: MockerFixture) -> None:
+        """Test a request failing before any response leaves the bucket to be learned by the next one."""
+        scheduler = RateLimitScheduler()
+        failed = False
+
+        async def send() -> Any:  # noqa: ANN401
+            nonlocal failed
+            await asyncio.sleep(0.01)
+            if not failed:
+                failed = True
+                raise aiohttp.ClientConnectionError
+            return make_response(mocker, status.HTTP_200_OK, {}, limited(0, 0.1))
+
+        start = time.monotonic()
+        results = await asyncio.gather(
+            *(scheduler.send("GET /users/@me", "token", send) for _ in range(3)), return_exceptions=True
+        )
+
+        assert isinstance(results[0], aiohttp.ClientConnectionError)
+        assert scheduler.get_bucket("GET /users/@me", "token").learned
+        # The second request learned the limits, the third waited for the reset instead of going unlimited
+        assert time.monotonic() - start >= 0.1
+
+    async def test_global_limit_is_per_token(self, mocker: MockerFixture) -> None:
+        """Test the global limit of one token does not delay requests of another."""
+        scheduler = RateLimitScheduler(global_limit=1)
+        send = mocker.AsyncMock(return_value=make_response(mocker, status.HTTP_200_OK, {}, {}))
+
+        await scheduler.send("GET /users/@me", "first", send)
+        await asyncio.wait_for(scheduler.send("GET /users/@me/guilds", "second", send), timeout=0.5)
+
+        assert scheduler.stats.delayed == 0
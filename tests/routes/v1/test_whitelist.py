@@ -0,0 +1,401 @@
+from collections.abc import Callable
+from datetime import UTC, timedelta
+
+import pytest
+from app.core.utils import utcnow2
+from app.database.models import Player, Whitelist, WhitelistBan
+from app.schemas.v1.generic import encode_cursor
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+from tests.conftest import assert_queries
+
+
+class TestWhitelistRoutes:
+    def test_get_whitelists(self, client: TestClient, whitelist_factory: Callable[..., Whitelist]) -> None:
+        wl = whitelist_factory(expiration_time=utcnow2() + timedelta(days=1), valid=True)
+
+        params = {"server_type": wl.server_type}
+
+        with assert_queries(2):
+            response = client.get("whitelists", params=params)
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["total"] == 1
+        assert data["items"][0]["id"] == wl.id
+
+    def test_get_whitelists_by_cursor(
+        self, client: TestClient, whitelist_factory: Callable[..., Whitelist], server_type: str
+    ) -> None:
+        wls = [
+            whitelist_factory(server_type=server_type, expiration_time=utcnow2() + timedelta(days=1)) for _ in range(5)
+        ]
+
+        seen: list[int] = []
+        params: dict[str, str | int | bool] = {"server_type": server_type, "page_size": 2, "include_total": False}
+        while True:
+            response = client.get("whitelists", params=params)
+            assert response.status_code == status.HTTP_200_OK
+            data = response.json()
+            assert data["total"] is None
+            seen.extend(item["id"] for item in data["items"])
+            if data["next_cursor"] is None:
+                break
+            params["cursor"] = data["next_cursor"]
+
+        assert seen == [wl.id for wl in wls]
+
+    def test_cursor_pages_have_no_page_links(
+        self, client: TestClient, whitelist_factory: Callable[..., Whitelist], server_type: str
+    ) -> None:
+        for _ in range(3):
+            whitelist_factory(server_type=server_type, expiration_time=utcnow2() + timedelta(days=1))
+        params: dict[str, str | int] = {"server_type": server_type, "page_size": 2}
+        params["cursor"] = client.get("whitelists", params=params).json()["next_cursor"]
+
+        data = client.get("whitelists", params=params).json()
+
+        assert data["total"] == 3
+        assert data["next_cursor"] is None
+        assert data["next_page"] is None
+        assert data["next_page_path"] is None
+
+    @pytest.mark.parametrize("path", ["whitelists", "whitelists/ckeys", "whitelist_bans"])
+    @pytest.mark.parametrize("params", [{"page_size": 0}, {"page": 0}])
+    def test_get_pages_out_of_range(self, client: TestClient, path: str, params: dict[str, int]) -> None:
+        response = client.get(path, params=params)
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    def test_get_whitelists_invalid_cursor(self, client: TestClient) -> None:
+        response = client.get("whitelists", params={"cursor": "not a cursor"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.parametrize("cursor", [encode_cursor([{"a": 1}]), encode_cursor(["1"]), encode_cursor([True])])
+    def test_get_whitelists_cursor_of_wrong_type(self, client: TestClient, cursor: str) -> None:
+        response = client.get("whitelists", params={"cursor": cursor})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.parametrize(("path", "field"), [("ckeys", "ckey"), ("discord_ids", "discord_id")])
+    @pytest.mark.parametrize("snapshot", [True, False])
+    def test_get_whitelisted_identifiers_by_cursor(
+        self,
+        request: pytest.FixtureRequest,
+        client: TestClient,
+        player_factory: Callable[..., Player],
+        whitelist_factory: Callable[..., Whitelist],
+        server_type: str,
+        path: str,
+        field: str,
+        snapshot: bool,
+    ) -> None:
+        if snapshot:
+            request.getfixturevalue("fake_redis")
+        players = [player_factory() for _ in range(5)]
+        for player in players:
+            whitelist_factory(player=player, server_type=server_type, expiration_time=utcnow2() + timedelta(days=1))
+
+        seen: list[str] = []
+        params: dict[str, str | int] = {"server_type": server_type, "page_size": 2}
+        while True:
+            response = client.get(f"whitelists/{path}", params=params)
+            assert response.status_code == status.HTTP_200_OK
+            data = response.json()
+            seen.extend(data["items"])
+            if data["next_cursor"] is None:
+                break
+            params["cursor"] = data["next_cursor"]
+
+        assert seen == sorted(getattr(player, field) for player in players)
+
+        response = client.get(f"whitelists/{path}", params={"server_type": server_type, "cursor": encode_cursor([1])})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_get_whitelisted_ckeys_skips_expired(
+        self, client: TestClient, player: Player, whitelist_factory: Callable[..., Whitelist], server_type: str
+    ) -> None:
+        whitelist_factory(player=player, server_type=server_type, expiration_time=utcnow2() + timedelta(days=1))
+        whitelist_factory(server_type=server_type, expiration_time=utcnow2() - timedelta(days=1), valid=True)
+
+        response = client.get("whitelists/ckeys", params={"server_type": server_type})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["items"] == [player.ckey]
+
+    @pytest.mark.usefixtures("fake_redis")
+    def test_get_whitelisted_ckeys_not_modified(
+        self, client: TestClient, player: Player, whitelist_factory: Callable[..., Whitelist], server_type: str
+    ) -> None:
+        whitelist_factory(player=player, server_type=server_type, expiration_time=utcnow2() + timedelta(days=1))
+
+        response = client.get("whitelists/ckeys", params={"server_type": server_type})
+        etag = response.headers["ETag"]
+
+        assert response.json()["items"] == [player.ckey]
+
+        response = client.get("whitelists/ckeys", params={"server_type": server_type}, headers={"If-None-Match": etag})
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.headers["ETag"] == etag
+
+    @pytest.mark.usefixtures("fake_redis")
+    def test_create_whitelist_bumps_snapshot(
+        self,
+        client: TestClient,
+        bearer: str,
+        player_factory: Callable[..., Player],
+        server_type: str,
+    ) -> None:
+        player = player_factory()
+        admin = player_factory()
+        response = client.get("whitelists/ckeys", params={"server_type": server_type})
+        etag = response.headers["ETag"]
+        assert response.json()["items"] == []
+
+        client.post(
+            "whitelists",
+            json={
+                "server_type": server_type,
+                "duration_days": 1,
+                "player_discord_id": player.discord_id,
+                "admin_discord_id": admin.discord_id,
+            },
+            headers={"Authorization": f"Bearer {bearer}"},
+        )
+        response = client.get("whitelists/ckeys", params={"server_type": server_type}, headers={"If-None-Match": etag})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["items"] == [player.ckey]
+
+    def test_create_whitelist(
+        self,
+        client: TestClient,
+        bearer: str,
+        player_factory: Callable[..., Player],
+        server_type: str,
+        duration_days: int,
+    ) -> None:
+        player = player_factory()
+        admin = player_factory()
+
+        payload = {
+            "server_type": server_type,
+            "duration_days": duration_days,
+            "player_discord_id": player.discord_id,
+            "admin_discord_id": admin.discord_id,
+        }
+
+        # Bearer check, player and admin lookups, ban check, insert, change record, refresh
+        with assert_queries(7):
+            response = client.post("whitelists", json=payload, headers={"Authorization": f"Bearer {bearer}"})
+
+        assert response.status_code == status.HTTP_201_CREATED
+        data = response.json()
+        assert data["player_id"] == player.id
+        assert data["admin_id"] == admin.id
+        assert data["server_type"] == server_type
+
+    def test_create_whitelist_unauthorized(self, client: TestClient) -> None:
+        response = client.post(
+            "whitelists",
+            json={"server_type": "a", "duration_days": 1, "player_discord_id": "1", "admin_discord_id": "2"},
+            headers={"Authorization": "Bearer wrong"},
+        )
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.parametrize(
+        ("patch", "valid"),
+        [
+            ({"expiration_time": (utcnow2() + timedelta(days=1)).isoformat()}, True),
+            ({"expiration_time": (utcnow2() + timedelta(days=1)).isoformat(), "valid": False}, False),
+            ({"expiration_time": (utcnow2() - timedelta(minutes=1)).isoformat()}, False),
+        ],
+    )
+    def test_extending_expired_whitelist_reactivates_it(
+        self,
+        client: TestClient,
+        bearer: str,
+        db_session: Session,
+        whitelist_factory: Callable[..., Whitelist],
+        patch: dict[str, str | bool],
+        valid: bool,
+    ) -> None:
+        wl = whitelist_factory(expiration_time=utcnow2() - timedelta(days=1), valid=False)
+        # As marked by the expiration sweeper
+        wl.expired_by_sweeper = True
+        db_session.add(wl)
+        db_session.commit()
+
+        response = client.patch(f"whitelists/{wl.id}", json=patch, headers={"Authorization": f"Bearer {bearer}"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["valid"] is valid
+
+    @pytest.mark.parametrize("expiration", [timedelta(days=1), timedelta(days=-1)])
+    def test_extending_revoked_whitelist_keeps_it_revoked(
+        self, client: TestClient, bearer: str, whitelist_factory: Callable[..., Whitelist], expiration: timedelta
+    ) -> None:
+        wl = whitelist_factory(expiration_time=utcnow2() + expiration, valid=False)
+
+        response = client.patch(
+            f"whitelists/{wl.id}",
+            json={"expiration_time": (utcnow2() + timedelta(days=2)).isoformat()},
+            headers={"Authorization": f"Bearer {bearer}"},
+        )
+
+        assert response.json()["valid"] is False
+
+    def test_ban_keeps_expired_whitelist_revoked(
+        self,
+        client: TestClient,
+        bearer: str,
+        db_session: Session,
+        player_factory: Callable[..., Player],
+        whitelist_factory: Callable[..., Whitelist],
+    ) -> None:
+        player = player_factory()
+        admin = player_factory()
+        wl = whitelist_factory(player=player, expiration_time=utcnow2() - timedelta(days=1), valid=False)
+        wl.expired_by_sweeper = True
+        db_session.add(wl)
+        db_session.commit()
+        headers = {"Authorization": f"Bearer {bearer}"}
+        client.post(
+            "whitelist_bans",
+            json={
+                "server_type": wl.server_type,
+                "duration_days": 1,
+                "player_discord_id": player.discord_id,
+                "admin_discord_id": admin.discord_id,
+            },
+            headers=headers,
+        )
+
+        response = client.patch(
+            f"whitelists/{wl.id}",
+            json={"expiration_time": (utcnow2() + timedelta(days=2)).isoformat()},
+            headers=headers,
+        )
+
+        assert response.json()["valid"] is False
+
+    def test_check_whitelists(
+        self,
+        client: TestClient,
+        db_session: Session,
+        player_factory: Callable[..., Player],
+        whitelist_factory: Callable[..., Whitelist],
+        server_type: str,
+    ) -> None:
+        whitelisted = player_factory()
+        banned = player_factory()
+        whitelist_factory(player=whitelisted, server_type=server_type, expiration_time=utcnow2() + timedelta(days=1))
+        db_session.add(
+            WhitelistBan(
+                player_id=banned.id,  # pyright: ignore[reportArgumentType]
+                admin_id=whitelisted.id,  # pyright: ignore[reportArgumentType]
+                server_type=server_type,
+            )
+        )
+        db_session.commit()
+
+        payload = {
+            "server_type": server_type,
+            "ckeys": [whitelisted.ckey, banned.ckey, "unknown"],
+            "discord_ids": [whitelisted.discord_id],
+        }
+
+        with assert_queries(1):
+            response = client.post("whitelists/check", json=payload)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {
+            "ckeys": {
+                whitelisted.ckey: {"whitelisted": True, "banned": False},
+                banned.ckey: {"whitelisted": False, "banned": True},
+                "unknown": {"whitelisted": False, "banned": False},
+            },
+            "discord_ids": {whitelisted.discord_id: {"whitelisted": True, "banned": False}},
+        }
+
+
+class TestWhitelistDeltaRoutes:
+    def test_without_cursor(self, client: TestClient, server_type: str) -> None:
+        response = client.get("whitelists/delta", params={"server_type": server_type})
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["added_ckeys"] == data["removed_ckeys"] == []
+        assert data["cursor"]
+
+    def test_reports_writes(
+        self,
+        client: TestClient,
+        bearer: str,
+        player_factory: Callable[..., Player],
+        server_type: str,
+    ) -> None:
+        player = player_factory()
+        admin = player_factory()
+        cursor = client.get("whitelists/delta", params={"server_type": server_type}).json()["cursor"]
+
+        client.post(
+            "whitelists",
+            json={
+                "server_type": server_type,
+                "duration_days": 1,
+                "player_discord_id": player.discord_id,
+                "admin_discord_id": admin.discord_id,
+            },
+            headers={"Authorization": f"Bearer {bearer}"},
+        )
+        response = client.get("whitelists/delta", params={"server_type": server_type, "since": cursor})
+
+        data = response.json()
+        assert data["added_ckeys"] == [player.ckey]
+        assert data["added_discord_ids"] == [player.discord_id]
+
+        client.post(
+            "whitelist_bans",
+            json={
+                "server_type": server_type,
+                "duration_days": 1,
+                "player_discord_id": player.discord_id,
+                "admin_discord_id": admin.discord_id,
+            },
+            headers={"Authorization": f"Bearer {bearer}"},
+        )
+        response = client.get("whitelists/delta", params={"server_type": server_type, "since": data["cursor"]})
+
+        assert response.json()["removed_ckeys"] == [player.ckey]
+
+    def test_expired_cursor(self, client: TestClient, server_type: str) -> None:
+        cursor = encode_cursor([0, utcnow2() - timedelta(days=30)])
+
+        response = client.get("whitelists/delta", params={"server_type": server_type, "since": cursor})
+
+        assert response.status_code == status.HTTP_410_GONE
+
+    def test_cursor_with_offset(self, client: TestClient, server_type: str) -> None:
+        cursor = encode_cursor([0, utcnow2().replace(tzinfo=UTC)])
+
+        response = client.get("whitelists/delta", params={"server_type": server_type, "since": cursor})
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_reports_expirations(
+        self, client: TestClient, player: Player, whitelist_factory: Callable[..., Whitelist], server_type: str
+    ) -> None:
+        whitelist_factory(player=player, server_type=server_type, expiration_time=utcnow2() - timedelta(minutes=1))
+        whitelist_factory(server_type=server_type, expiration_time=utcnow2() - timedelta(days=1))
+        cursor = encode_cursor([0, utcnow2() - timedelta(hours=1)])
+
+        response = client.get("whitelists/delta", params={"server_type": server_type, "since": cursor})
+
+        data = response.json()
+        assert data["removed_ckeys"] == [player.ckey]
+        assert data["added_ckeys"] == []
@@ -0,0 +1,60 @@
+from datetime import UTC, datetime, timedelta, timezone
+
+import pytest
+from app.database.models import Player, Whitelist
+from app.schemas.v1.generic import after_cursor, decode_cursor, encode_cursor, page_links
+from fastapi import HTTPException
+from sqlalchemy.dialects import sqlite
+
+
+class TestCursor:
+    def test_round_trip(self) -> None:
+        keys = (Whitelist.expiration_time, Whitelist.id)
+        values = [datetime(2024, 1, 2, 3, 4, 5), 42]  # noqa: DTZ001
+
+        assert decode_cursor(encode_cursor(values), keys) == values
+
+    def test_aware_datetime_becomes_naive_utc(self) -> None:
+        cursor = encode_cursor([datetime(2024, 1, 2, 5, 4, 5, tzinfo=timezone(timedelta(hours=2))), 42])
+
+        assert decode_cursor(cursor, (Whitelist.expiration_time, Whitelist.id)) == [
+            datetime(2024, 1, 2, 3, 4, 5),  # noqa: DTZ001
+            42,
+        ]
+
+    def test_round_trip_string_key(self) -> None:
+        assert decode_cursor(encode_cursor(["ckey"]), (Player.ckey,)) == ["ckey"]
+
+    @pytest.mark.parametrize(
+        "cursor", ["!!!", encode_cursor([1, 2]), "bnVsbA", encode_cursor([{"a": 1}]), encode_cursor(["1"])]
+    )
+    def test_invalid(self, cursor: str) -> None:
+        with pytest.raises(HTTPException) as exc_info:
+            decode_cursor(cursor, (Whitelist.id,))
+
+        assert exc_info.value.status_code == 400
+
+    def test_unsupported_key_type(self) -> None:
+        with pytest.raises(HTTPException) as exc_info:
+            decode_cursor(encode_cursor([True]), (Whitelist.valid,))
+
+        assert exc_info.value.status_code == 400
+
+    def test_after_cursor_expands_keys(self) -> None:
+        clause = after_cursor((Whitelist.expiration_time, Whitelist.id), [datetime(2024, 1, 1, tzinfo=UTC), 1])
+
+        sql = str(clause.compile(dialect=sqlite.dialect()))
+        assert sql == "whitelist.expiration_time > ? OR whitelist.expiration_time = ? AND whitelist.id > ?"
+
+
+class TestPageLinks:
+    def test_without_total_uses_has_more(self) -> None:
+        assert page_links(2, has_more=True) == {
+            "next_page": 3,
+            "next_page_path": None,
+            "previous_page": 1,
+            "previous_page_path": None,
+        }
+
+    def test_last_first_page_has_no_links(self) -> None:
+        assert page_links(1, has_more=False) == {}